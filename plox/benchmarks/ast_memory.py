@@ -0,0 +1,67 @@
+"""
+Memory held by the parsed AST per source line, as objects and as an `Arena`,
+and how many nodes the parser builds per second. Tokens are scanned up front,
+the parse is what's measured.
+
+    python -m benchmarks.ast_memory --size-mb 1
+"""
+
+import argparse
+import tracemalloc
+from dataclasses import fields
+from time import perf_counter
+
+from benchmarks.lox_sources import program
+from src.ast.arena import Arena
+from src.ast.expr.schema import Expr
+from src.ast.stmt.schema import Stmt
+from src.parser import Parser
+from src.regex_scanner import RegexScanner
+
+
+def count_nodes(value: object) -> int:
+    if isinstance(value, (Expr, Stmt)):
+        return 1 + sum(count_nodes(getattr(value, field.name)) for field in fields(value))
+    if isinstance(value, (list, tuple)):
+        return sum(count_nodes(item) for item in value)
+
+    return 0
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--size-mb', type=float, default=1.0, help='size of the generated source')
+    arg_parser.add_argument('--repeat', type=int, default=3, help='best of N runs is reported')
+    args = arg_parser.parse_args()
+
+    source = program(int(args.size_mb * 1024 * 1024))
+    tokens = RegexScanner(source).scan_tokens()
+    lines = source.count('\n')
+
+    best = float('inf')
+    for _ in range(args.repeat):
+        start = perf_counter()
+        Parser(tokens).parse()
+        best = min(best, perf_counter() - start)
+
+    # the tokens already exist, so what is traced is the tree the parser adds
+    tracemalloc.start()
+    statements = Parser(tokens).parse()
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    nodes = count_nodes(statements)
+
+    tracemalloc.start()
+    arena = Arena.from_ast(statements or [])
+    arena_held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(arena) == nodes
+
+    print(f'{lines} lines, {nodes} nodes')
+    print(f'AST     {held / lines:8.1f} bytes/line {held / nodes:8.1f} bytes/node')
+    print(f'Arena   {arena_held / lines:8.1f} bytes/line {arena_held / nodes:8.1f} bytes/node')
+    print(f'parse   {best:8.3f}s {nodes / best / 1000:8.1f}k nodes/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Cost of a loop iteration whose body is a few nested blocks declaring locals,
+at the top level, inside a function, and inside a function with a closure
+capturing the body's locals (which keeps one frame per iteration). Also says
+how many of the program's blocks still get a frame of their own.
+
+    python -m benchmarks.block_frames --iterations 20000
+"""
+
+import argparse
+import io
+from contextlib import redirect_stdout
+from time import perf_counter
+
+from src.ast.stmt.schema import Block, Stmt
+from src.interperter_lib.interpreter import Interpreter
+from src.parser import Parser
+from src.regex_scanner import RegexScanner
+from src.resolver import Resolver
+from src.visitors.ast_dumper import walk
+
+_BODY = """\
+  var i = 0;
+  while (i < {iterations}) {{
+    var a = i;
+    {{ var b = a + 1; {{ var c = b * 2; {{ }} }} }}
+    {capture}
+    i = i + 1;
+  }}
+"""
+
+CASES = {
+    # name: (wrapping of the loop, statement capturing `a`)
+    'top level': ('{{\n{body}}}\n', ''),
+    'function': ('fun loop() {{\n{body}}}\nloop();\n', ''),
+    'captured': ('fun loop() {{\n{body}}}\nloop();\n', 'fun get() { return a; }'),
+}
+
+
+def source(wrapping: str, capture: str, iterations: int) -> str:
+    return wrapping.format(body=_BODY.format(iterations=iterations, capture=capture))
+
+
+def prepare(code: str) -> tuple[Interpreter, list[Stmt]]:
+    statements = Parser(RegexScanner(code).scan_buffer()).parse() or []
+    interpreter = Interpreter()
+    Resolver(interpreter).resolve(statements)
+    return interpreter, statements
+
+
+def measure(interpreter: Interpreter, statements: list[Stmt], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = perf_counter()
+        with redirect_stdout(io.StringIO()):
+            interpreter.interpret(statements)
+        best = min(best, perf_counter() - start)
+
+    return best
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--iterations', type=int, default=20000, help='loop iterations per case')
+    arg_parser.add_argument('--repeat', type=int, default=3, help='best of N runs is reported')
+    args = arg_parser.parse_args()
+
+    for name, (wrapping, capture) in CASES.items():
+        interpreter, statements = prepare(source(wrapping, capture, args.iterations))
+        blocks = [node for *_, node in walk(statements) if isinstance(node, Block)]
+        framed = sum(1 for block in blocks if block.frame)
+        elapsed = measure(interpreter, statements, args.repeat)
+        print(
+            f'{name:10} {elapsed / args.iterations * 1e6:7.2f} us/iteration, '
+            f'{framed} of {len(blocks)} blocks with a frame'
+        )
+
+
+if __name__ == '__main__':
+    main()
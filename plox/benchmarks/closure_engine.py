@@ -0,0 +1,79 @@
+"""
+Time a loop heavy and a call heavy program on the tree walking interpreter
+and on the closure compiling one, the same resolved tree for both.
+
+    python -m benchmarks.closure_engine --iterations 100000 --fib 20
+"""
+
+import argparse
+import io
+from collections.abc import Callable
+from contextlib import redirect_stdout
+from time import perf_counter
+
+from src.ast.stmt.schema import Stmt
+from src.interperter_lib.closure_compiler import ClosureInterpreter
+from src.interperter_lib.interpreter import Interpreter
+from src.parser import Parser
+from src.regex_scanner import RegexScanner
+from src.resolver import Resolver
+
+_LOOPS = """\
+fun loop(n) {{
+  var total = 0;
+  var i = 0;
+  while (i < n) {{
+    if (i - (i / 2) * 2 == 0) total = total + i; else total = total - 1;
+    i = i + 1;
+  }}
+  for (var j = 0; j < n; j = j + 1) total = total + j * 2;
+  return total;
+}}
+print loop({iterations});
+"""
+
+_CALLS = """\
+fun fib(n) {{
+  if (n < 2) return n;
+  return fib(n - 1) + fib(n - 2);
+}}
+fun adder(x) {{
+  fun add(y) {{ return x + y; }}
+  return add;
+}}
+var add = adder(1);
+var total = 0;
+for (var i = 0; i < {fib}; i = i + 1) total = add(total);
+print fib({fib}) + total;
+"""
+
+
+def measure(statements: list[Stmt], engine: Callable[[], Interpreter | ClosureInterpreter], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = perf_counter()
+        with redirect_stdout(io.StringIO()):
+            engine().interpret(statements)
+        best = min(best, perf_counter() - start)
+
+    return best
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--iterations', type=int, default=100000, help='iterations of the loop program')
+    arg_parser.add_argument('--fib', type=int, default=20, help='fibonacci number the call program computes')
+    arg_parser.add_argument('--repeat', type=int, default=3, help='best of N runs is reported')
+    args = arg_parser.parse_args()
+
+    programs = {'loops': _LOOPS.format(iterations=args.iterations), 'calls': _CALLS.format(fib=args.fib)}
+    for name, source in programs.items():
+        statements = Parser(RegexScanner(source).scan_buffer()).parse() or []
+        Resolver(Interpreter()).resolve(statements)
+        tree = measure(statements, Interpreter, args.repeat)
+        closures = measure(statements, ClosureInterpreter, args.repeat)
+        print(f'{name}  tree {tree * 1000:8.1f}ms  closure {closures * 1000:8.1f}ms ({tree / closures:.2f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Memory kept alive by closures, and the cost of using a captured variable.
+Every closure comes from a call that builds a few long strings in locals it
+doesn't use, like `greet_generator` in examples/18 with bigger neighbours.
+
+    python -m benchmarks.closure_memory --closures 2000
+"""
+
+import argparse
+import io
+import tracemalloc
+from contextlib import redirect_stdout
+from time import perf_counter
+
+from src.interperter_lib.interpreter import Interpreter
+from src.parser import Parser
+from src.regex_scanner import RegexScanner
+from src.resolver import Resolver
+
+_MAKER = """\
+fun make(n) {
+  var name = "closure";
+  var scratch = "";
+  var i = 0;
+  while (i < 20) {
+    scratch = scratch + "some text nobody needs once the call returns ";
+    i = i + 1;
+  }
+  var copy = scratch + scratch;
+  fun get() { return name; }
+  return get;
+}
+"""
+
+_KEEP = """\
+var kept = nil;
+var k = 0;
+while (k < {closures}) {{
+  var closure = make(k);
+  // chains them so they all stay alive
+  var previous = kept;
+  fun keep() {{ previous; return closure(); }}
+  kept = keep;
+  k = k + 1;
+}}
+"""
+
+_USE = """\
+fun loop() {{
+  var counter = 0;
+  fun inc() {{ counter = counter + 1; return counter; }}
+  var i = 0;
+  while (i < {calls}) {{ inc(); i = i + 1; }}
+}}
+loop();
+"""
+
+
+def run(code: str) -> Interpreter:
+    statements = Parser(RegexScanner(code).scan_buffer()).parse() or []
+    interpreter = Interpreter()
+    Resolver(interpreter).resolve(statements)
+    with redirect_stdout(io.StringIO()):
+        interpreter.interpret(statements)
+
+    return interpreter
+
+
+def retained(closures: int) -> int:
+    tracemalloc.start()
+    interpreter = run(_MAKER + _KEEP.format(closures=closures))
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del interpreter
+
+    return current
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--closures', type=int, default=2000, help='closures kept alive')
+    arg_parser.add_argument('--calls', type=int, default=20000, help='calls of a closure updating a captured variable')
+    args = arg_parser.parse_args()
+
+    size = retained(args.closures)
+    print(f'retained    {size / args.closures:8.0f} bytes/closure')
+
+    start = perf_counter()
+    run(_USE.format(calls=args.calls))
+    print(f'inc()       {(perf_counter() - start) / args.calls * 1e6:8.2f} us/call')
+
+
+if __name__ == '__main__':
+    main()
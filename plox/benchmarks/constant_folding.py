@@ -0,0 +1,70 @@
+"""
+Time a loop full of constant arithmetic spends with and without the constant
+folding pass, plus the time the pass itself takes.
+
+    python -m benchmarks.constant_folding --iterations 20000
+"""
+
+import argparse
+import io
+from contextlib import redirect_stdout
+from time import perf_counter
+
+from src.ast.stmt.schema import Stmt
+from src.interperter_lib.interpreter import Interpreter
+from src.optimizer.constant_folding import fold_constants
+from src.parser import Parser
+from src.regex_scanner import RegexScanner
+from src.resolver import Resolver
+
+_PROGRAM = """\
+var seconds_per_day = 60 * 60 * 24;
+var debug = false;
+fun loop() {{
+  var total = 0;
+  var i = 0;
+  var rate = 1.5 * 2 - 0.5;
+  while (i < {iterations}) {{
+    total = total + seconds_per_day / (24 * 60) + rate * (3 + 4) - (10 - 2 * 5);
+    if (debug and total > 0) print "total " + "so far";
+    i = i + 1;
+  }}
+  print total;
+}}
+loop();
+"""
+
+
+def measure(statements: list[Stmt], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = perf_counter()
+        with redirect_stdout(io.StringIO()):
+            Interpreter().interpret(statements)
+        best = min(best, perf_counter() - start)
+
+    return best
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--iterations', type=int, default=20000, help='loop iterations')
+    arg_parser.add_argument('--repeat', type=int, default=3, help='best of N runs is reported')
+    args = arg_parser.parse_args()
+
+    statements = Parser(RegexScanner(_PROGRAM.format(iterations=args.iterations)).scan_buffer()).parse() or []
+    Resolver(Interpreter()).resolve(statements)
+    plain = measure(statements, args.repeat)
+
+    start = perf_counter()
+    folded = fold_constants(statements)
+    folding = perf_counter() - start
+    Resolver(Interpreter()).resolve(folded)
+    optimized = measure(folded, args.repeat)
+
+    print(f'plain     {plain * 1000:8.1f}ms')
+    print(f'folded    {optimized * 1000:8.1f}ms ({plain / optimized:.2f}x), folding took {folding * 1000:.2f}ms')
+
+
+if __name__ == '__main__':
+    main()
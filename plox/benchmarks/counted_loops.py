@@ -0,0 +1,67 @@
+"""
+Time nested counted `for` loops run through the counted loop fast path and
+through the generic one, the same tree with the resolver's `counted` flags
+cleared.
+
+    python -m benchmarks.counted_loops --size 300
+"""
+
+import argparse
+import io
+from contextlib import redirect_stdout
+from time import perf_counter
+
+from src.ast.stmt.schema import For, Stmt
+from src.interperter_lib.interpreter import Interpreter
+from src.parser import Parser
+from src.regex_scanner import RegexScanner
+from src.resolver import Resolver
+from src.visitors.ast_dumper import walk
+
+_PROGRAM = """\
+fun grid(size) {{
+  var total = 0;
+  for (var y = 0; y < size; y = y + 1) {{
+    for (var x = 0; x < size; x = x + 1) {{
+      total = total + x;
+    }}
+  }}
+  for (var k = 0; k <= size; k = k + 2) total = total - k;
+  return total;
+}}
+print grid({size});
+"""
+
+
+def measure(statements: list[Stmt], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = perf_counter()
+        with redirect_stdout(io.StringIO()):
+            Interpreter().interpret(statements)
+        best = min(best, perf_counter() - start)
+
+    return best
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--size', type=int, default=300, help='side of the iterated grid')
+    arg_parser.add_argument('--repeat', type=int, default=3, help='best of N runs is reported')
+    args = arg_parser.parse_args()
+
+    statements = Parser(RegexScanner(_PROGRAM.format(size=args.size)).scan_buffer()).parse() or []
+    Resolver(Interpreter()).resolve(statements)
+    loops = [node for *_, node in walk(statements) if isinstance(node, For)]
+    counted = measure(statements, args.repeat)
+
+    for loop in loops:
+        object.__setattr__(loop, 'counted', False)
+    generic = measure(statements, args.repeat)
+
+    print(f'generic   {generic * 1000:8.1f}ms')
+    print(f'counted   {counted * 1000:8.1f}ms ({generic / counted:.2f}x)')
+
+
+if __name__ == '__main__':
+    main()
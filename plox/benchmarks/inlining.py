@@ -0,0 +1,87 @@
+"""
+Time a loop that goes through small helper functions with and without the
+inlining pass (constant folding runs in both), plus the time the passes take.
+
+    python -m benchmarks.inlining --iterations 20000 --budget 40
+"""
+
+import argparse
+import io
+from contextlib import redirect_stdout
+from time import perf_counter
+
+from src.ast.stmt.schema import Stmt
+from src.interperter_lib.interpreter import Interpreter
+from src.optimizer.constant_folding import fold_constants
+from src.optimizer.inlining import DEFAULT_BUDGET, inline_functions
+from src.parser import Parser
+from src.regex_scanner import RegexScanner
+from src.resolver import Resolver
+
+_PROGRAM = """\
+var width = 640;
+fun square(x) {{ return x * x; }}
+fun clamp(v, low, high) {{
+  var clamped = v;
+  if (clamped < low) clamped = low;
+  if (clamped > high) clamped = high;
+  return clamped;
+}}
+fun index(x, y) {{ return y * width + x; }}
+fun count(total, step) {{
+  var next = total + step;
+  return next;
+}}
+fun loop() {{
+  var total = 0;
+  var hits = 0;
+  var i = 0;
+  while (i < {iterations}) {{
+    var offset = index(i, i);
+    var level = clamp(offset - 1000, 0, 500);
+    total = square(level);
+    hits = count(hits, 1);
+    i = i + 1;
+  }}
+  print total;
+  print hits;
+}}
+loop();
+"""
+
+
+def measure(statements: list[Stmt], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = perf_counter()
+        with redirect_stdout(io.StringIO()):
+            Interpreter().interpret(statements)
+        best = min(best, perf_counter() - start)
+
+    return best
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--iterations', type=int, default=20000, help='loop iterations')
+    arg_parser.add_argument('--budget', type=int, default=DEFAULT_BUDGET, help='inlining budget, in AST nodes')
+    arg_parser.add_argument('--repeat', type=int, default=3, help='best of N runs is reported')
+    args = arg_parser.parse_args()
+
+    statements = Parser(RegexScanner(_PROGRAM.format(iterations=args.iterations)).scan_buffer()).parse() or []
+    folded = fold_constants(statements)
+    Resolver(Interpreter()).resolve(folded)
+    plain = measure(folded, args.repeat)
+
+    start = perf_counter()
+    inlined = fold_constants(inline_functions(folded, args.budget))
+    inlining = perf_counter() - start
+    Resolver(Interpreter()).resolve(inlined)
+    optimized = measure(inlined, args.repeat)
+
+    print(f'calls     {plain * 1000:8.1f}ms')
+    print(f'inlined   {optimized * 1000:8.1f}ms ({plain / optimized:.2f}x), inlining took {inlining * 1000:.2f}ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Startup cost of a big library of which only a few functions get called,
+parsing every function body up front against parsing them on first call.
+Reports the time to scan, parse, resolve and run, and the memory held by the
+parsed program afterwards.
+
+    python -m benchmarks.lazy_startup --functions 2000 --calls 10
+"""
+
+import argparse
+import tracemalloc
+from time import perf_counter
+
+from benchmarks.lox_sources import library
+from src.ast.stmt.schema import Stmt
+from src.interperter_lib.interpreter import Interpreter
+from src.parser import Parser
+from src.regex_scanner import RegexScanner
+from src.resolver import Resolver
+
+
+def run(source: str, lazy: bool) -> list[Stmt]:
+    statements = Parser(RegexScanner(source).scan_buffer(), lazy=lazy).parse() or []
+    interpreter = Interpreter()
+    Resolver(interpreter).resolve(statements)
+    interpreter.interpret(statements)
+
+    return statements
+
+
+def measure(source: str, lazy: bool) -> tuple[float, int]:
+    start = perf_counter()
+    run(source, lazy)
+    elapsed = perf_counter() - start
+
+    # a second run for memory, tracing slows everything down too much to time it
+    tracemalloc.start()
+    statements = run(source, lazy)
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del statements
+
+    return elapsed, held
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--functions', type=int, default=2000, help='functions declared by the library')
+    arg_parser.add_argument('--calls', type=int, default=10, help='how many of them the program calls')
+    args = arg_parser.parse_args()
+
+    source = library(args.functions, args.calls)
+    for name, lazy in (('eager', False), ('lazy', True)):
+        elapsed, held = measure(source, lazy)
+        print(f'{name:6} {elapsed:8.3f}s {held / 1024 / 1024:8.1f}MB held')
+
+
+if __name__ == '__main__':
+    main()
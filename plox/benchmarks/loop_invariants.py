@@ -0,0 +1,70 @@
+"""
+Time a loop recomputing expressions of values it never changes with and
+without loop invariant code motion (type specialization runs in both), plus
+the time the pass takes.
+
+    python -m benchmarks.loop_invariants --iterations 20000
+"""
+
+import argparse
+import io
+from contextlib import redirect_stdout
+from time import perf_counter
+
+from src.ast.stmt.schema import Stmt
+from src.interperter_lib.interpreter import Interpreter
+from src.optimizer.loop_invariants import hoist_invariants
+from src.optimizer.type_inference import specialize_types
+from src.parser import Parser
+from src.regex_scanner import RegexScanner
+from src.resolver import Resolver
+
+_PROGRAM = """\
+fun area(width, height, margin) {{
+  var total = 0;
+  for (var i = 0; i < {iterations}; i = i + 1) {{
+    total = total + (width - margin * 2) * (height - margin * 2) + i;
+    if (total > width * height * 1000) total = 0;
+  }}
+  print total;
+}}
+area(640, 480, 8);
+"""
+
+
+def measure(statements: list[Stmt], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = perf_counter()
+        with redirect_stdout(io.StringIO()):
+            Interpreter().interpret(statements)
+        best = min(best, perf_counter() - start)
+
+    return best
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--iterations', type=int, default=20000, help='loop iterations')
+    arg_parser.add_argument('--repeat', type=int, default=3, help='best of N runs is reported')
+    args = arg_parser.parse_args()
+
+    statements = Parser(RegexScanner(_PROGRAM.format(iterations=args.iterations)).scan_buffer()).parse() or []
+    Resolver(Interpreter()).resolve(statements)
+    specialized = specialize_types(statements)
+    Resolver(Interpreter()).resolve(specialized)
+    plain = measure(specialized, args.repeat)
+
+    start = perf_counter()
+    hoisted = hoist_invariants(statements)
+    hoisting = perf_counter() - start
+    hoisted = specialize_types(hoisted)
+    Resolver(Interpreter()).resolve(hoisted)
+    optimized = measure(hoisted, args.repeat)
+
+    print(f'in the loop  {plain * 1000:8.1f}ms')
+    print(f'hoisted      {optimized * 1000:8.1f}ms ({plain / optimized:.2f}x), hoisting took {hoisting * 1000:.2f}ms')
+
+
+if __name__ == '__main__':
+    main()
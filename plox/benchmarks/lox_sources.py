@@ -0,0 +1,88 @@
+"""
+Synthetic Lox programs for the benchmarks, generated instead of checked in so
+the size can be dialed up to whatever the benchmark needs.
+"""
+
+_UNIT = """\
+// unit {n}: a bit of everything the scanner and parser know about
+var total_{i} = {n};
+var label_{i} = "unit number {n}";
+
+fun helper_{i}(a, b) {{
+  /* block comment
+     over two lines */
+  if (a >= b) {{
+    return a - b * 2.5;
+  }}
+  return (a + b) / 2;
+}}
+
+var counter_{i} = 0;
+while (counter_{i} < 3) {{
+  total_{i} = total_{i} + helper_{i}(counter_{i}, {n});
+  counter_{i} = counter_{i} + 1;
+}}
+
+for (var step = 0; step <= 2; step = step + 1) {{
+  if (step != 1 and total_{i} == total_{i}) print label_{i};
+  else print !true;
+}}
+"""
+
+_EXPRESSION = '(a_{i} + b * 3.25 - (c / d) * -e >= f_{i} - 1) == (g + h * (i_{i} - 2)) != !(j or k_{i})'
+
+_LIBRARY_FUNCTION = """\
+fun lib_{i}(a, b) {{
+  var acc = 0;
+  var step = 0;
+  while (step < a) {{
+    if (step >= b and !(acc == nil)) {{
+      acc = acc + step * 2 - b / 3;
+    }} else {{
+      acc = acc - (step + b) * 1.5;
+    }}
+    step = step + 1;
+  }}
+  return acc * a + b;
+}}
+"""
+
+
+def program(size: int) -> str:
+    """
+    returns a program of roughly `size` bytes made out of repeated units,
+    every identifier is made unique per unit.
+    """
+    units: list[str] = []
+    written = 0
+    i = 0
+    while written < size:
+        unit = _UNIT.format(i=_suffix(i), n=i)
+        units.append(unit)
+        written += len(unit)
+        i += 1
+
+    return ''.join(units)
+
+
+def expressions(count: int) -> str:
+    """
+    returns `count` expression statements, each one a deep mix of every binary
+    and unary operator the parser knows.
+    """
+    return ''.join(f'{_EXPRESSION.format(i=_suffix(i))};\n' for i in range(count))
+
+
+def library(functions: int, calls: int) -> str:
+    """
+    returns `functions` function declarations of a dozen lines each, followed
+    by a call to the first `calls` of them.
+    """
+    declarations = ''.join(_LIBRARY_FUNCTION.format(i=_suffix(i)) for i in range(functions))
+    return declarations + ''.join(f'lib_{_suffix(i)}(3, 1);\n' for i in range(calls))
+
+
+def _suffix(i: int) -> str:
+    # identifiers can't hold digits in lox, so we spell the number with letters,
+    # upper case ones so it never spells a keyword
+    return ''.join(chr(ord('A') + int(digit)) for digit in str(i))
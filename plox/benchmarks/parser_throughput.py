@@ -0,0 +1,47 @@
+"""
+Parser throughput on expression heavy input, tokens are scanned up front so
+only parsing is timed.
+
+    python -m benchmarks.parser_throughput --statements 20000
+"""
+
+import argparse
+from time import perf_counter
+
+from benchmarks.lox_sources import expressions, program
+from src.parser import Parser
+from src.regex_scanner import RegexScanner
+
+
+def measure(source: str, repeat: int) -> tuple[float, int, int]:
+    tokens = RegexScanner(source).scan_tokens()
+    best = float('inf')
+    statements = 0
+    for _ in range(repeat):
+        start = perf_counter()
+        statements = len(Parser(tokens).parse() or [])
+        best = min(best, perf_counter() - start)
+
+    return best, len(tokens), statements
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--statements', type=int, default=20000, help='expression statements to parse')
+    arg_parser.add_argument('--repeat', type=int, default=3, help='best of N runs is reported')
+    args = arg_parser.parse_args()
+
+    inputs = {
+        'expressions': expressions(args.statements),
+        'program': program(args.statements * 100),
+    }
+    for name, source in inputs.items():
+        elapsed, tokens, statements = measure(source, args.repeat)
+        print(
+            f'{name:12} {elapsed:8.3f}s {tokens / elapsed / 1000:8.1f}k tokens/s '
+            f'{statements / elapsed / 1000:8.1f}k statements/s'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""
+Scanner throughput, old character-by-character `Scanner` against `RegexScanner`
+(building `Token`s, or filling a `TokenBuffer`).
+
+    python -m benchmarks.scanner_throughput --size-mb 4
+"""
+
+import argparse
+from collections.abc import Callable
+from time import perf_counter
+from typing import TypeVar
+
+from benchmarks.lox_sources import program
+from src.regex_scanner import RegexScanner
+from src.scanner import Scanner
+
+T = TypeVar('T')
+
+
+def measure(scan: Callable[[str], T], source: str, repeat: int) -> tuple[float, T]:
+    best = float('inf')
+    for _ in range(repeat):
+        start = perf_counter()
+        result = scan(source)
+        best = min(best, perf_counter() - start)
+
+    return best, result
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--size-mb', type=float, default=2.0, help='size of the generated source')
+    arg_parser.add_argument('--repeat', type=int, default=3, help='best of N runs is reported')
+    args = arg_parser.parse_args()
+
+    source = program(int(args.size_mb * 1024 * 1024))
+    size_mb = len(source.encode()) / (1024 * 1024)
+
+    old_time, old_tokens = measure(lambda s: Scanner(s).scan_tokens(), source, args.repeat)
+    new_time, new_tokens = measure(lambda s: RegexScanner(s).scan_tokens(), source, args.repeat)
+    buffer_time, buffer = measure(lambda s: RegexScanner(s).scan_buffer(), source, args.repeat)
+
+    if old_tokens != new_tokens or new_tokens != list(buffer):
+        raise SystemExit('token streams differ, the benchmark is meaningless')
+
+    print(f'source: {size_mb:.2f} MB, {len(new_tokens)} tokens')
+    print(f'Scanner       {old_time:8.3f}s {size_mb / old_time:8.2f} MB/s')
+    print(f'RegexScanner  {new_time:8.3f}s {size_mb / new_time:8.2f} MB/s')
+    print(f'TokenBuffer   {buffer_time:8.3f}s {size_mb / buffer_time:8.2f} MB/s')
+    print(f'speedup       {old_time / new_time:8.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Time a loop heavy and a call heavy program on the tree walking interpreter,
+with and without functions promoted to Python once hot, plus what the
+promotion cost.
+
+    python -m benchmarks.tiering --iterations 100000 --fib 20 --threshold 100
+"""
+
+import argparse
+import io
+from collections.abc import Callable
+from contextlib import redirect_stdout
+from time import perf_counter
+
+from src.ast.stmt.schema import Stmt
+from src.interperter_lib.interpreter import Interpreter
+from src.interperter_lib.tiering import DEFAULT_THRESHOLD, Tiering
+from src.parser import Parser
+from src.regex_scanner import RegexScanner
+from src.resolver import Resolver
+
+# the loop runs in a function called a few times, as it would in a program
+_LOOPS = """\
+fun loop(n) {{
+  var total = 0;
+  var i = 0;
+  while (i < n) {{
+    if (i - (i / 2) * 2 == 0) total = total + i; else total = total - 1;
+    i = i + 1;
+  }}
+  return total;
+}}
+for (var run = 0; run < 10; run = run + 1) loop({iterations} / 10);
+"""
+
+_CALLS = """\
+fun fib(n) {{
+  if (n < 2) return n;
+  return fib(n - 1) + fib(n - 2);
+}}
+print fib({fib});
+"""
+
+
+def best(run: Callable[[], object], repeat: int) -> float:
+    fastest = float('inf')
+    for _ in range(repeat):
+        start = perf_counter()
+        with redirect_stdout(io.StringIO()):
+            run()
+        fastest = min(fastest, perf_counter() - start)
+
+    return fastest
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--iterations', type=int, default=100000, help='iterations of the loop program')
+    arg_parser.add_argument('--fib', type=int, default=20, help='fibonacci number the call program computes')
+    arg_parser.add_argument('--threshold', type=int, default=DEFAULT_THRESHOLD, help='calls making a function hot')
+    arg_parser.add_argument('--repeat', type=int, default=3, help='best of N runs is reported')
+    args = arg_parser.parse_args()
+
+    programs = {'loops': _LOOPS.format(iterations=args.iterations), 'calls': _CALLS.format(fib=args.fib)}
+    for name, source in programs.items():
+        statements: list[Stmt] = Parser(RegexScanner(source).scan_buffer()).parse() or []
+        Resolver(Interpreter()).resolve(statements)
+
+        tree = best(lambda: Interpreter().interpret(statements), args.repeat)
+        # a fresh `Tiering` every run, each pays for promoting again
+        tierings: list[Tiering] = []
+
+        def tiered() -> None:
+            tierings.append(Tiering(args.threshold))
+            Interpreter(tierings[-1]).interpret(statements)
+
+        compiled = best(tiered, args.repeat)
+        promoted = [profile for profile in tierings[-1].profiles.values() if profile.compiled]
+        promoting = sum(profile.seconds for profile in promoted)
+        print(
+            f'{name}  tree {tree * 1000:8.1f}ms  tiered {compiled * 1000:8.1f}ms ({tree / compiled:.2f}x), '
+            f'{len(promoted)} promoted in {promoting * 1000:.2f}ms'
+        )
+
+
+if __name__ == '__main__':
+    main()
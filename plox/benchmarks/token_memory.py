@@ -0,0 +1,48 @@
+"""
+Memory held per token, a `list[Token]` against a `TokenBuffer`.
+
+    python -m benchmarks.token_memory --size-mb 2
+"""
+
+import argparse
+import tracemalloc
+from collections.abc import Callable
+from typing import TypeVar
+
+from benchmarks.lox_sources import program
+from src.regex_scanner import RegexScanner
+
+T = TypeVar('T')
+
+
+def traced(build: Callable[[], T]) -> tuple[int, T]:
+    tracemalloc.start()
+    try:
+        result = build()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return size, result
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--size-mb', type=float, default=1.0, help='size of the generated source')
+    args = arg_parser.parse_args()
+
+    source = program(int(args.size_mb * 1024 * 1024))
+    scanner = RegexScanner(source)
+
+    list_size, tokens = traced(scanner.scan_tokens)
+    buffer_size, buffer = traced(scanner.scan_buffer)
+    count = len(buffer)
+    assert count == len(tokens)
+
+    print(f'{count} tokens')
+    print(f'list[Token]  {list_size / count:8.1f} bytes/token')
+    print(f'TokenBuffer  {buffer_size / count:8.1f} bytes/token')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Time a loop heavy and a call heavy program on the tree walking interpreter
+and translated to Python, plus how long translating and compiling the
+module took.
+
+    python -m benchmarks.transpiler --iterations 100000 --fib 20
+"""
+
+import argparse
+import io
+from collections.abc import Callable
+from contextlib import redirect_stdout
+from time import perf_counter
+
+from src.ast.stmt.schema import Stmt
+from src.interperter_lib.interpreter import Interpreter
+from src.parser import Parser
+from src.regex_scanner import RegexScanner
+from src.resolver import Resolver
+from src.transpiler import transpile
+
+_LOOPS = """\
+fun loop(n) {{
+  var total = 0;
+  var i = 0;
+  while (i < n) {{
+    if (i - (i / 2) * 2 == 0) total = total + i; else total = total - 1;
+    i = i + 1;
+  }}
+  return total;
+}}
+print loop({iterations});
+"""
+
+_CALLS = """\
+fun fib(n) {{
+  if (n < 2) return n;
+  return fib(n - 1) + fib(n - 2);
+}}
+print fib({fib});
+"""
+
+
+def best(run: Callable[[], object], repeat: int) -> float:
+    fastest = float('inf')
+    for _ in range(repeat):
+        start = perf_counter()
+        with redirect_stdout(io.StringIO()):
+            run()
+        fastest = min(fastest, perf_counter() - start)
+
+    return fastest
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--iterations', type=int, default=100000, help='iterations of the loop program')
+    arg_parser.add_argument('--fib', type=int, default=20, help='fibonacci number the call program computes')
+    arg_parser.add_argument('--repeat', type=int, default=3, help='best of N runs is reported')
+    args = arg_parser.parse_args()
+
+    programs = {'loops': _LOOPS.format(iterations=args.iterations), 'calls': _CALLS.format(fib=args.fib)}
+    for name, source in programs.items():
+        statements: list[Stmt] = Parser(RegexScanner(source).scan_buffer()).parse() or []
+        Resolver(Interpreter()).resolve(statements)
+
+        start = perf_counter()
+        code = compile(transpile(statements, name), name, 'exec')
+        translating = perf_counter() - start
+        # not run as __main__, `main` is called by hand
+        module: dict[str, object] = {'__name__': name}
+        exec(code, module)
+        run = module['main']
+        assert callable(run)
+
+        tree = best(lambda: Interpreter().interpret(statements), args.repeat)
+        python = best(run, args.repeat)
+        print(
+            f'{name}  tree {tree * 1000:8.1f}ms  python {python * 1000:8.1f}ms ({tree / python:.2f}x), '
+            f'translated and compiled in {translating * 1000:.2f}ms'
+        )
+
+
+if __name__ == '__main__':
+    main()
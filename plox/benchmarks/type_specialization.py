@@ -0,0 +1,72 @@
+"""
+Time an arithmetic-heavy loop with and without the operators type inference
+proved the operand types of specialized, plus the time the pass takes.
+
+    python -m benchmarks.type_specialization --iterations 20000
+"""
+
+import argparse
+import io
+from contextlib import redirect_stdout
+from time import perf_counter
+
+from src.ast.stmt.schema import Stmt
+from src.interperter_lib.interpreter import Interpreter
+from src.optimizer.type_inference import specialize_types
+from src.parser import Parser
+from src.regex_scanner import RegexScanner
+from src.resolver import Resolver
+
+_PROGRAM = """\
+fun loop() {{
+  var total = 0;
+  var squares = 0;
+  var label = "";
+  var i = 0;
+  while (i < {iterations}) {{
+    total = total + i * 2 - i / 4;
+    if (i - total < squares) squares = squares + i * i;
+    if (i == 0) label = label + "start";
+    i = i + 1;
+  }}
+  print total;
+  print squares;
+  print label;
+}}
+loop();
+"""
+
+
+def measure(statements: list[Stmt], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = perf_counter()
+        with redirect_stdout(io.StringIO()):
+            Interpreter().interpret(statements)
+        best = min(best, perf_counter() - start)
+
+    return best
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--iterations', type=int, default=20000, help='loop iterations')
+    arg_parser.add_argument('--repeat', type=int, default=3, help='best of N runs is reported')
+    args = arg_parser.parse_args()
+
+    statements = Parser(RegexScanner(_PROGRAM.format(iterations=args.iterations)).scan_buffer()).parse() or []
+    Resolver(Interpreter()).resolve(statements)
+    plain = measure(statements, args.repeat)
+
+    start = perf_counter()
+    specialized = specialize_types(statements)
+    inference = perf_counter() - start
+    Resolver(Interpreter()).resolve(specialized)
+    optimized = measure(specialized, args.repeat)
+
+    print(f'checked      {plain * 1000:8.1f}ms')
+    print(f'specialized  {optimized * 1000:8.1f}ms ({plain / optimized:.2f}x), inference took {inference * 1000:.2f}ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Cost of reading and writing a variable in the tree walking interpreter: a
+local of the innermost block, one a few blocks up, and a global. Each case is
+a loop doing the same accesses, timed against the loop with nothing in it.
+
+    python -m benchmarks.variable_access --iterations 20000
+"""
+
+import argparse
+import io
+from contextlib import redirect_stdout
+from time import perf_counter
+
+from src.interperter_lib.interpreter import Interpreter
+from src.parser import Parser
+from src.regex_scanner import RegexScanner
+from src.resolver import Resolver
+
+ACCESSES = 20
+
+# {body} runs `iterations` times in a block of its own, `x` is declared
+# wherever the case needs it
+_LOOP = """\
+{globals}
+{{
+  var i = 0;
+  {outer}
+  while (i < {iterations}) {{
+    {{ {{ {{
+      {inner}
+      {body}
+    }} }} }}
+    i = i + 1;
+  }}
+}}
+"""
+
+CASES = {
+    # name: (where x is declared, what is done with it)
+    'local read': ('inner', 'x;'),
+    'local write': ('inner', 'x = 1;'),
+    'depth 3 read': ('outer', 'x;'),
+    'depth 3 write': ('outer', 'x = 1;'),
+    'global read': ('globals', 'x;'),
+    'global write': ('globals', 'x = 1;'),
+}
+
+
+def source(where: str, access: str, iterations: int) -> str:
+    declarations = {'globals': '', 'outer': '', 'inner': ''}
+    declarations[where] = 'var x = 0;'
+    return _LOOP.format(iterations=iterations, body=' '.join([access] * ACCESSES), **declarations)
+
+
+def measure(code: str, repeat: int) -> float:
+    statements = Parser(RegexScanner(code).scan_buffer()).parse() or []
+    interpreter = Interpreter()
+    Resolver(interpreter).resolve(statements)
+    best = float('inf')
+    for _ in range(repeat):
+        start = perf_counter()
+        with redirect_stdout(io.StringIO()):
+            interpreter.interpret(statements)
+        best = min(best, perf_counter() - start)
+
+    return best
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--iterations', type=int, default=20000, help='loop iterations per case')
+    arg_parser.add_argument('--repeat', type=int, default=3, help='best of N runs is reported')
+    args = arg_parser.parse_args()
+
+    accesses = args.iterations * ACCESSES
+    for name, (where, access) in CASES.items():
+        empty = measure(source(where, '', args.iterations), args.repeat)
+        elapsed = measure(source(where, access, args.iterations), args.repeat)
+        print(f'{name:14} {(elapsed - empty) / accesses * 1e9:8.1f} ns/access')
+
+
+if __name__ == '__main__':
+    main()
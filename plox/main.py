@@ -1,27 +1,300 @@
+import argparse
+import os
 import sys
+import time
+from typing import TextIO
 
+from src.bytecode.compiler import Compiler
+from src.bytecode.disassembler import disassemble
+from src.bytecode.vm import VM
+from src.cache import AstCache
+from src.incremental import IncrementalProgram
+from src.interperter_lib.closure_compiler import ClosureInterpreter
 from src.interperter_lib.interpreter import Interpreter
+from src.interperter_lib.tiering import DEFAULT_THRESHOLD, Tiering
+from src.optimizer.inlining import DEFAULT_BUDGET
+from src.optimizer.pipeline import LEVELS, Pipeline, pipeline
 from src.parser import Parser
+from src.regex_scanner import RegexScanner, scan_file
 from src.resolver import Resolver
-from src.scanner import Scanner
+from src.transpiler import transpile
+from src.visitors.ast_dumper import DUMPERS, AstDumper
 from src.visitors.ast_printer import AstPrinter
 
-if __name__ == '__main__':
-    argv = sys.argv
-    if len(argv) != 2:
-        raise ValueError('you can only provide a file for now')
-
-    with open(argv[1], 'r') as f:
-        scanner = Scanner(f.read())
-        tokens = scanner.scan_tokens()
-        parser = Parser(tokens)
+# what runs the resolved program, all of them have an `interpret(statements)`
+ENGINES = {'tree': Interpreter, 'closure': ClosureInterpreter, 'vm': VM}
+
+
+def run(
+    path: str,
+    cache: AstCache | None = None,
+    lazy: bool = False,
+    dumper: AstDumper | None = None,
+    optimizer: Pipeline | None = None,
+    engine: str = 'tree',
+    listing: TextIO | None = None,
+    tiering: Tiering | None = None,
+) -> None:
+    with open(path, 'rb') as f:
+        source = f.read()
+
+    # lazy bodies hang on to the token buffer, they aren't worth caching
+    if lazy:
+        cache = None
+
+    interpreter = Interpreter(tiering)
+    statements = cache.load(source) if cache else None
+    if statements:
+        # a hit skips scanning, parsing and resolving altogether
+        if dumper:
+            dumper.dump(statements)
+    else:
+        scanner = RegexScanner(source.decode())
+        tokens = scanner.scan_buffer()
+        parser = Parser(tokens, lazy=lazy)
         statements = parser.parse()
 
         if not statements:
             raise ValueError('Dude, something went wrong')
 
-        print(AstPrinter().print(statements))
-        interpreter = Interpreter()
         resolver = Resolver(interpreter)
         resolver.resolve(statements)
-        interpreter.interpret(statements)
+        if optimizer:
+            # the passes rebuild the tree, slots and cells have to be worked out again
+            statements = optimizer.run(statements)
+            Resolver(interpreter).resolve(statements)
+        # what is dumped is what runs, as a cache hit would
+        if dumper:
+            dumper.dump(statements)
+        if cache:
+            cache.store(source, statements)
+
+    if listing:
+        disassemble(Compiler().compile(statements), listing)
+    # the resolver only annotates the tree, any engine can run it
+    runner = interpreter if engine == 'tree' else ENGINES[engine]()
+    runner.interpret(statements)
+
+
+def run_streaming(
+    path: str,
+    dumper: AstDumper | None = None,
+    optimizer: Pipeline | None = None,
+    engine: str = 'tree',
+    listing: TextIO | None = None,
+    tiering: Tiering | None = None,
+) -> None:
+    # tokens are scanned out of a mmap of the file as the parser asks for them,
+    # and every top level declaration runs as soon as it has been parsed
+    parser = Parser(scan_file(path))
+    interpreter = Interpreter(tiering)
+    resolver = Resolver(interpreter)
+    runner = interpreter if engine == 'tree' else ENGINES[engine]()
+    for statement in parser.parse_iter():
+        resolver.resolve([statement])
+        statements = [statement]
+        if optimizer:
+            # a declaration at a time, only what it holds can be folded and
+            # inlined, functions declared before are out of sight
+            statements = optimizer.run(statements)
+            Resolver(interpreter).resolve(statements)
+        if dumper:
+            dumper.dump(statements)
+        if listing:
+            disassemble(Compiler().compile(statements), listing)
+        runner.interpret(statements)
+
+
+def compile_to_python(path: str, output: str, optimizer: Pipeline | None = None) -> None:
+    # ahead of time, the whole file is parsed and resolved, lazy bodies would
+    # have nothing to wait for
+    with open(path, 'r') as f:
+        source = f.read()
+
+    statements = Parser(RegexScanner(source).scan_buffer()).parse()
+    if not statements:
+        raise ValueError('Dude, something went wrong')
+
+    interpreter = Interpreter()
+    Resolver(interpreter).resolve(statements)
+    if optimizer:
+        statements = optimizer.run(statements)
+        Resolver(interpreter).resolve(statements)
+
+    with open(output, 'w') as f:
+        f.write(transpile(statements, os.path.basename(path)))
+
+
+def add_levels(arg_parser: argparse.ArgumentParser) -> None:
+    # -O0, -O1 and -O2 are flags of their own, so a bare -O can't take the
+    # file after it for its level
+    levels = arg_parser.add_mutually_exclusive_group()
+    helps = {
+        0: 'no optimization (the default)',
+        1: 'fold constants, hoist loop invariants, drop dead code and specialize typed operators',
+        2: 'inline small functions too',
+    }
+    for level in LEVELS:
+        levels.add_argument(f'-O{level}', dest='level', action='store_const', const=level, help=helps[level])
+    levels.add_argument('-O', dest='level', action='store_const', const=1, help='same as -O1')
+    arg_parser.set_defaults(level=0)
+
+
+def compile_command(argv: list[str]) -> None:
+    arg_parser = argparse.ArgumentParser(
+        prog='plox compile', description='translate a lox script into a python module that runs on its own'
+    )
+    arg_parser.add_argument('file', help='lox script to translate')
+    arg_parser.add_argument('-o', dest='output', help='python module to write (default: the script with a .py suffix)')
+    add_levels(arg_parser)
+    arg_parser.add_argument(
+        '--inline-budget', type=int, default=DEFAULT_BUDGET, metavar='NODES', help='with -O2, as when running it'
+    )
+    args = arg_parser.parse_args(argv)
+    output = args.output or f'{os.path.splitext(args.file)[0]}.py'
+    optimizer = pipeline(args.level, args.inline_budget) if args.level else None
+    compile_to_python(args.file, output, optimizer)
+
+
+def watch(path: str, interval: float = 0.1) -> None:
+    # polls the file, on every change only the edited declarations are
+    # re-scanned and re-parsed, then the whole program is resolved and dumped
+    program: IncrementalProgram | None = None
+    last_change: int | None = None
+    while True:
+        change = os.stat(path).st_mtime_ns
+        if change == last_change:
+            time.sleep(interval)
+            continue
+        last_change = change
+
+        with open(path, 'r') as f:
+            source = f.read()
+
+        try:
+            start = time.perf_counter()
+            if program is None:
+                program = IncrementalProgram(source)
+            else:
+                program.update(source)
+            parsed = time.perf_counter()
+            Resolver(Interpreter()).resolve(program.statements)
+            resolved = time.perf_counter()
+        except Exception as e:
+            print(f'error: {e}')
+            continue
+
+        print(AstPrinter().print(program.statements))
+        print(
+            f'-- {len(program.statements)} declarations ({program.reused} reused), '
+            f'parsed in {(parsed - start) * 1000:.1f}ms, resolved in {(resolved - parsed) * 1000:.1f}ms'
+        )
+
+
+if __name__ == '__main__':
+    # `plox compile foo.lox -o foo.py` translates instead of running
+    if sys.argv[1:2] == ['compile']:
+        compile_command(sys.argv[2:])
+        sys.exit()
+
+    arg_parser = argparse.ArgumentParser(prog='plox')
+    arg_parser.add_argument('file', help='lox script to run')
+    arg_parser.add_argument(
+        '--stream',
+        action='store_true',
+        help='scan and parse the file lazily and run each declaration once parsed, --dump-ast and --disassemble '
+        'show one declaration at a time',
+    )
+    arg_parser.add_argument(
+        '--watch',
+        action='store_true',
+        help='keep re-parsing the file as it changes, only the edited declarations are parsed again',
+    )
+    arg_parser.add_argument(
+        '--dump-ast', action='store_true', help='write the AST to stdout before running it, once optimized with -O'
+    )
+    arg_parser.add_argument(
+        '--ast-format',
+        choices=DUMPERS,
+        default='sexpr',
+        help='format of --dump-ast: S-expressions (the default), JSON lines or indented',
+    )
+    arg_parser.add_argument(
+        '--lazy',
+        action='store_true',
+        help='parse and resolve function bodies on their first call, errors in them show up only then',
+    )
+    add_levels(arg_parser)
+    arg_parser.add_argument(
+        '--time-passes',
+        action='store_true',
+        help='write how long every optimizer pass took and the nodes it left to stderr',
+    )
+    arg_parser.add_argument(
+        '--inline-budget',
+        type=int,
+        default=DEFAULT_BUDGET,
+        metavar='NODES',
+        help=f'with -O2, inline functions whose body has at most NODES AST nodes, 0 turns inlining off '
+        f'(default {DEFAULT_BUDGET})',
+    )
+    arg_parser.add_argument(
+        '--engine',
+        choices=ENGINES,
+        default='tree',
+        help='what runs the program: the tree walking interpreter (the default), closure, which compiles the '
+        'tree into Python closures first, or vm, which compiles it to bytecode for a stack machine',
+    )
+    arg_parser.add_argument(
+        '--disassemble',
+        action='store_true',
+        help='write the bytecode the program compiles to to stdout before running it, once optimized with -O',
+    )
+    arg_parser.add_argument(
+        '--tier',
+        dest='threshold',
+        type=int,
+        nargs='?',
+        const=DEFAULT_THRESHOLD,
+        default=0,
+        metavar='CALLS',
+        help=f'with the tree engine, compile functions to Python once called CALLS times (default {DEFAULT_THRESHOLD}) '
+        'or their loops ran ten times that',
+    )
+    arg_parser.add_argument(
+        '--tier-stats',
+        action='store_true',
+        help='write the functions --tier compiled and how long it took to stderr',
+    )
+    arg_parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='always parse the file, parsed programs are cached under $PLOX_CACHE_DIR (default ~/.cache/plox)',
+    )
+    args = arg_parser.parse_args()
+    dumper = DUMPERS[args.ast_format](sys.stdout) if args.dump_ast else None
+    listing = sys.stdout if args.disassemble else None
+    optimizer = pipeline(args.level, args.inline_budget, counted=args.time_passes) if args.level else None
+    if args.threshold and args.engine != 'tree':
+        arg_parser.error('--tier only works with the tree engine')
+    tiering = Tiering(args.threshold) if args.threshold else None
+
+    if args.watch:
+        try:
+            watch(args.file)
+        except KeyboardInterrupt:
+            pass
+    else:
+        try:
+            if args.stream:
+                run_streaming(args.file, dumper, optimizer, args.engine, listing, tiering)
+            else:
+                variant = '' if not args.level else f'-O{args.level}' if args.level < 2 else f'-O2-{args.inline_budget}'
+                cache = None if args.no_cache else AstCache(variant=variant)
+                run(args.file, cache, args.lazy, dumper, optimizer, args.engine, listing, tiering)
+        finally:
+            # a program that fails still went through the passes
+            if optimizer and args.time_passes:
+                optimizer.report(sys.stderr)
+            if tiering and args.tier_stats:
+                tiering.report(sys.stderr)
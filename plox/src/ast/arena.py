@@ -0,0 +1,352 @@
+import sys
+from array import array
+from collections.abc import Callable, Iterable
+from enum import IntEnum, auto
+from typing import final
+
+from src.ast.expr.schema import Assign, Binary, Call, Expr, FuncExpr, Grouping, Literal, Logical, Unary, Variable
+from src.ast.stmt.schema import Block, Expression, For, FuncStmt, IfStmt, Print, ReturnStmt, Stmt, Var, While
+from src.symbols import SymbolTable
+from src.token_buffer import TOKEN_TYPES, TYPE_CODES, UINT32
+from src.tokens import Token
+
+
+class Field(IntEnum):
+    # how a node field is stored in its slot
+    NODE = auto()  # node index, -1 for None
+    TOKEN = auto()  # token index
+    NODES = auto()  # start of a list of node indexes in `lists`
+    TOKENS = auto()  # start of a list of token indexes in `lists`
+    CONSTANT = auto()  # index in `constants`
+    RESOLVED = auto()  # an access, slot, flag or type from the resolver or the optimizer, -1 for None
+    INTS = auto()  # start of a list of ints from the resolver in `lists`
+
+
+# node class -> visitor method and its fields in declaration order, field i
+# lives in slot i. The kind of a node is its class' position in this table.
+SCHEMA: dict[type, tuple[str, tuple[tuple[str, Field], ...]]] = {
+    Assign: (
+        'visitAssign',
+        (('name', Field.TOKEN), ('expr', Field.NODE), ('access', Field.RESOLVED), ('slot', Field.RESOLVED)),
+    ),
+    Logical: ('visitLogical', (('left', Field.NODE), ('operator', Field.TOKEN), ('right', Field.NODE))),
+    Binary: (
+        'visitBinary',
+        (('left', Field.NODE), ('operator', Field.TOKEN), ('right', Field.NODE), ('operands', Field.RESOLVED)),
+    ),
+    Unary: ('visitUnary', (('operator', Field.TOKEN), ('right', Field.NODE), ('operand', Field.RESOLVED))),
+    Call: ('visitCall', (('callee', Field.NODE), ('paren', Field.TOKEN), ('args', Field.NODES))),
+    Grouping: ('visitGrouping', (('expression', Field.NODE),)),
+    FuncExpr: (
+        'visitFuncExpr',
+        (('args', Field.TOKENS), ('stmts', Field.NODES), ('cells', Field.INTS), ('upvalues', Field.INTS)),
+    ),
+    Literal: ('visitLiteral', (('value', Field.CONSTANT),)),
+    Variable: ('visitVariable', (('name', Field.TOKEN), ('access', Field.RESOLVED), ('slot', Field.RESOLVED))),
+    Expression: ('visitExpression', (('expression', Field.NODE),)),
+    IfStmt: ('visitIfStmt', (('condition', Field.NODE), ('then_branch', Field.NODE), ('else_branch', Field.NODE))),
+    Print: ('visitPrint', (('expression', Field.NODE),)),
+    FuncStmt: (
+        'visitFuncStmt',
+        (
+            ('name', Field.TOKEN),
+            ('args', Field.TOKENS),
+            ('body', Field.NODES),
+            ('access', Field.RESOLVED),
+            ('slot', Field.RESOLVED),
+            ('cells', Field.INTS),
+            ('upvalues', Field.INTS),
+        ),
+    ),
+    Var: (
+        'visitVarStmt',
+        (('name', Field.TOKEN), ('initializer', Field.NODE), ('access', Field.RESOLVED), ('slot', Field.RESOLVED)),
+    ),
+    Block: ('visitBlock', (('statements', Field.NODES), ('frame', Field.RESOLVED))),
+    While: ('visitWhile', (('condition', Field.NODE), ('statement', Field.NODE))),
+    For: (
+        'visitFor',
+        (
+            ('initializer', Field.NODE),
+            ('condition', Field.NODE),
+            ('increment', Field.NODE),
+            ('body', Field.NODE),
+            ('frame', Field.RESOLVED),
+            ('counted', Field.RESOLVED),
+        ),
+    ),
+    ReturnStmt: ('visitReturnStmt', (('keyword', Field.TOKEN), ('value', Field.NODE))),
+}
+NODE_TYPES = tuple(SCHEMA)
+# slots per node, enough for the class with the most fields
+WIDTH = max(len(fields) for _, fields in SCHEMA.values())
+KIND_CODES = {node_type: kind for kind, node_type in enumerate(NODE_TYPES)}
+
+
+@final
+class Arena:
+    """
+    Flat AST: every node is a row of small integers in typed arrays instead of
+    an object, its kind plus `WIDTH` slots holding child node indexes,
+    token indexes, constant indexes or the start of a list in `lists` (a count
+    followed by the items). Tokens are rows as well, their lexemes interned in
+    the arena's own `names`.
+
+    Nodes are stored children first, so every child has a lower index than its
+    parent and the tree can be rebuilt in one pass without recursion. Arrays
+    pickle as plain bytes, which makes an arena cheap to hold and to cache.
+
+    `to_ast` rebuilds the `Expr`/`Stmt` objects, `views` hands out objects
+    that read the arena on attribute access and `accept` visitors like the
+    real nodes do, so the `Resolver`, `Interpreter` and `AstPrinter` run over
+    an arena as is.
+    """
+
+    def __init__(self) -> None:
+        self.kinds = array('B')
+        self.slots = tuple(array('i') for _ in range(WIDTH))
+        self.lists = array('i')
+        self.constants: list[object] = []
+        self.token_types = array('B')
+        self.token_names = array('i')
+        self.token_lines = array(UINT32)
+        # literal of a token as an index in `constants`, -1 for None
+        self.token_literals = array('i')
+        self.names = SymbolTable()
+        # the top level statements
+        self.roots = array('i')
+
+    @classmethod
+    def from_ast(cls, statements: Iterable[Stmt], ids: dict[int, int] | None = None) -> 'Arena':
+        """
+        `ids`, if given, gets the node index of every converted object keyed
+        by the object's `id`. Lazy function bodies are parsed on the way.
+        """
+        arena = cls()
+        builder = _Builder(arena, {} if ids is None else ids)
+        for statement in statements:
+            arena.roots.append(builder.node(statement))
+
+        return arena
+
+    def to_ast(self, nodes: list[Expr | Stmt] | None = None) -> list[Stmt]:
+        """`nodes`, if given, gets the object built for every node index."""
+        built: list[Expr | Stmt] = [] if nodes is None else nodes
+        # the same objects the scanner hands out, it `sys.intern`s its names too
+        names = [sys.intern(name) for name in self.names.names]
+        tokens = [
+            Token(TOKEN_TYPES[token_type], names[name], self.constants[literal] if literal >= 0 else None, line)
+            for token_type, name, literal, line in zip(
+                self.token_types, self.token_names, self.token_literals, self.token_lines
+            )
+        ]
+        lists = self.lists
+        constants = self.constants
+
+        def decode(field: Field, value: int) -> object:
+            match field:
+                case Field.NODE:
+                    return built[value] if value >= 0 else None
+                case Field.TOKEN:
+                    return tokens[value]
+                case Field.NODES:
+                    return tuple(built[i] for i in lists[value + 1 : value + 1 + lists[value]])
+                case Field.TOKENS:
+                    return tuple(tokens[i] for i in lists[value + 1 : value + 1 + lists[value]])
+                case Field.INTS:
+                    return tuple(lists[value + 1 : value + 1 + lists[value]])
+                case Field.RESOLVED:
+                    return value if value >= 0 else None
+
+            return constants[value]
+
+        for i, kind in enumerate(self.kinds):
+            node_type = NODE_TYPES[kind]
+            _, fields = SCHEMA[node_type]
+            built.append(node_type(*(decode(field, slot[i]) for (_, field), slot in zip(fields, self.slots))))
+
+        return [built[root] for root in self.roots]
+
+    def views(self) -> list[Stmt]:
+        return [self.view(root) for root in self.roots]
+
+    def view(self, i: int) -> 'NodeView':
+        return _VIEW_TYPES[self.kinds[i]](self, i)
+
+    def token(self, i: int) -> Token:
+        literal = self.token_literals[i]
+        return Token(
+            TOKEN_TYPES[self.token_types[i]],
+            self.names.names[self.token_names[i]],
+            self.constants[literal] if literal >= 0 else None,
+            self.token_lines[i],
+        )
+
+    def items(self, start: int) -> array:
+        return self.lists[start + 1 : start + 1 + self.lists[start]]
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def nbytes(self) -> int:
+        """memory held by the arrays, constants and names not included"""
+        arrays = (
+            self.kinds,
+            *self.slots,
+            self.lists,
+            self.token_types,
+            self.token_names,
+            self.token_lines,
+            self.token_literals,
+            self.roots,
+        )
+        return sum(len(a) * a.itemsize for a in arrays)
+
+
+@final
+class _Builder:
+    def __init__(self, arena: Arena, ids: dict[int, int]) -> None:
+        self.arena = arena
+        self.ids = ids
+        self.constants: dict[tuple[type, object], int] = {}
+
+    def node(self, node: Expr | Stmt) -> int:
+        arena = self.arena
+        _, fields = SCHEMA[type(node)]
+        values = [self.field(field, getattr(node, name)) for name, field in fields]
+        values.extend([-1] * (WIDTH - len(values)))
+
+        i = len(arena.kinds)
+        arena.kinds.append(KIND_CODES[type(node)])
+        for slot, value in zip(arena.slots, values):
+            slot.append(value)
+        self.ids[id(node)] = i
+
+        return i
+
+    def field(self, field: Field, value: object) -> int:
+        match field:
+            case Field.NODE:
+                return -1 if value is None else self.node(value)
+            case Field.TOKEN:
+                return self.token(value)
+            case Field.NODES:
+                return self.add_list([self.node(item) for item in value])
+            case Field.TOKENS:
+                return self.add_list([self.token(item) for item in value])
+            case Field.INTS:
+                return self.add_list(list(value))
+            case Field.RESOLVED:
+                return -1 if value is None else value
+
+        return self.constant(value)
+
+    def add_list(self, items: list[int]) -> int:
+        lists = self.arena.lists
+        start = len(lists)
+        lists.append(len(items))
+        lists.extend(items)
+
+        return start
+
+    def token(self, token: Token) -> int:
+        arena = self.arena
+        arena.token_types.append(TYPE_CODES[token.type])
+        arena.token_names.append(arena.names.intern(token.lexem))
+        arena.token_literals.append(-1 if token.literal is None else self.constant(token.literal))
+        arena.token_lines.append(token.line)
+
+        return len(arena.token_types) - 1
+
+    def constant(self, value: object) -> int:
+        # 1.0 == True, the type is part of the key, and -0.0 == 0.0, a float's repr keeps the sign
+        key = (type(value), repr(value) if isinstance(value, float) else value)
+        i = self.constants.get(key)
+        if i is None:
+            i = self.constants[key] = len(self.arena.constants)
+            self.arena.constants.append(value)
+
+        return i
+
+
+class NodeView:
+    """
+    Stand in for the node at `index` of `arena`, two views of the same node
+    are equal (and hash the same). The fields the `Resolver` annotates nodes
+    with (accesses, slots, frames, cells, upvalues) are properties that write
+    to the arena, so it resolves a program of views as it does real nodes.
+    """
+
+    __slots__ = ('arena', 'index')
+
+    def __init__(self, arena: Arena, index: int) -> None:
+        self.arena = arena
+        self.index = index
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, NodeView) and other.arena is self.arena and other.index == self.index
+
+    def __hash__(self) -> int:
+        return hash((id(self.arena), self.index))
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({self.index})'
+
+
+def _reader(field: Field, slot: int) -> Callable[[NodeView], object]:
+    def read(view: NodeView) -> object:
+        arena = view.arena
+        value = arena.slots[slot][view.index]
+        match field:
+            case Field.NODE:
+                return arena.view(value) if value >= 0 else None
+            case Field.TOKEN:
+                return arena.token(value)
+            case Field.NODES:
+                return tuple(arena.view(i) for i in arena.items(value))
+            case Field.TOKENS:
+                return tuple(arena.token(i) for i in arena.items(value))
+            case Field.INTS:
+                return tuple(arena.items(value))
+            case Field.RESOLVED:
+                return value if value >= 0 else None
+
+        return arena.constants[value]
+
+    return read
+
+
+def _resolved_writer(field: Field, slot: int) -> Callable[[NodeView, object], None]:
+    # the resolver sets its results through views too, a new list is added
+    # for ints, the old one is left unused
+    def write(view: NodeView, value: object) -> None:
+        arena = view.arena
+        if field == Field.INTS:
+            assert isinstance(value, tuple)
+            stored = len(arena.lists)
+            arena.lists.append(len(value))
+            arena.lists.extend(value)
+        else:
+            assert value is None or isinstance(value, int)
+            stored = -1 if value is None else value
+        arena.slots[slot][view.index] = stored
+
+    return write
+
+
+def _view_type(node_type: type) -> type[NodeView]:
+    visit, fields = SCHEMA[node_type]
+    namespace: dict[str, object] = {'__slots__': ()}
+    for slot, (name, field) in enumerate(fields):
+        resolved = field in (Field.RESOLVED, Field.INTS)
+        namespace[name] = property(_reader(field, slot), _resolved_writer(field, slot) if resolved else None)
+
+    def accept(self: NodeView, visitor: object) -> object:
+        return getattr(visitor, visit)(self)
+
+    namespace['accept'] = accept
+    base = Expr if issubclass(node_type, Expr) else Stmt
+    return type(f'{node_type.__name__}View', (NodeView, base), namespace)
+
+
+_VIEW_TYPES = tuple(_view_type(node_type) for node_type in NODE_TYPES)
@@ -1,7 +1,8 @@
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
+from dataclasses import field
 from typing import TYPE_CHECKING, final
 
+from src.ast.node import node
 from src.tokens import Token
 
 from .visitor import T
@@ -9,25 +10,33 @@ from .visitor import Visitor as ExprVisitor
 
 if TYPE_CHECKING:
     from src.ast.stmt.schema import Stmt
+    from src.environment import Access
+    from src.interperter_lib.semantics import Type
+    from src.parser import LazyBody
 
 
 class Expr(ABC):
+    __slots__ = ()
+
     @abstractmethod
     def accept(self, visitor: ExprVisitor[T]) -> T: ...
 
 
 @final
-@dataclass(frozen=True)
+@node
 class Assign(Expr):
     name: Token
     expr: Expr
+    # set by the resolver, see `Variable`
+    access: 'Access | None' = field(default=None, compare=False, repr=False)
+    slot: int | None = field(default=None, compare=False, repr=False)
 
     def accept(self, visitor: ExprVisitor[T]) -> T:
         return visitor.visitAssign(self)
 
 
 @final
-@dataclass(frozen=True)
+@node
 class Logical(Expr):
     left: Expr
     operator: Token
@@ -38,39 +47,43 @@ class Logical(Expr):
 
 
 @final
-@dataclass(frozen=True)
+@node
 class Binary(Expr):
     left: Expr
     operator: Token
     right: Expr
+    # set by type inference when both operands are always of that type
+    operands: 'Type | None' = field(default=None, compare=False, repr=False)
 
     def accept(self, visitor: ExprVisitor[T]) -> T:
         return visitor.visitBinary(self)
 
 
 @final
-@dataclass(frozen=True)
+@node
 class Unary(Expr):
     operator: Token
     right: Expr
+    # see `Binary.operands`
+    operand: 'Type | None' = field(default=None, compare=False, repr=False)
 
     def accept(self, visitor: ExprVisitor[T]) -> T:
         return visitor.visitUnary(self)
 
 
 @final
-@dataclass(frozen=True)
+@node
 class Call(Expr):
     callee: Expr
     paren: Token
-    args: list[Expr]
+    args: tuple[Expr, ...]
 
     def accept(self, visitor: ExprVisitor[T]) -> T:
         return visitor.visitCall(self)
 
 
 @final
-@dataclass(frozen=True)
+@node
 class Grouping(Expr):
     expression: Expr
 
@@ -79,17 +92,22 @@ class Grouping(Expr):
 
 
 @final
-@dataclass(frozen=True)
+@node
 class FuncExpr(Expr):
-    args: list[Token]
-    stmts: list['Stmt']
+    args: tuple[Token, ...]
+    stmts: 'tuple[Stmt, ...] | LazyBody'
+    # set by the resolver: the args captured by a nested function, and where
+    # the closure's cells come from when it's made, a slot of the enclosing
+    # frame or `-1 - i` for cell i of the enclosing closure
+    cells: tuple[int, ...] = field(default=(), compare=False, repr=False)
+    upvalues: tuple[int, ...] = field(default=(), compare=False, repr=False)
 
     def accept(self, visitor: ExprVisitor[T]) -> T:
         return visitor.visitFuncExpr(self)
 
 
 @final
-@dataclass(frozen=True)
+@node
 class Literal(Expr):
     value: object
 
@@ -98,9 +116,14 @@ class Literal(Expr):
 
 
 @final
-@dataclass(frozen=True)
+@node
 class Variable(Expr):
     name: Token
+    # where the variable lives (None means a global) and its slot in the
+    # `Frame` or in the closure's cells, written by the resolver once the node
+    # is built, not part of the node's identity
+    access: 'Access | None' = field(default=None, compare=False, repr=False)
+    slot: int | None = field(default=None, compare=False, repr=False)
 
     def accept(self, visitor: ExprVisitor[T]) -> T:
         return visitor.visitVariable(self)
@@ -0,0 +1,38 @@
+from dataclasses import MISSING, dataclass, fields
+from typing import TypeVar
+
+T = TypeVar('T', bound=type)
+
+
+def node(cls: T) -> T:
+    """
+    Frozen dataclass with `__slots__`, for the AST nodes and `Token`: no
+    `__dict__` per instance and assigning to a field still raises.
+
+    A frozen dataclass' `__init__` sets every field through
+    `object.__setattr__`, which is slower than a plain class even without
+    slots. Ours calls the `__set__` of each slot descriptor instead, bound up
+    front, so building a node costs about what it does for a mutable class.
+    """
+    cls = dataclass(frozen=True, slots=True)(cls)
+
+    params: list[str] = []
+    body: list[str] = []
+    namespace: dict[str, object] = {}
+    for field in fields(cls):
+        name = field.name
+        if field.default is MISSING:
+            params.append(name)
+        else:
+            namespace[f'_default_{name}'] = field.default
+            params.append(f'{name}=_default_{name}')
+        namespace[f'_set_{name}'] = getattr(cls, name).__set__
+        body.append(f'    _set_{name}(self, {name})')
+
+    source = f'def __init__(self, {", ".join(params)}) -> None:\n' + ('\n'.join(body) or '    pass')
+    exec(source, namespace)
+    init = namespace['__init__']
+    init.__qualname__ = f'{cls.__qualname__}.__init__'
+    cls.__init__ = init
+
+    return cls
@@ -1,7 +1,8 @@
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
+from dataclasses import field
 from typing import TYPE_CHECKING, final
 
+from src.ast.node import node
 from src.tokens import Token
 
 from .visitor import T
@@ -9,15 +10,19 @@ from .visitor import Visitor as StmtVisitor
 
 if TYPE_CHECKING:
     from src.ast.expr.schema import Expr
+    from src.environment import Access
+    from src.parser import LazyBody
 
 
 class Stmt(ABC):
+    __slots__ = ()
+
     @abstractmethod
     def accept(self, visitor: StmtVisitor[T]) -> T: ...
 
 
 @final
-@dataclass(frozen=True)
+@node
 class Expression(Stmt):
     expression: 'Expr'
 
@@ -26,7 +31,7 @@ class Expression(Stmt):
 
 
 @final
-@dataclass(frozen=True)
+@node
 class IfStmt(Stmt):
     condition: 'Expr'
     then_branch: Stmt
@@ -37,7 +42,7 @@ class IfStmt(Stmt):
 
 
 @final
-@dataclass(frozen=True)
+@node
 class Print(Stmt):
     expression: 'Expr'
 
@@ -46,37 +51,47 @@ class Print(Stmt):
 
 
 @final
-@dataclass(frozen=True)
+@node
 class FuncStmt(Stmt):
     name: Token
-    args: list[Token]
-    body: list[Stmt]
+    args: tuple[Token, ...]
+    body: 'tuple[Stmt, ...] | LazyBody'
+    # set by the resolver, the name's like a `Var`'s, the rest as for `FuncExpr`
+    access: 'Access | None' = field(default=None, compare=False, repr=False)
+    slot: int | None = field(default=None, compare=False, repr=False)
+    cells: tuple[int, ...] = field(default=(), compare=False, repr=False)
+    upvalues: tuple[int, ...] = field(default=(), compare=False, repr=False)
 
     def accept(self, visitor: StmtVisitor[T]) -> T:
         return visitor.visitFuncStmt(self)
 
 
 @final
-@dataclass(frozen=True)
+@node
 class Var(Stmt):
     name: Token
     initializer: 'Expr | None'
+    # set by the resolver, None for a global, CELL if a closure captures it
+    access: 'Access | None' = field(default=None, compare=False, repr=False)
+    slot: int | None = field(default=None, compare=False, repr=False)
 
     def accept(self, visitor: StmtVisitor[T]) -> T:
         return visitor.visitVarStmt(self)
 
 
 @final
-@dataclass(frozen=True)
+@node
 class Block(Stmt):
-    statements: list[Stmt]
+    statements: tuple[Stmt, ...]
+    # whether running it needs a `Frame` of its own, set by the resolver
+    frame: bool = field(default=True, compare=False, repr=False)
 
     def accept(self, visitor: StmtVisitor[T]) -> T:
         return visitor.visitBlock(self)
 
 
 @final
-@dataclass(frozen=True)
+@node
 class While(Stmt):
     condition: 'Expr'
     statement: Stmt
@@ -86,7 +101,26 @@ class While(Stmt):
 
 
 @final
-@dataclass(frozen=True)
+@node
+class For(Stmt):
+    # the initializer's `var`, if any, is scoped to the loop
+    initializer: 'Stmt | None'
+    condition: 'Expr | None'
+    increment: 'Expr | None'
+    body: Stmt
+    # set by the resolver: whether the loop's scope needs a `Frame` of its
+    # own, as for `Block`, and whether it's a counted loop the interpreter can
+    # run natively, `for (var i = a; i < b; i = i + c)` with a body that
+    # neither assigns nor captures `i`
+    frame: bool = field(default=True, compare=False, repr=False)
+    counted: bool = field(default=False, compare=False, repr=False)
+
+    def accept(self, visitor: StmtVisitor[T]) -> T:
+        return visitor.visitFor(self)
+
+
+@final
+@node
 class ReturnStmt(Stmt):
     keyword: Token
     value: 'Expr | None'
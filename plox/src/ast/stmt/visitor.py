@@ -2,7 +2,7 @@ from abc import ABC, abstractmethod
 from typing import TYPE_CHECKING, Generic, TypeVar
 
 if TYPE_CHECKING:
-    from .schema import Block, Expression, FuncStmt, IfStmt, Print, ReturnStmt, Var, While
+    from .schema import Block, Expression, For, FuncStmt, IfStmt, Print, ReturnStmt, Var, While
 
 T = TypeVar('T')
 
@@ -29,5 +29,8 @@ class Visitor(Generic[T], ABC):
     @abstractmethod
     def visitWhile(self, while_: 'While') -> T: ...
 
+    @abstractmethod
+    def visitFor(self, for_: 'For') -> T: ...
+
     @abstractmethod
     def visitReturnStmt(self, return_: 'ReturnStmt') -> T: ...
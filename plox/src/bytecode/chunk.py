@@ -0,0 +1,187 @@
+from array import array
+from bisect import bisect_right
+from enum import IntEnum, auto
+from typing import TYPE_CHECKING, final
+
+from src.token_buffer import UINT32
+
+if TYPE_CHECKING:
+    from src.ast.expr.schema import FuncExpr
+    from src.ast.stmt.schema import FuncStmt
+
+# operands are unsigned 16 bit, as the code stream they live in, a chunk
+# with a constant or a jump target past that has its code widened to 32 bits
+MAX_OPERAND = 0xFFFF
+MAX_WIDE_OPERAND = 0xFFFFFFFF
+
+
+class OpCode(IntEnum):
+    """
+    An instruction is two units of the code stream, the opcode and its
+    operand, 0 for those that take none. Stack effects are before -> after.
+    """
+
+    CONSTANT = auto()  # -> constants[arg]
+    POP = auto()  # value ->
+    GET_LOCAL = auto()  # -> slots[arg]
+    SET_LOCAL = auto()  # value -> value, into slots[arg]
+    DEFINE_LOCAL = auto()  # value ->, into slots[arg], at most one past the end
+    NEW_CELL = auto()  # ->, an empty `Cell` into slots[arg], defined like a local
+    GET_CELL = auto()  # -> the value of the cell in slots[arg]
+    SET_CELL = auto()  # value -> value
+    GET_UPVALUE = auto()  # -> the value of cell arg of the running closure
+    SET_UPVALUE = auto()  # value -> value
+    GET_GLOBAL = auto()  # -> the global named constants[arg]
+    SET_GLOBAL = auto()  # value -> value
+    DEFINE_GLOBAL = auto()  # value ->
+    # binary operators: left right -> result, as `semantics.binary`
+    ADD = auto()
+    SUBTRACT = auto()
+    MULTIPLY = auto()
+    DIVIDE = auto()
+    LESS = auto()
+    LESS_EQUAL = auto()
+    GREATER = auto()
+    GREATER_EQUAL = auto()
+    EQUAL = auto()
+    NOT_EQUAL = auto()
+    NEGATE = auto()  # value -> -value
+    TRUTH = auto()  # value -> its truth, what `!` computes
+    PRINT = auto()  # value ->
+    JUMP = auto()  # ip = arg
+    JUMP_IF_FALSE = auto()  # value -> value, jumps if it's falsy
+    JUMP_IF_TRUE = auto()  # value -> value, jumps if it's truthy
+    POP_JUMP_IF_FALSE = auto()  # value ->, jumps if it's falsy
+    CALL = auto()  # callee arg1 .. argN -> result, N = arg
+    CLOSURE = auto()  # -> a function of the `Prototype` constants[arg]
+    RETURN = auto()  # value -> (the caller gets it)
+    ENTER_FRAME = auto()  # ->, a top level block or loop with locals of its own starts
+    EXIT_FRAME = auto()  # ->, and ends
+
+
+# instructions that take an operand, the disassembler shows it
+HAS_OPERAND = frozenset(
+    {
+        OpCode.CONSTANT,
+        OpCode.GET_LOCAL,
+        OpCode.SET_LOCAL,
+        OpCode.DEFINE_LOCAL,
+        OpCode.NEW_CELL,
+        OpCode.GET_CELL,
+        OpCode.SET_CELL,
+        OpCode.GET_UPVALUE,
+        OpCode.SET_UPVALUE,
+        OpCode.GET_GLOBAL,
+        OpCode.SET_GLOBAL,
+        OpCode.DEFINE_GLOBAL,
+        OpCode.JUMP,
+        OpCode.JUMP_IF_FALSE,
+        OpCode.JUMP_IF_TRUE,
+        OpCode.POP_JUMP_IF_FALSE,
+        OpCode.CALL,
+        OpCode.CLOSURE,
+    }
+)
+
+
+@final
+class Chunk:
+    """
+    Compiled code: the instructions in an array of unsigned shorts, the
+    constants they refer to (literals, global names, function prototypes) and
+    a run length table of source lines, a pair of (offset, line) every time
+    the line changes. Pickles as those three.
+
+    The first operand that doesn't fit in a short turns the code into an
+    array of 32 bit units. Offsets count units either way and the `VM` reads
+    both alike, so only the chunks of huge functions pay for the room.
+    """
+
+    __slots__ = ('code', 'constants', 'lines', '__indexes')
+
+    def __init__(self) -> None:
+        self.code = array('H')
+        self.constants: list[object] = []
+        self.lines = array(UINT32)
+        # constant -> index, literals and names are only stored once
+        self.__indexes: dict[tuple[type, object], int] = {}
+
+    def __getstate__(self) -> tuple[array, list[object], array]:
+        return self.code, self.constants, self.lines
+
+    def __setstate__(self, state: tuple[array, list[object], array]) -> None:
+        self.code, self.constants, self.lines = state
+        self.__indexes = {}
+
+    def emit(self, op: OpCode, arg: int, line: int) -> int:
+        """appends an instruction, returns its offset"""
+        if not 0 <= arg <= MAX_OPERAND:
+            self.__widen(arg, f'operand {arg} of {op.name} out of range')
+        offset = len(self.code)
+        if not self.lines or self.lines[-1] != line:
+            self.lines.extend((offset, line))
+        self.code.extend((op, arg))
+        return offset
+
+    def patch(self, offset: int, arg: int) -> None:
+        """sets the operand of the instruction at `offset`, a jump emitted before its target was known"""
+        if not 0 <= arg <= MAX_OPERAND:
+            self.__widen(arg, f'jump to {arg} out of range')
+        self.code[offset + 1] = arg
+
+    def __widen(self, arg: int, message: str) -> None:
+        if not 0 <= arg <= MAX_WIDE_OPERAND:
+            raise OverflowError(message)
+        if self.code.typecode == 'H':
+            self.code = array(UINT32, self.code)
+
+    def constant(self, value: object) -> int:
+        if isinstance(value, Prototype):
+            self.constants.append(value)
+            return len(self.constants) - 1
+
+        # 1.0 == True, the type is part of the key, and -0.0 == 0.0, a float's repr keeps the sign
+        key = (type(value), repr(value) if isinstance(value, float) else value)
+        index = self.__indexes.get(key)
+        if index is None:
+            index = self.__indexes[key] = len(self.constants)
+            self.constants.append(value)
+        return index
+
+    def line(self, offset: int) -> int:
+        # the last line change at or before `offset`
+        starts = self.lines[0::2]
+        return self.lines[2 * (bisect_right(starts, offset) - 1) + 1]
+
+
+@final
+class Prototype:
+    """
+    A compiled function, what every closure made from it shares. A function
+    whose lazy body isn't parsed yet keeps its `declaration` instead of a
+    `chunk` until its first call.
+    """
+
+    __slots__ = ('name', 'arity', 'cells', 'upvalues', 'chunk', 'declaration')
+
+    def __init__(
+        self,
+        name: str | None,
+        arity: int,
+        cells: tuple[int, ...],
+        upvalues: tuple[int, ...],
+        chunk: Chunk | None,
+        declaration: 'FuncStmt | FuncExpr | None' = None,
+    ) -> None:
+        # None for an anonymous function and for the top level script
+        self.name = name
+        self.arity = arity
+        # the args captured by a nested function and where the closure's cells
+        # come from, as on the declaration
+        self.cells = cells
+        self.upvalues = upvalues
+        self.chunk = chunk
+        self.declaration = declaration
+
+    def __str__(self) -> str:
+        return '<anonymous|fun>' if self.name is None else f'<fun {self.name}>'
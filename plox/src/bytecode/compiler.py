@@ -0,0 +1,282 @@
+from collections.abc import Iterable
+from typing import TYPE_CHECKING, final
+
+from src.ast.expr.visitor import Visitor as ExprVisitor
+from src.ast.stmt.schema import FuncStmt
+from src.ast.stmt.visitor import Visitor as StmtVisitor
+from src.bytecode.chunk import Chunk, OpCode, Prototype
+from src.environment import Access
+from src.parser import LazyBody
+from src.tokens import TokenType
+
+if TYPE_CHECKING:
+    from src.ast.expr.schema import (
+        Assign,
+        Binary,
+        Call,
+        Expr,
+        FuncExpr,
+        Grouping,
+        Literal,
+        Logical,
+        Unary,
+        Variable,
+    )
+    from src.ast.stmt.schema import Block, Expression, For, IfStmt, Print, ReturnStmt, Stmt, Var, While
+
+_BINARY = {
+    TokenType.PLUS: OpCode.ADD,
+    TokenType.MINUS: OpCode.SUBTRACT,
+    TokenType.STAR: OpCode.MULTIPLY,
+    TokenType.SLASH: OpCode.DIVIDE,
+    TokenType.LESS: OpCode.LESS,
+    TokenType.LESS_EQUAL: OpCode.LESS_EQUAL,
+    TokenType.GREATER: OpCode.GREATER,
+    TokenType.GREATER_EQUAL: OpCode.GREATER_EQUAL,
+    TokenType.EQUAL_EQUAL: OpCode.EQUAL,
+    TokenType.BANG_EQUAL: OpCode.NOT_EQUAL,
+}
+# how a variable is read and written by its access, None for a global
+_GET = {
+    None: OpCode.GET_GLOBAL,
+    Access.LOCAL: OpCode.GET_LOCAL,
+    Access.CELL: OpCode.GET_CELL,
+    Access.UPVALUE: OpCode.GET_UPVALUE,
+}
+_SET = {
+    None: OpCode.SET_GLOBAL,
+    Access.LOCAL: OpCode.SET_LOCAL,
+    Access.CELL: OpCode.SET_CELL,
+    Access.UPVALUE: OpCode.SET_UPVALUE,
+}
+
+
+@final
+class Compiler(ExprVisitor[None], StmtVisitor[None]):
+    """
+    Compiles a resolved program into a `Chunk` of stack machine code for the
+    `VM`: locals keep the frame slots the resolver gave them, captured ones
+    stay `Cell`s, functions become `Prototype` constants their `CLOSURE`
+    makes closures of. Every expression leaves one value on the stack and
+    every statement none.
+
+    Nodes without a token of their own get the line of the last one seen.
+    """
+
+    def __init__(self) -> None:
+        self.chunk = Chunk()
+        self.line = 0
+
+    def compile(self, statements: Iterable['Stmt']) -> Prototype:
+        """the program as a function of no args, or a function body, returning nil if it falls off the end"""
+        self.statements(statements)
+        self.__emit(OpCode.CONSTANT, self.chunk.constant(None))
+        self.__emit(OpCode.RETURN)
+        return Prototype(None, 0, (), (), self.chunk)
+
+    def statements(self, statements: Iterable['Stmt']) -> None:
+        for statement in statements:
+            statement.accept(self)
+
+    def expression(self, expression: 'Expr') -> None:
+        expression.accept(self)
+
+    def __emit(self, op: OpCode, arg: int = 0) -> int:
+        return self.chunk.emit(op, arg, self.line)
+
+    def __jump(self, op: OpCode) -> int:
+        # its target is patched in once it's known, `__land`
+        return self.__emit(op)
+
+    def __land(self, jump: int) -> None:
+        self.chunk.patch(jump, len(self.chunk.code))
+
+    def __name(self, name: str) -> int:
+        return self.chunk.constant(name)
+
+    def visitExpression(self, expression: 'Expression') -> None:
+        self.expression(expression.expression)
+        self.__emit(OpCode.POP)
+
+    def visitPrint(self, print_: 'Print') -> None:
+        self.expression(print_.expression)
+        self.__emit(OpCode.PRINT)
+
+    def visitVarStmt(self, var_: 'Var') -> None:
+        self.line = var_.name.line
+        if var_.access == Access.CELL:
+            # defined before the initializer runs, a closure it makes may capture it
+            assert var_.slot is not None
+            self.__emit(OpCode.NEW_CELL, var_.slot)
+            if var_.initializer:
+                self.expression(var_.initializer)
+                self.__emit(OpCode.SET_CELL, var_.slot)
+                self.__emit(OpCode.POP)
+            return
+
+        if var_.initializer:
+            self.expression(var_.initializer)
+        else:
+            self.__emit(OpCode.CONSTANT, self.chunk.constant(None))
+        self.__define(var_.name.lexem, var_.access, var_.slot)
+
+    def visitFuncStmt(self, func_: 'FuncStmt') -> None:
+        self.line = func_.name.line
+        prototype = self.chunk.constant(_prototype(func_))
+        if func_.access == Access.CELL:
+            # the function may capture itself, the cell has to be there first
+            assert func_.slot is not None
+            self.__emit(OpCode.NEW_CELL, func_.slot)
+            self.__emit(OpCode.CLOSURE, prototype)
+            self.__emit(OpCode.SET_CELL, func_.slot)
+            self.__emit(OpCode.POP)
+            return
+
+        self.__emit(OpCode.CLOSURE, prototype)
+        self.__define(func_.name.lexem, func_.access, func_.slot)
+
+    def __define(self, name: str, access: Access | None, slot: int | None) -> None:
+        if access is None or slot is None:
+            self.__emit(OpCode.DEFINE_GLOBAL, self.__name(name))
+        else:
+            self.__emit(OpCode.DEFINE_LOCAL, slot)
+
+    def visitReturnStmt(self, return_: 'ReturnStmt') -> None:
+        self.line = return_.keyword.line
+        if return_.value:
+            self.expression(return_.value)
+        else:
+            self.__emit(OpCode.CONSTANT, self.chunk.constant(None))
+        self.__emit(OpCode.RETURN)
+
+    def visitBlock(self, block_: 'Block') -> None:
+        if not block_.frame:
+            # its locals, if any, live in the enclosing frame
+            self.statements(block_.statements)
+            return
+
+        self.__emit(OpCode.ENTER_FRAME)
+        self.statements(block_.statements)
+        self.__emit(OpCode.EXIT_FRAME)
+
+    def visitIfStmt(self, if_stmt_: 'IfStmt') -> None:
+        self.expression(if_stmt_.condition)
+        to_else = self.__jump(OpCode.POP_JUMP_IF_FALSE)
+        if_stmt_.then_branch.accept(self)
+        if if_stmt_.else_branch is None:
+            self.__land(to_else)
+            return
+
+        to_end = self.__jump(OpCode.JUMP)
+        self.__land(to_else)
+        if_stmt_.else_branch.accept(self)
+        self.__land(to_end)
+
+    def visitWhile(self, while_: 'While') -> None:
+        start = len(self.chunk.code)
+        self.expression(while_.condition)
+        to_end = self.__jump(OpCode.POP_JUMP_IF_FALSE)
+        while_.statement.accept(self)
+        self.__emit(OpCode.JUMP, start)
+        self.__land(to_end)
+
+    def visitFor(self, for_: 'For') -> None:
+        # the `counted` flag is the interpreters', here the counter is a local like any other
+        if for_.frame:
+            self.__emit(OpCode.ENTER_FRAME)
+        if for_.initializer:
+            for_.initializer.accept(self)
+
+        start = len(self.chunk.code)
+        to_end = None
+        if for_.condition:
+            self.expression(for_.condition)
+            to_end = self.__jump(OpCode.POP_JUMP_IF_FALSE)
+        for_.body.accept(self)
+        if for_.increment:
+            self.expression(for_.increment)
+            self.__emit(OpCode.POP)
+        self.__emit(OpCode.JUMP, start)
+        if to_end is not None:
+            self.__land(to_end)
+
+        if for_.frame:
+            self.__emit(OpCode.EXIT_FRAME)
+
+    def visitAssign(self, assign: 'Assign') -> None:
+        self.expression(assign.expr)
+        self.line = assign.name.line
+        self.__emit(_SET[assign.access], self.__operand(assign))
+
+    def visitCall(self, call_: 'Call') -> None:
+        self.expression(call_.callee)
+        for arg in call_.args:
+            self.expression(arg)
+        self.line = call_.paren.line
+        self.__emit(OpCode.CALL, len(call_.args))
+
+    def visitLogical(self, logical_: 'Logical') -> None:
+        # `or` stops at a truthy left, `and` at a falsy one, evaluating to it
+        self.expression(logical_.left)
+        self.line = logical_.operator.line
+        to_end = self.__jump(OpCode.JUMP_IF_TRUE if logical_.operator.type == TokenType.OR else OpCode.JUMP_IF_FALSE)
+        self.__emit(OpCode.POP)
+        self.expression(logical_.right)
+        self.__land(to_end)
+
+    def visitBinary(self, binary: 'Binary') -> None:
+        self.expression(binary.left)
+        self.expression(binary.right)
+        self.line = binary.operator.line
+        self.__emit(_BINARY[binary.operator.type])
+
+    def visitUnary(self, unary: 'Unary') -> None:
+        self.expression(unary.right)
+        self.line = unary.operator.line
+        self.__emit(OpCode.NEGATE if unary.operator.type == TokenType.MINUS else OpCode.TRUTH)
+
+    def visitFuncExpr(self, func_: 'FuncExpr') -> None:
+        self.__emit(OpCode.CLOSURE, self.chunk.constant(_prototype(func_)))
+
+    def visitGrouping(self, grouping: 'Grouping') -> None:
+        self.expression(grouping.expression)
+
+    def visitLiteral(self, literal: 'Literal') -> None:
+        self.__emit(OpCode.CONSTANT, self.chunk.constant(literal.value))
+
+    def visitVariable(self, variable: 'Variable') -> None:
+        self.line = variable.name.line
+        self.__emit(_GET[variable.access], self.__operand(variable))
+
+    def __operand(self, expr: 'Variable | Assign') -> int:
+        # the slot of a local or a cell, the constant of a global's name
+        if expr.access is None or expr.slot is None:
+            return self.__name(expr.name.lexem)
+        return expr.slot
+
+
+def _prototype(declaration: 'FuncStmt | FuncExpr') -> Prototype:
+    if isinstance(declaration, FuncStmt):
+        name: str | None = declaration.name.lexem
+        body = declaration.body
+    else:
+        name, body = None, declaration.stmts
+
+    prototype = Prototype(name, len(declaration.args), declaration.cells, declaration.upvalues, None, declaration)
+    # a lazy body is parsed, and compiled, on the first call
+    if not isinstance(body, LazyBody) or body.parsed:
+        compile_body(prototype)
+    return prototype
+
+
+def compile_body(prototype: Prototype) -> None:
+    """compiles the body of the function `prototype` was made for, lazy ones are parsed by then"""
+    declaration = prototype.declaration
+    assert declaration is not None
+    compiler = Compiler()
+    if isinstance(declaration, FuncStmt):
+        compiler.line = declaration.name.line
+        prototype.chunk = compiler.compile(declaration.body).chunk
+    else:
+        prototype.chunk = compiler.compile(declaration.stmts).chunk
+    prototype.declaration = None
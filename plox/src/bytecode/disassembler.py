@@ -0,0 +1,49 @@
+from typing import TextIO
+
+from src.bytecode.chunk import HAS_OPERAND, Chunk, OpCode, Prototype
+
+# jumps show their target, constants and closures what they refer to
+_JUMPS = frozenset({OpCode.JUMP, OpCode.JUMP_IF_FALSE, OpCode.JUMP_IF_TRUE, OpCode.POP_JUMP_IF_FALSE})
+_CONSTANTS = frozenset({OpCode.CONSTANT, OpCode.GET_GLOBAL, OpCode.SET_GLOBAL, OpCode.DEFINE_GLOBAL, OpCode.CLOSURE})
+
+
+def disassemble(prototype: Prototype, out: TextIO, name: str = '<script>') -> None:
+    """
+    writes the listing of `prototype`'s chunk, then of the functions it
+    makes, in the order they appear: offset, line (`|` when it's the
+    previous instruction's), instruction, operand and what it refers to.
+    """
+    out.write(f'== {name} ==\n')
+    chunk = prototype.chunk
+    if chunk is None:
+        out.write('(lazy, compiled on its first call)\n')
+        return
+
+    line = None
+    for offset in range(0, len(chunk.code), 2):
+        current = chunk.line(offset)
+        shown = '   |' if current == line else f'{current:4d}'
+        line = current
+        out.write(f'{offset:04d} {shown} {_instruction(chunk, offset)}\n')
+
+    for constant in chunk.constants:
+        if isinstance(constant, Prototype):
+            disassemble(constant, out, str(constant))
+
+
+def _instruction(chunk: Chunk, offset: int) -> str:
+    op, arg = OpCode(chunk.code[offset]), chunk.code[offset + 1]
+    if op not in HAS_OPERAND:
+        return op.name
+    if op in _JUMPS:
+        return f'{op.name:<18} -> {arg:04d}'
+    if op in _CONSTANTS:
+        return f'{op.name:<18} {arg:4d} {_show(chunk.constants[arg])}'
+
+    return f'{op.name:<18} {arg:4d}'
+
+
+def _show(constant: object) -> str:
+    if isinstance(constant, str):
+        return repr(constant)
+    return str(constant)
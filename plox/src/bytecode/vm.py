@@ -0,0 +1,286 @@
+import sys
+from collections.abc import Iterable
+from typing import TYPE_CHECKING, final
+
+from src.bytecode.chunk import Chunk, OpCode, Prototype
+from src.bytecode.compiler import Compiler, compile_body
+from src.environment import Cell, Environment
+from src.interperter_lib import semantics
+from src.interperter_lib.interfaces import LoxCallable
+from src.interperter_lib.native_lib.time import ClockFunc
+from src.interperter_lib.semantics import is_equal
+from src.tokens import Token, TokenType
+
+if TYPE_CHECKING:
+    from src.ast.stmt.schema import Stmt
+    from src.interperter_lib.interpreter import Interpreter
+
+# what the interpreter's error shows of the call, it's always the closing paren
+_PAREN = Token(TokenType.PAREN_CLOSE, ')', None, 0)
+
+
+@final
+class VMFunction(LoxCallable):
+    """a closure: the `Prototype` of the function and the cells it captured"""
+
+    __slots__ = ('prototype', 'closure')
+
+    def __init__(self, prototype: Prototype, closure: tuple[Cell, ...]) -> None:
+        self.prototype = prototype
+        self.closure = closure
+
+    def arity(self) -> int:
+        return self.prototype.arity
+
+    def call(self, interpreter: 'Interpreter', args: list[object]) -> object:
+        # only a `VM` runs them
+        assert isinstance(interpreter, VM)
+        return interpreter.run(self, args)
+
+    def __str__(self) -> str:
+        return str(self.prototype)
+
+
+@final
+class VM:
+    """
+    Runs the `Compiler`'s bytecode in one dispatch loop: an operand stack
+    shared by every call, the slots of the running call (the `Frame` values
+    of the interpreter) and the cells of its closure. A call saves the
+    caller's code, instruction pointer, slots and cells on a list of frames
+    instead of recursing in Python, a `return` takes them back.
+
+    Calls deeper than the recursion limit of Python fail as they would for
+    the interpreter.
+    """
+
+    def __init__(self) -> None:
+        self.globals = Environment()
+        self.globals.define('clock', ClockFunc())
+        self.max_frames = sys.getrecursionlimit()
+
+    def interpret(self, statements: Iterable['Stmt']) -> None:
+        self.run(VMFunction(Compiler().compile(statements), ()), [])
+
+    def run(self, function: VMFunction, args: list[object]) -> object:  # noqa: C901
+        (
+            CONSTANT,
+            POP,
+            GET_LOCAL,
+            SET_LOCAL,
+            DEFINE_LOCAL,
+            NEW_CELL,
+            GET_CELL,
+            SET_CELL,
+            GET_UPVALUE,
+            SET_UPVALUE,
+            GET_GLOBAL,
+            SET_GLOBAL,
+            DEFINE_GLOBAL,
+            ADD,
+            SUBTRACT,
+            MULTIPLY,
+            DIVIDE,
+            LESS,
+            LESS_EQUAL,
+            GREATER,
+            GREATER_EQUAL,
+            EQUAL,
+            NOT_EQUAL,
+            NEGATE,
+            TRUTH,
+            PRINT,
+            JUMP,
+            JUMP_IF_FALSE,
+            JUMP_IF_TRUE,
+            POP_JUMP_IF_FALSE,
+            CALL,
+            CLOSURE,
+            RETURN,
+            ENTER_FRAME,
+            EXIT_FRAME,
+        ) = _OPCODES
+
+        globals_ = self.globals
+        names = globals_.values
+        max_frames = self.max_frames
+
+        prototype = function.prototype
+        chunk = _chunk(prototype)
+        for slot in prototype.cells:
+            args[slot] = Cell(args[slot])
+        code, constants, ip = chunk.code, chunk.constants, 0
+        slots, cells = args, function.closure
+        # (code, constants, ip, slots, cells) of the callers
+        frames: list[tuple[object, ...]] = []
+        # slots of what's around a top level block or loop with a frame of its own
+        saved: list[list[object]] = []
+        stack: list[object] = []
+        push, pop = stack.append, stack.pop
+
+        # the most frequent first, every test costs
+        while True:
+            op = code[ip]
+            arg = code[ip + 1]
+            ip += 2
+            if op == GET_LOCAL:
+                push(slots[arg])
+            elif op == CONSTANT:
+                push(constants[arg])
+            elif op == SET_LOCAL:
+                slots[arg] = stack[-1]
+            elif op == POP_JUMP_IF_FALSE:
+                if not pop():
+                    ip = arg
+            elif op == POP:
+                pop()
+            elif op == JUMP:
+                ip = arg
+            elif op == ADD:
+                b = pop()
+                a = stack[-1]
+                if type(a) is type(b) and (type(a) is float or type(a) is str):
+                    stack[-1] = a + b  # type: ignore[operator]
+                else:
+                    stack[-1] = None
+            elif op == SUBTRACT:
+                b = pop()
+                a = stack[-1]
+                stack[-1] = a - b if type(a) is float and type(b) is float else None  # type: ignore[operator]
+            elif op == LESS:
+                b = pop()
+                a = stack[-1]
+                stack[-1] = a < b if type(a) is float and type(b) is float else None  # type: ignore[operator]
+            elif op == GET_GLOBAL:
+                name = constants[arg]
+                if name in names:
+                    push(names[name])  # type: ignore[index]
+                else:
+                    push(globals_.get(name))  # type: ignore[arg-type]
+            elif op == CALL:
+                callee = stack[-1 - arg]
+                base = len(stack) - arg
+                call_args = stack[base:]
+                del stack[base - 1 :]
+                if type(callee) is not VMFunction:
+                    push(self.__call(callee, call_args))
+                    continue
+
+                prototype = callee.prototype
+                if prototype.arity != arg:
+                    raise RuntimeError(f'Expected {prototype.arity} argumnets but got {arg}')
+                if len(frames) >= max_frames:
+                    raise RecursionError('maximum recursion depth exceeded')
+                for slot in prototype.cells:
+                    call_args[slot] = Cell(call_args[slot])
+
+                frames.append((code, constants, ip, slots, cells))
+                chunk = _chunk(prototype)
+                code, constants, ip = chunk.code, chunk.constants, 0
+                slots, cells = call_args, callee.closure
+            elif op == RETURN:
+                if not frames:
+                    return pop()
+                # the value stays on the stack for the caller
+                code, constants, ip, slots, cells = frames.pop()  # type: ignore[assignment]
+            elif op == DEFINE_LOCAL:
+                value = pop()
+                if arg < len(slots):
+                    slots[arg] = value
+                else:
+                    slots.append(value)
+            elif op == MULTIPLY:
+                b = pop()
+                a = stack[-1]
+                stack[-1] = a * b if type(a) is float and type(b) is float else None  # type: ignore[operator]
+            elif op == DIVIDE:
+                b = pop()
+                a = stack[-1]
+                stack[-1] = a / b if type(a) is float and type(b) is float else None  # type: ignore[operator]
+            elif op == LESS_EQUAL:
+                b = pop()
+                a = stack[-1]
+                stack[-1] = a <= b if type(a) is float and type(b) is float else None  # type: ignore[operator]
+            elif op == GREATER:
+                b = pop()
+                a = stack[-1]
+                stack[-1] = a > b if type(a) is float and type(b) is float else None  # type: ignore[operator]
+            elif op == GREATER_EQUAL:
+                b = pop()
+                a = stack[-1]
+                stack[-1] = a >= b if type(a) is float and type(b) is float else None  # type: ignore[operator]
+            elif op == EQUAL:
+                b = pop()
+                stack[-1] = is_equal(stack[-1], b)
+            elif op == NOT_EQUAL:
+                b = pop()
+                stack[-1] = not is_equal(stack[-1], b)
+            elif op == GET_CELL:
+                push(slots[arg].value)  # type: ignore[attr-defined]
+            elif op == SET_CELL:
+                slots[arg].value = stack[-1]  # type: ignore[attr-defined]
+            elif op == GET_UPVALUE:
+                push(cells[arg].value)
+            elif op == SET_UPVALUE:
+                cells[arg].value = stack[-1]
+            elif op == JUMP_IF_FALSE:
+                if not stack[-1]:
+                    ip = arg
+            elif op == JUMP_IF_TRUE:
+                if stack[-1]:
+                    ip = arg
+            elif op == SET_GLOBAL:
+                name = constants[arg]
+                if name in names:
+                    names[name] = stack[-1]  # type: ignore[index]
+                else:
+                    globals_.assign(name, stack[-1])  # type: ignore[arg-type]
+            elif op == DEFINE_GLOBAL:
+                names[constants[arg]] = pop()  # type: ignore[index]
+            elif op == PRINT:
+                print(f'{pop()}')
+            elif op == NEGATE:
+                value = stack[-1]
+                stack[-1] = -value if type(value) is float else semantics.unary(TokenType.MINUS, value)
+            elif op == TRUTH:
+                # `is_truth` is Python's truthiness, for every value a program can make
+                stack[-1] = bool(stack[-1])
+            elif op == CLOSURE:
+                made = constants[arg]
+                assert isinstance(made, Prototype)
+                sources = made.upvalues
+                closure = tuple(slots[s] if s >= 0 else cells[-1 - s] for s in sources) if sources else ()
+                push(VMFunction(made, closure))  # type: ignore[arg-type]
+            elif op == NEW_CELL:
+                if arg < len(slots):
+                    slots[arg] = Cell()
+                else:
+                    slots.append(Cell())
+            elif op == ENTER_FRAME:
+                saved.append(slots)
+                slots = []
+            elif op == EXIT_FRAME:
+                slots = saved.pop()
+            else:
+                raise RuntimeError(f'unknown opcode {op} at {ip - 2}')
+
+    def __call(self, callee: object, args: list[object]) -> object:
+        # natives, with the interpreter's checks
+        if not isinstance(callee, LoxCallable):
+            raise RuntimeError(f"this isn't a function to be called {_PAREN}")
+        if len(args) != callee.arity():
+            raise RuntimeError(f'Expected {callee.arity()} argumnets but got {len(args)}')
+
+        return callee.call(self, args)  # type: ignore[arg-type]
+
+
+def _chunk(prototype: Prototype) -> Chunk:
+    if prototype.chunk is None:
+        # a lazy body, parsing it on its first call
+        compile_body(prototype)
+    assert prototype.chunk is not None
+    return prototype.chunk
+
+
+# the opcodes as plain ints, in the order `VM.run` unpacks them
+_OPCODES = tuple(int(op) for op in OpCode)
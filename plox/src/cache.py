@@ -0,0 +1,138 @@
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+from functools import cache
+from pathlib import Path
+from typing import final
+
+from src.ast.arena import Arena
+from src.ast.stmt.schema import Stmt
+
+SUFFIX = '.plox-ast'
+
+
+@cache
+def interpreter_version() -> bytes:
+    """
+    Fingerprint of the interpreter the cached trees were built by: the python
+    version plus the content of every module under `src`, any change to the
+    AST classes (or anything else) starts a fresh set of cache entries.
+    """
+    digest = hashlib.sha256(sys.version.encode())
+    root = Path(__file__).parent
+    for path in sorted(root.rglob('*.py')):
+        digest.update(str(path.relative_to(root)).encode())
+        digest.update(path.read_bytes())
+
+    return digest.digest()
+
+
+def default_directory() -> Path:
+    if directory := os.environ.get('PLOX_CACHE_DIR'):
+        return Path(directory)
+
+    return Path(os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache') / 'plox'
+
+
+@final
+class AstCache:
+    """
+    On disk cache of parsed and resolved programs, one file per program keyed
+    by the hash of its source and the interpreter version. Programs are stored
+    as an `Arena`, which pickles as a handful of arrays.
+
+    Entries are written to a temporary file and renamed into place, so readers
+    (other processes included) see either no entry or a complete one. Anything
+    that fails to load is treated as a miss, and a store the file system
+    refuses is skipped, the program runs either way. After each store the
+    least recently used entries are evicted until the directory fits
+    `max_bytes`.
+    """
+
+    def __init__(self, directory: Path | None = None, max_bytes: int = 64 * 1024 * 1024, variant: str = '') -> None:
+        self.directory = directory or default_directory()
+        self.max_bytes = max_bytes
+        # part of the key, the same source optimized differently is a different entry
+        self.variant = variant
+
+    def path(self, source: bytes) -> Path:
+        digest = hashlib.sha256(interpreter_version())
+        digest.update(self.variant.encode())
+        digest.update(source)
+        return self.directory / f'{digest.hexdigest()}{SUFFIX}'
+
+    def load(self, source: bytes) -> list[Stmt] | None:
+        path = self.path(source)
+        try:
+            with open(path, 'rb') as f:
+                arena = pickle.load(f)
+        except OSError:
+            # no entry, or a cache directory we can't read
+            return None
+        except Exception:
+            # truncated or otherwise unreadable entry, drop it and rebuild
+            _remove(path)
+            return None
+
+        try:
+            # a hit counts as a use for the eviction order
+            os.utime(path)
+        except OSError:
+            pass
+
+        return arena.to_ast()
+
+    def store(self, source: bytes, statements: list[Stmt]) -> None:
+        # what the resolver found is kept on the nodes, so it comes along
+        arena = Arena.from_ast(statements)
+
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        except OSError:
+            # nowhere to write it
+            return
+
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(arena, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self.path(source))
+        except OSError:
+            _remove(Path(tmp))
+            return
+        except BaseException:
+            _remove(Path(tmp))
+            raise
+
+        self.evict()
+
+    def evict(self) -> None:
+        entries: list[tuple[float, int, Path]] = []
+        try:
+            paths = list(self.directory.glob(f'*{SUFFIX}'))
+        except OSError:
+            return
+        for path in paths:
+            try:
+                stat = path.stat()
+            except OSError:
+                # evicted by someone else meanwhile
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            _remove(path)
+            total -= size
+
+
+def _remove(path: Path) -> None:
+    # a file we can't delete stays, the cache works without that
+    try:
+        path.unlink(missing_ok=True)
+    except OSError:
+        pass
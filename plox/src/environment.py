@@ -1,9 +1,12 @@
+from enum import IntEnum
 from typing import final
 
 
 @final
 class Environment:
     def __init__(self, enclosing: 'Environment | None' = None) -> None:
+        # names are the lexemes interned by the scanner (src/symbols.py), so
+        # lookups hit the cached hash and compare keys by identity
         self.values: dict[str, object] = {}
         self.enclosing = enclosing
 
@@ -21,9 +24,6 @@ class Environment:
 
             raise RuntimeError(f'Variable {name} doesnt exist')
 
-    def assign_at(self, lvl: int, name: str, value: object) -> None:
-        self.ancestor(lvl).values[name] = value
-
     def get(self, name: str) -> object:
         try:
             return self.values[name]
@@ -33,13 +33,45 @@ class Environment:
 
             raise RuntimeError(f'Variable {name} doesnt exist')
 
-    def get_at(self, name: str, lvl: int) -> object:
-        return self.ancestor(lvl).values.get(name)
 
-    def ancestor(self, lvl: int) -> 'Environment':
-        env = self
-        for _ in range(0, lvl):
-            assert env.enclosing
-            env = env.enclosing
+class Access(IntEnum):
+    # where the resolver found a local, None on the node is a global
+    LOCAL = 0  # a plain value in the current frame
+    CELL = 1  # a `Cell` in the current frame, some closure captured it
+    UPVALUE = 2  # a `Cell` of the running closure
+
+
+@final
+class Cell:
+    """a captured local, shared by the frame declaring it and the closures using it"""
+
+    __slots__ = ('value',)
+
+    def __init__(self, value: object = None) -> None:
+        self.value = value
+
+
+@final
+class Frame:
+    """
+    Locals of a function call, addressed by the slot the resolver gave them
+    instead of by name, and the cells of the closure being called. Blocks
+    don't get one, their locals take slots after the enclosing ones and a
+    later block reuses them. Top level blocks do, globals have no slots.
+
+    Statements run in order, so a slot is at most one past the end when it's
+    defined. Globals stay in the name keyed `Environment`.
+    """
+
+    __slots__ = ('values', 'cells')
+
+    def __init__(self, values: list[object] | None = None, cells: tuple[Cell, ...] = ()) -> None:
+        self.values = [] if values is None else values
+        self.cells = cells
 
-        return env
+    def define(self, slot: int, value: object) -> None:
+        values = self.values
+        if slot < len(values):
+            values[slot] = value
+        else:
+            values.append(value)
@@ -0,0 +1,125 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import final
+
+from src.ast.stmt.schema import Stmt
+from src.parser import ParseError, Parser
+from src.regex_scanner import RegexScanner
+from src.symbols import SYMBOLS, SymbolTable
+from src.token_buffer import TokenBuffer
+from src.tokens import TokenType
+
+
+@final
+class IncrementalProgram:
+    """
+    Keeps a parsed program around between edits of its source. On `update`
+    only the top level declarations touched by the edit are re-scanned and
+    re-parsed, the others keep their `Stmt` trees.
+
+    The edit is found by trimming the common prefix/suffix of the old and new
+    source. Scanning restarts at the declaration before the first one the edit
+    touches (parsing that one may have peeked past its end for an `else`) and
+    stops at the first token after the edit that starts an old declaration:
+    the scanner keeps no state between tokens and the parser none between top
+    level declarations, so from there on both would produce what they did
+    before. If the re-parsed region doesn't come out as whole declarations we
+    fall back to parsing everything.
+
+    Reused trees keep their tokens as they are, so their line numbers go stale
+    when lines are added or removed above them.
+    """
+
+    def __init__(self, source: str, symbols: SymbolTable = SYMBOLS) -> None:
+        self.symbols = symbols
+        self.source = source
+        # per top level declaration: where its first token starts and its last one ends
+        self.starts = array('q')
+        self.ends = array('q')
+        self.statements: list[Stmt] = []
+        self.__parse_region(source, 0, self.starts, self.ends, self.statements)
+        # how many declarations the last update kept from the previous parse
+        self.reused = 0
+
+    def update(self, source: str) -> None:
+        """
+        brings the program up to date with `source`, on a scan or parse error
+        it's raised and the program stays as it was.
+        """
+        old_source = self.source
+        prefix = _common_prefix(old_source, source)
+        suffix = _common_prefix(old_source[prefix:][::-1], source[prefix:][::-1])
+        delta = len(source) - len(old_source)
+
+        first = max(0, bisect_right(self.ends, prefix) - 1)
+        restart = self.ends[first - 1] if first > 0 else 0
+        # old declarations from `resync` on start after the edit, the region can stop at any of them
+        resync = bisect_left(self.starts, len(old_source) - suffix)
+
+        starts, ends = self.starts[:first], self.ends[:first]
+        statements = self.statements[:first]
+        try:
+            last = self.__parse_region(source, restart, starts, ends, statements, resync, delta)
+        except ParseError:
+            starts, ends, statements = array('q'), array('q'), []
+            self.__parse_region(source, 0, starts, ends, statements)
+            self.reused = 0
+        else:
+            starts.extend(start + delta for start in self.starts[last:])
+            ends.extend(end + delta for end in self.ends[last:])
+            statements.extend(self.statements[last:])
+            self.reused = first + len(self.statements) - last
+
+        self.source, self.starts, self.ends, self.statements = source, starts, ends, statements
+
+    def __parse_region(
+        self,
+        source: str,
+        restart: int,
+        starts: array,
+        ends: array,
+        statements: list[Stmt],
+        resync: int | None = None,
+        delta: int = 0,
+    ) -> int:
+        """
+        parses the declarations from `restart` on into `starts`, `ends` and
+        `statements`. Given `resync`, it stops at the first token that is the
+        start of an old declaration from that index on (shifted by `delta`)
+        and returns the index of that declaration, otherwise it goes to the end.
+        """
+        old_starts = self.starts
+        last = len(old_starts)
+        buffer = TokenBuffer(source, self.symbols)
+
+        spans = RegexScanner(source, self.symbols).iter_spans(restart, source.count('\n', 0, restart) + 1)
+        for token_type, _, symbol, start, end, line in spans:
+            if resync is not None:
+                i = bisect_left(old_starts, start - delta, resync)
+                if i < last and old_starts[i] == start - delta:
+                    last = i
+                    buffer.append(TokenType.EOF, -1, start, start, line)
+                    break
+            buffer.append(token_type, symbol, start, end, line)
+
+        parser = Parser(buffer)
+        first_token = 0
+        for statement in parser.parse_iter():
+            starts.append(buffer.starts[first_token])
+            ends.append(buffer.ends[parser.current - 1])
+            statements.append(statement)
+            first_token = parser.current
+
+        return last
+
+
+def _common_prefix(a: str, b: str, block: int = 4096) -> int:
+    # compare whole blocks first so most of the work happens in C
+    limit = min(len(a), len(b))
+    i = 0
+    while i + block <= limit and a[i : i + block] == b[i : i + block]:
+        i += block
+    while i < limit and a[i] == b[i]:
+        i += 1
+
+    return i
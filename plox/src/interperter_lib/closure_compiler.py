@@ -0,0 +1,667 @@
+from collections.abc import Callable, Iterable, Sequence
+from typing import TYPE_CHECKING, final
+
+from src.ast.expr.schema import Assign, Binary, FuncExpr, Literal
+from src.ast.expr.visitor import Visitor as ExprVisitor
+from src.ast.stmt.schema import FuncStmt, Var
+from src.ast.stmt.visitor import Visitor as StmtVisitor
+from src.environment import Access, Cell, Environment, Frame
+from src.interperter_lib import semantics
+from src.interperter_lib.interfaces import LoxCallable
+from src.interperter_lib.native_lib.time import ClockFunc
+from src.interperter_lib.semantics import TYPED_BINARY, TYPED_UNARY, is_equal, is_truth
+from src.tokens import TokenType
+
+if TYPE_CHECKING:
+    from src.ast.expr.schema import Call, Expr, Grouping, Logical, Unary, Variable
+    from src.ast.stmt.schema import Block, Expression, For, IfStmt, Print, ReturnStmt, Stmt, While
+    from src.interperter_lib.interpreter import Interpreter
+
+# a compiled expression gives its value, a compiled statement None or, once a
+# `return` ran, the returned value in a 1-tuple, passed up to the call
+Eval = Callable[[Frame], object]
+Exec = Callable[[Frame], 'tuple[object] | None']
+
+
+@final
+class ClosureInterpreter(ExprVisitor[Eval], StmtVisitor[Exec]):
+    """
+    Runs a resolved program as the `Interpreter` does, but first compiles
+    every node, once, into a Python closure with what the interpreter looks
+    up on each visit (operator, access and slot of a variable, literals)
+    already bound: running is calling closures, no `accept` and no `match`.
+
+    The running `Frame` is passed down as the only argument instead of living
+    on the interpreter and a `return` is a value passed up, not an exception.
+    Function bodies are compiled on their first call, lazy ones are parsed
+    then anyway.
+    """
+
+    def __init__(self) -> None:
+        self.globals = Environment()
+        self.globals.define('clock', ClockFunc())
+        # what the top level statements see as their frame, only top level
+        # blocks and loops have locals, in frames of their own
+        self.frame = Frame()
+
+    def interpret(self, statements: Iterable['Stmt']) -> None:
+        for statement in statements:
+            self.compile(statement)(self.frame)
+
+    def compile(self, statement: 'Stmt') -> Exec:
+        return statement.accept(self)
+
+    def evaluate(self, expression: 'Expr') -> Eval:
+        return expression.accept(self)
+
+    def sequence(self, statements: Iterable['Stmt']) -> Exec:
+        compiled = tuple(self.compile(statement) for statement in statements)
+        if len(compiled) == 1:
+            return compiled[0]
+
+        def sequence(frame: Frame) -> 'tuple[object] | None':
+            for statement in compiled:
+                returned = statement(frame)
+                if returned is not None:
+                    return returned
+            return None
+
+        return sequence
+
+    def visitExpression(self, expression: 'Expression') -> Exec:
+        value = self.evaluate(expression.expression)
+
+        def expression_(frame: Frame) -> None:
+            value(frame)
+
+        return expression_
+
+    def visitPrint(self, print_: 'Print') -> Exec:
+        value = self.evaluate(print_.expression)
+
+        def print__(frame: Frame) -> None:
+            print(f'{value(frame)}')
+
+        return print__
+
+    def visitVarStmt(self, var_: 'Var') -> Exec:
+        initializer = self.evaluate(var_.initializer) if var_.initializer else None
+        return self.__define(var_.name.lexem, var_.access, var_.slot, initializer)
+
+    def visitFuncStmt(self, func_: 'FuncStmt') -> Exec:
+        code = _Code(self, func_)
+        capture = _capture(func_.upvalues)
+
+        def function(frame: Frame) -> object:
+            return CompiledFunction(code, capture(frame))
+
+        # the cell of a function capturing itself is there before it's made
+        return self.__define(func_.name.lexem, func_.access, func_.slot, function)
+
+    def __define(self, name: str, access: Access | None, slot: int | None, initializer: Eval | None) -> Exec:
+        if access is None or slot is None:
+            globals_ = self.globals.values
+
+            def global_(frame: Frame) -> None:
+                globals_[name] = initializer(frame) if initializer else None
+
+            return global_
+
+        if access == Access.CELL:
+
+            def cell(frame: Frame) -> None:
+                # a closure made by the initializer may capture it
+                cell = Cell()
+                _define(frame.values, slot, cell)
+                if initializer:
+                    cell.value = initializer(frame)
+
+            return cell
+
+        if initializer is None:
+
+            def nil(frame: Frame) -> None:
+                _define(frame.values, slot, None)
+
+            return nil
+
+        def local(frame: Frame) -> None:
+            value = initializer(frame)
+            values = frame.values
+            if slot < len(values):
+                values[slot] = value
+            else:
+                values.append(value)
+
+        return local
+
+    def visitReturnStmt(self, return_: 'ReturnStmt') -> Exec:
+        value = self.evaluate(return_.value) if return_.value else None
+
+        def return__(frame: Frame) -> 'tuple[object]':
+            return (value(frame) if value else None,)
+
+        return return__
+
+    def visitBlock(self, block_: 'Block') -> Exec:
+        statements = self.sequence(block_.statements)
+        if not block_.frame:
+            # its locals, if any, live in the enclosing frame
+            return statements
+
+        def block(frame: Frame) -> 'tuple[object] | None':
+            return statements(Frame())
+
+        return block
+
+    def visitIfStmt(self, if_stmt_: 'IfStmt') -> Exec:
+        condition = self.evaluate(if_stmt_.condition)
+        then_branch = self.compile(if_stmt_.then_branch)
+        else_branch = self.compile(if_stmt_.else_branch) if if_stmt_.else_branch else None
+
+        # `is_truth` is Python's truthiness, for every value a program can make
+        def if_(frame: Frame) -> 'tuple[object] | None':
+            if condition(frame):
+                return then_branch(frame)
+            return else_branch(frame) if else_branch else None
+
+        return if_
+
+    def visitWhile(self, while_: 'While') -> Exec:
+        condition = self.evaluate(while_.condition)
+        body = self.compile(while_.statement)
+
+        def while__(frame: Frame) -> 'tuple[object] | None':
+            while condition(frame):
+                returned = body(frame)
+                if returned is not None:
+                    return returned
+            return None
+
+        return while__
+
+    def visitFor(self, for_: 'For') -> Exec:
+        loop = self.__counted(for_) if for_.counted else self.__loop(for_)
+        if not for_.frame:
+            # the counter, if any, lives in the enclosing frame
+            return loop
+
+        def for__(frame: Frame) -> 'tuple[object] | None':
+            return loop(Frame())
+
+        return for__
+
+    def __loop(self, for_: 'For') -> Exec:
+        initializer = self.compile(for_.initializer) if for_.initializer else None
+        condition = self.evaluate(for_.condition) if for_.condition else None
+        increment = self.evaluate(for_.increment) if for_.increment else None
+        body = self.compile(for_.body)
+
+        def loop(frame: Frame) -> 'tuple[object] | None':
+            if initializer:
+                initializer(frame)
+            while condition is None or condition(frame):
+                returned = body(frame)
+                if returned is not None:
+                    return returned
+                if increment:
+                    increment(frame)
+            return None
+
+        return loop
+
+    def __counted(self, for_: 'For') -> Exec:
+        # `Interpreter.__count`, with the bound and step bound when they're literals
+        counter, condition, increment = for_.initializer, for_.condition, for_.increment
+        assert isinstance(counter, Var) and isinstance(condition, Binary) and isinstance(increment, Assign)
+        assert isinstance(increment.expr, Binary) and counter.slot is not None
+
+        initializer, slot = self.compile(counter), counter.slot
+        limit, step = condition.right, increment.expr.right
+        fixed_bound, fixed_step = isinstance(limit, Literal), isinstance(step, Literal)
+        bound_of, step_of = self.evaluate(limit), self.evaluate(step)
+        inclusive = condition.operator.type == TokenType.LESS_EQUAL
+        body = self.compile(for_.body)
+
+        def counted(frame: Frame) -> 'tuple[object] | None':
+            initializer(frame)
+            values = frame.values
+            i = values[slot]
+            bound = bound_of(frame) if fixed_bound else None
+            by = step_of(frame) if fixed_step else None
+            while True:
+                if not fixed_bound:
+                    bound = bound_of(frame)
+                if type(i) is not float or type(bound) is not float or not (i <= bound if inclusive else i < bound):
+                    return None
+                returned = body(frame)
+                if returned is not None:
+                    return returned
+                if not fixed_step:
+                    by = step_of(frame)
+                i = i + by if type(by) is float else None
+                values[slot] = i
+
+        return counted
+
+    def visitAssign(self, assign: 'Assign') -> Eval:
+        value, slot = self.evaluate(assign.expr), assign.slot
+        if assign.access is None:
+            name, globals_ = assign.name.lexem, self.globals
+
+            def global_(frame: Frame) -> object:
+                assigned = value(frame)
+                globals_.assign(name, assigned)
+                return assigned
+
+            return global_
+
+        if assign.access == Access.LOCAL:
+
+            def local(frame: Frame) -> object:
+                frame.values[slot] = assigned = value(frame)
+                return assigned
+
+            return local
+
+        if assign.access == Access.CELL:
+
+            def cell(frame: Frame) -> object:
+                frame.values[slot].value = assigned = value(frame)
+                return assigned
+
+            return cell
+
+        def upvalue(frame: Frame) -> object:
+            frame.cells[slot].value = assigned = value(frame)
+            return assigned
+
+        return upvalue
+
+    def visitCall(self, call_: 'Call') -> Eval:
+        callee, paren = self.evaluate(call_.callee), call_.paren
+        args = tuple(self.evaluate(arg) for arg in call_.args)
+        count = len(args)
+
+        def call(frame: Frame) -> object:
+            function = callee(frame)
+            values = [arg(frame) for arg in args]
+            if type(function) is CompiledFunction:
+                code = function.code
+                if code.arity != count:
+                    raise RuntimeError(f'Expected {code.arity} argumnets but got {count}')
+                return code.run(values, function.closure)
+
+            return self.__call(function, values, paren)
+
+        return call
+
+    def __call(self, callee: object, args: list[object], paren: object) -> object:
+        # natives, the checks are the interpreter's
+        if not isinstance(callee, LoxCallable):
+            raise RuntimeError(f"this isn't a function to be called {paren}")
+        if len(args) != callee.arity():
+            raise RuntimeError(f'Expected {callee.arity()} argumnets but got {len(args)}')
+
+        return callee.call(self, args)  # type: ignore[arg-type]
+
+    def visitLogical(self, logical_: 'Logical') -> Eval:
+        left, right = self.evaluate(logical_.left), self.evaluate(logical_.right)
+        if logical_.operator.type == TokenType.OR:
+
+            def or_(frame: Frame) -> object:
+                return left(frame) or right(frame)
+
+            return or_
+
+        def and_(frame: Frame) -> object:
+            return left(frame) and right(frame)
+
+        return and_
+
+    def visitBinary(self, binary: 'Binary') -> Eval:
+        left, right = self.evaluate(binary.left), self.evaluate(binary.right)
+        operator = binary.operator.type
+        if binary.operands is not None:
+            # type inference proved what both are, nothing to check
+            typed = TYPED_BINARY[binary.operands][operator]
+
+            def typed_binary(frame: Frame) -> object:
+                return typed(left(frame), right(frame))
+
+            return typed_binary
+
+        constant = binary.right.value if isinstance(binary.right, Literal) else None
+        if type(constant) is float and operator in _NUMBER_CONSTANT:
+            return _NUMBER_CONSTANT[operator](left, constant)
+        if operator in _BINARY:
+            return _BINARY[operator](left, right)
+
+        def binary_(frame: Frame) -> object:
+            return semantics.binary(operator, left(frame), right(frame))
+
+        return binary_
+
+    def visitUnary(self, unary: 'Unary') -> Eval:
+        right, operator = self.evaluate(unary.right), unary.operator.type
+        if unary.operand is not None:
+            typed = TYPED_UNARY[unary.operand][operator]
+
+            def typed_unary(frame: Frame) -> object:
+                return typed(right(frame))
+
+            return typed_unary
+
+        if operator == TokenType.BANG:
+
+            def bang(frame: Frame) -> object:
+                # the interpreter's `!` is the truth of the operand, not its negation
+                return is_truth(right(frame))
+
+            return bang
+
+        def unary_(frame: Frame) -> object:
+            value = right(frame)
+            return -value if type(value) is float else semantics.unary(operator, value)
+
+        return unary_
+
+    def visitFuncExpr(self, func_: 'FuncExpr') -> Eval:
+        code = _Code(self, func_)
+        capture = _capture(func_.upvalues)
+
+        def function(frame: Frame) -> object:
+            return CompiledFunction(code, capture(frame))
+
+        return function
+
+    def visitGrouping(self, grouping: 'Grouping') -> Eval:
+        return self.evaluate(grouping.expression)
+
+    def visitLiteral(self, literal: 'Literal') -> Eval:
+        value = literal.value
+
+        def literal_(frame: Frame) -> object:
+            return value
+
+        return literal_
+
+    def visitVariable(self, variable: 'Variable') -> Eval:
+        slot = variable.slot
+        if variable.access is None:
+            name, globals_ = variable.name.lexem, self.globals
+            values = globals_.values
+
+            def global_(frame: Frame) -> object:
+                try:
+                    return values[name]
+                except KeyError:
+                    pass
+                # out of the handler, for the error to be the interpreter's alone
+                return globals_.get(name)
+
+            return global_
+
+        if variable.access == Access.LOCAL:
+
+            def local(frame: Frame) -> object:
+                return frame.values[slot]
+
+            return local
+
+        if variable.access == Access.CELL:
+
+            def cell(frame: Frame) -> object:
+                return frame.values[slot].value
+
+            return cell
+
+        def upvalue(frame: Frame) -> object:
+            return frame.cells[slot].value
+
+        return upvalue
+
+
+@final
+class _Code:
+    """a function declaration, its body compiled on the first call"""
+
+    __slots__ = ('compiler', 'declaration', 'name', 'arity', 'body')
+
+    def __init__(self, compiler: ClosureInterpreter, declaration: 'FuncStmt | FuncExpr') -> None:
+        self.compiler = compiler
+        self.declaration = declaration
+        self.name = declaration.name.lexem if isinstance(declaration, FuncStmt) else None
+        self.arity = len(declaration.args)
+        self.body: Exec | None = None
+
+    def run(self, args: list[object], closure: tuple[Cell, ...]) -> object:
+        body = self.body
+        if body is None:
+            declaration = self.declaration
+            statements = declaration.body if isinstance(declaration, FuncStmt) else declaration.stmts
+            body = self.body = self.compiler.sequence(statements)
+
+        # a frame per call, the args take the first slots
+        for slot in self.declaration.cells:
+            args[slot] = Cell(args[slot])
+        returned = body(Frame(args, closure))
+        return None if returned is None else returned[0]
+
+
+@final
+class CompiledFunction(LoxCallable):
+    """what a `fun` evaluates to for the `ClosureInterpreter`, `LoxFunction` for the interpreter"""
+
+    __slots__ = ('code', 'closure')
+
+    def __init__(self, code: _Code, closure: tuple[Cell, ...]) -> None:
+        self.code = code
+        self.closure = closure
+
+    def arity(self) -> int:
+        return self.code.arity
+
+    def call(self, interpreter: 'Interpreter', args: list[object]) -> object:
+        return self.code.run(args, self.closure)
+
+    def __str__(self) -> str:
+        return '<anonymous|fun>' if self.code.name is None else f'<fun {self.code.name}>'
+
+
+def _define(values: list[object], slot: int, value: object) -> None:
+    # `Frame.define`, statements run in order so it's at most one past the end
+    if slot < len(values):
+        values[slot] = value
+    else:
+        values.append(value)
+
+
+def _capture(upvalues: Sequence[int]) -> Callable[[Frame], tuple[Cell, ...]]:
+    # the cells of a closure, from the frame making it: a slot of it or `-1 - i` for its cell i
+    sources = tuple(upvalues)
+    if not sources:
+        return _no_cells
+
+    def capture(frame: Frame) -> tuple[Cell, ...]:
+        values, cells = frame.values, frame.cells
+        return tuple(values[source] if source >= 0 else cells[-1 - source] for source in sources)  # type: ignore[misc]
+
+    return capture
+
+
+def _no_cells(frame: Frame) -> tuple[Cell, ...]:
+    return ()
+
+
+# the operators `semantics.binary` only computes for two numbers (or two
+# strings for `+`), nil otherwise, with the type checks done inline
+def _plus(left: Eval, right: Eval) -> Eval:
+    def plus(frame: Frame) -> object:
+        a, b = left(frame), right(frame)
+        if type(a) is type(b) and (type(a) is float or type(a) is str):
+            return a + b  # type: ignore[operator]
+        return None
+
+    return plus
+
+
+def _minus(left: Eval, right: Eval) -> Eval:
+    def minus(frame: Frame) -> object:
+        a, b = left(frame), right(frame)
+        return a - b if type(a) is float and type(b) is float else None  # type: ignore[operator]
+
+    return minus
+
+
+def _star(left: Eval, right: Eval) -> Eval:
+    def star(frame: Frame) -> object:
+        a, b = left(frame), right(frame)
+        return a * b if type(a) is float and type(b) is float else None  # type: ignore[operator]
+
+    return star
+
+
+def _slash(left: Eval, right: Eval) -> Eval:
+    def slash(frame: Frame) -> object:
+        a, b = left(frame), right(frame)
+        return a / b if type(a) is float and type(b) is float else None  # type: ignore[operator]
+
+    return slash
+
+
+def _less(left: Eval, right: Eval) -> Eval:
+    def less(frame: Frame) -> object:
+        a, b = left(frame), right(frame)
+        return a < b if type(a) is float and type(b) is float else None  # type: ignore[operator]
+
+    return less
+
+
+def _less_equal(left: Eval, right: Eval) -> Eval:
+    def less_equal(frame: Frame) -> object:
+        a, b = left(frame), right(frame)
+        return a <= b if type(a) is float and type(b) is float else None  # type: ignore[operator]
+
+    return less_equal
+
+
+def _greater(left: Eval, right: Eval) -> Eval:
+    def greater(frame: Frame) -> object:
+        a, b = left(frame), right(frame)
+        return a > b if type(a) is float and type(b) is float else None  # type: ignore[operator]
+
+    return greater
+
+
+def _greater_equal(left: Eval, right: Eval) -> Eval:
+    def greater_equal(frame: Frame) -> object:
+        a, b = left(frame), right(frame)
+        return a >= b if type(a) is float and type(b) is float else None  # type: ignore[operator]
+
+    return greater_equal
+
+
+def _equal(left: Eval, right: Eval) -> Eval:
+    def equal(frame: Frame) -> object:
+        return is_equal(left(frame), right(frame))
+
+    return equal
+
+
+def _not_equal(left: Eval, right: Eval) -> Eval:
+    def not_equal(frame: Frame) -> object:
+        return not is_equal(left(frame), right(frame))
+
+    return not_equal
+
+
+_BINARY: dict[TokenType, Callable[[Eval, Eval], Eval]] = {
+    TokenType.PLUS: _plus,
+    TokenType.MINUS: _minus,
+    TokenType.STAR: _star,
+    TokenType.SLASH: _slash,
+    TokenType.LESS: _less,
+    TokenType.LESS_EQUAL: _less_equal,
+    TokenType.GREATER: _greater,
+    TokenType.GREATER_EQUAL: _greater_equal,
+    TokenType.EQUAL_EQUAL: _equal,
+    TokenType.BANG_EQUAL: _not_equal,
+}
+
+
+# the same with a number literal on the right, only the left one is checked
+def _plus_number(left: Eval, b: float) -> Eval:
+    def plus(frame: Frame) -> object:
+        a = left(frame)
+        return a + b if type(a) is float else None
+
+    return plus
+
+
+def _minus_number(left: Eval, b: float) -> Eval:
+    def minus(frame: Frame) -> object:
+        a = left(frame)
+        return a - b if type(a) is float else None
+
+    return minus
+
+
+def _star_number(left: Eval, b: float) -> Eval:
+    def star(frame: Frame) -> object:
+        a = left(frame)
+        return a * b if type(a) is float else None
+
+    return star
+
+
+def _slash_number(left: Eval, b: float) -> Eval:
+    def slash(frame: Frame) -> object:
+        a = left(frame)
+        return a / b if type(a) is float else None
+
+    return slash
+
+
+def _less_number(left: Eval, b: float) -> Eval:
+    def less(frame: Frame) -> object:
+        a = left(frame)
+        return a < b if type(a) is float else None
+
+    return less
+
+
+def _less_equal_number(left: Eval, b: float) -> Eval:
+    def less_equal(frame: Frame) -> object:
+        a = left(frame)
+        return a <= b if type(a) is float else None
+
+    return less_equal
+
+
+def _greater_number(left: Eval, b: float) -> Eval:
+    def greater(frame: Frame) -> object:
+        a = left(frame)
+        return a > b if type(a) is float else None
+
+    return greater
+
+
+def _greater_equal_number(left: Eval, b: float) -> Eval:
+    def greater_equal(frame: Frame) -> object:
+        a = left(frame)
+        return a >= b if type(a) is float else None
+
+    return greater_equal
+
+
+_NUMBER_CONSTANT: dict[TokenType, Callable[[Eval, float], Eval]] = {
+    TokenType.PLUS: _plus_number,
+    TokenType.MINUS: _minus_number,
+    TokenType.STAR: _star_number,
+    TokenType.SLASH: _slash_number,
+    TokenType.LESS: _less_number,
+    TokenType.LESS_EQUAL: _less_equal_number,
+    TokenType.GREATER: _greater_number,
+    TokenType.GREATER_EQUAL: _greater_equal_number,
+}
@@ -1,38 +1,53 @@
+from collections.abc import Iterable
 from typing import TYPE_CHECKING, final
 
+from src.ast.expr.schema import Assign, Binary, Literal
 from src.ast.expr.visitor import Visitor as ExprVisitor
+from src.ast.stmt.schema import Var
 from src.ast.stmt.visitor import Visitor as StmtVisitor
-from src.environment import Environment
+from src.environment import Access, Cell, Environment, Frame
+from src.interperter_lib import semantics
 from src.interperter_lib.exceptions import Return
 from src.interperter_lib.native_lib.time import ClockFunc
 from src.interperter_lib.schema import LoxAnonymousFunction, LoxCallable, LoxFunction
+from src.interperter_lib.semantics import TYPED_BINARY, TYPED_UNARY, is_truth
 from src.tokens import TokenType
 
 if TYPE_CHECKING:
-    from src.ast.expr.schema import Assign, Binary, Call, Expr, FuncExpr, Grouping, Literal, Logical, Unary, Variable
-    from src.ast.stmt.schema import Block, Expression, FuncStmt, IfStmt, Print, ReturnStmt, Stmt, Var, While
+    from src.ast.expr.schema import Call, Expr, FuncExpr, Grouping, Logical, Unary, Variable
+    from src.ast.stmt.schema import Block, Expression, For, FuncStmt, IfStmt, Print, ReturnStmt, Stmt, While
+    from src.interperter_lib.tiering import Profile, Tiering
+
+# looking an enum member up on its class is slow, these are compared to on
+# every variable access
+_LOCAL = Access.LOCAL
+_CELL = Access.CELL
 
 
 @final
 class Interpreter(ExprVisitor[object], StmtVisitor[None]):
     globals = Environment()
-    env = globals
+    env: Environment | Frame = globals
 
-    def __init__(self) -> None:
+    def __init__(self, tiering: 'Tiering | None' = None) -> None:
         self.globals.define('clock', ClockFunc())
-        self.local: dict[object, int] = {}
+        self.tiering = tiering
+        # of the function running on the tree walker, its loops count toward promoting it
+        self.profile: Profile | None = None
 
-    def interpret(self, statements: list['Stmt']) -> None:
+    def interpret(self, statements: Iterable['Stmt']) -> None:
         for statement in statements:
             self.execute(statement)
 
-    def resolve(self, expr: 'Expr', i: int) -> None:
-        self.local[expr] = i
+    def resolve(self, expr: 'Variable | Assign', access: Access | None, slot: int | None) -> None:
+        # kept on the node itself, it's frozen for everybody but the resolver
+        object.__setattr__(expr, 'access', access)
+        object.__setattr__(expr, 'slot', slot)
 
     def execute(self, statement: 'Stmt') -> None:
         statement.accept(self)
 
-    def executeBlock(self, statements: list['Stmt'], env: Environment) -> None:
+    def executeBlock(self, statements: Iterable['Stmt'], env: Environment | Frame) -> None:
         prev_env = self.env
 
         try:
@@ -50,15 +65,86 @@ class Interpreter(ExprVisitor[object], StmtVisitor[None]):
 
     def visitWhile(self, while_: 'While') -> None:
         condition_result = self.evaluate(while_.condition)
+        profile = self.profile
 
-        while self.__is_truth(condition_result):
+        while is_truth(condition_result):
+            if profile is not None:
+                profile.iterations += 1
             self.execute(while_.statement)
             condition_result = self.evaluate(while_.condition)
 
+    def visitFor(self, for_: 'For') -> None:
+        if not for_.frame:
+            # the counter, if any, lives in the enclosing frame
+            self.__loop(for_)
+            return
+
+        prev_env = self.env
+        try:
+            self.env = Frame()
+            self.__loop(for_)
+        finally:
+            self.env = prev_env
+
+    def __loop(self, for_: 'For') -> None:
+        if for_.counted:
+            self.__count(for_)
+            return
+
+        if for_.initializer:
+            self.execute(for_.initializer)
+        condition, increment, body = for_.condition, for_.increment, for_.body
+        profile = self.profile
+        while condition is None or is_truth(self.evaluate(condition)):
+            if profile is not None:
+                profile.iterations += 1
+            self.execute(body)
+            if increment is not None:
+                self.evaluate(increment)
+
+    def __count(self, for_: 'For') -> None:
+        """
+        `for (var i = a; i < b; i = i + c)` with `i` in a Python local, only
+        stored to its slot for the body to read. b and c are still read every
+        iteration, unless they're literals, and the loop stops where `<` or
+        `+` would give nil for anything but numbers.
+        """
+        counter = for_.initializer
+        condition = for_.condition
+        increment = for_.increment
+        assert isinstance(counter, Var) and isinstance(condition, Binary) and isinstance(increment, Assign)
+        assert isinstance(increment.expr, Binary)
+
+        self.execute(counter)
+        values, slot = self.env.values, counter.slot
+        assert slot is not None
+        limit, step = condition.right, increment.expr.right
+        fixed_bound, fixed_step = isinstance(limit, Literal), isinstance(step, Literal)
+        bound = limit.value if isinstance(limit, Literal) else None
+        by = step.value if isinstance(step, Literal) else None
+        inclusive = condition.operator.type == TokenType.LESS_EQUAL
+        body = for_.body
+        evaluate, execute = self.evaluate, self.execute
+        profile = self.profile
+
+        i = values[slot]
+        while True:
+            if not fixed_bound:
+                bound = evaluate(limit)
+            if type(i) is not float or type(bound) is not float or not (i <= bound if inclusive else i < bound):
+                return
+            if profile is not None:
+                profile.iterations += 1
+            execute(body)
+            if not fixed_step:
+                by = evaluate(step)
+            i = i + by if type(by) is float else None
+            values[slot] = i
+
     def visitIfStmt(self, if_stmt_: 'IfStmt') -> None:
         condition_result = self.evaluate(if_stmt_.condition)
 
-        if self.__is_truth(condition_result):
+        if is_truth(condition_result):
             self.execute(if_stmt_.then_branch)
         elif if_stmt_.else_branch:
             self.execute(if_stmt_.else_branch)
@@ -68,16 +154,51 @@ class Interpreter(ExprVisitor[object], StmtVisitor[None]):
         print(f'{val}')
 
     def visitFuncStmt(self, func_: 'FuncStmt') -> None:
-        func_definition = LoxFunction(func_, self.env)
-        self.env.define(func_.name.lexem, func_definition)
+        if func_.access == Access.CELL:
+            # the function may capture itself, the cell has to be there first
+            cell = Cell()
+            self.__define(func_.name.lexem, Access.LOCAL, func_.slot, cell)
+            cell.value = LoxFunction(func_, self.__capture(func_.upvalues))
+            return
+
+        self.__define(func_.name.lexem, func_.access, func_.slot, LoxFunction(func_, self.__capture(func_.upvalues)))
 
     def visitVarStmt(self, var_: 'Var') -> None:
+        if var_.access == Access.CELL:
+            # same as above, the initializer may make a closure using it
+            cell = Cell()
+            self.__define(var_.name.lexem, Access.LOCAL, var_.slot, cell)
+            if var_.initializer:
+                cell.value = self.evaluate(var_.initializer)
+            return
+
         value = None
 
         if var_.initializer:
             value = self.evaluate(var_.initializer)
 
-        self.env.define(var_.name.lexem, value)
+        self.__define(var_.name.lexem, var_.access, var_.slot, value)
+
+    def __define(self, name: str, access: Access | None, slot: int | None, value: object) -> None:
+        if access is None or slot is None:
+            self.globals.define(name, value)
+            return
+
+        # `Frame.define` inlined
+        values = self.env.values
+        if slot < len(values):
+            values[slot] = value
+        else:
+            values.append(value)
+
+    def __capture(self, upvalues: tuple[int, ...]) -> tuple[Cell, ...]:
+        if not upvalues:
+            return ()
+
+        env = self.env
+        assert isinstance(env, Frame)
+        values, cells = env.values, env.cells
+        return tuple(values[source] if source >= 0 else cells[-1 - source] for source in upvalues)
 
     def visitReturnStmt(self, return_: 'ReturnStmt') -> None:
         value: object | None = None
@@ -88,15 +209,25 @@ class Interpreter(ExprVisitor[object], StmtVisitor[None]):
         raise Return(value)
 
     def visitBlock(self, block_: 'Block') -> None:
-        self.executeBlock(block_.statements, Environment(enclosing=self.env))
+        if block_.frame:
+            self.executeBlock(block_.statements, Frame())
+            return
+
+        # its locals, if any, live in the enclosing frame
+        for statement in block_.statements:
+            statement.accept(self)
 
     def visitAssign(self, assign: 'Assign') -> object:
         value = self.evaluate(assign.expr)
-        lvl = self.local.get(assign)
-        if lvl:
-            self.env.assign_at(lvl, assign.name.lexem, value)
+        access = assign.access
+        if access is None:
+            self.globals.assign(assign.name.lexem, value)
+        elif access == _LOCAL:
+            self.env.values[assign.slot] = value
+        elif access == _CELL:
+            self.env.values[assign.slot].value = value
         else:
-            self.env.assign(assign.name.lexem, value)
+            self.env.cells[assign.slot].value = value
 
         return value
 
@@ -116,7 +247,7 @@ class Interpreter(ExprVisitor[object], StmtVisitor[None]):
 
     def visitLogical(self, logical_: 'Logical') -> object:
         left_val = self.evaluate(logical_.left)
-        left_is_truth = self.__is_truth(left_val)
+        left_is_truth = is_truth(left_val)
 
         if logical_.operator.type == TokenType.OR:
             if left_is_truth:
@@ -131,50 +262,22 @@ class Interpreter(ExprVisitor[object], StmtVisitor[None]):
         left_val = self.evaluate(binary.left)
         right_val = self.evaluate(binary.right)
 
-        # TODO: Allow for binary to work disregarding operands types
-        # this might raise exceptions from python
-        # look on how to define a standard for Lox
-        match (binary.operator.type, left_val, right_val):
-            case (TokenType.PLUS, str(), str()):
-                return left_val + right_val
-            case (TokenType.PLUS, float(), float()):
-                return left_val + right_val
-            case (TokenType.MINUS, float(), float()):
-                return left_val - right_val
-            case (TokenType.SLASH, float(), float()):
-                return left_val / right_val
-            case (TokenType.STAR, float(), float()):
-                return left_val * right_val
-            case (TokenType.LESS, float(), float()):
-                return left_val < right_val
-            case (TokenType.LESS, float(), float()):
-                return left_val < right_val
-            case (TokenType.LESS_EQUAL, float(), float()):
-                return left_val <= right_val
-            case (TokenType.GREATER, float(), float()):
-                return left_val > right_val
-            case (TokenType.GREATER_EQUAL, float(), float()):
-                return left_val >= right_val
-            case (TokenType.EQUAL_EQUAL, _, _):
-                return self.__is_equal(left_val, right_val)
-            case (TokenType.BANG_EQUAL, _, _):
-                return not self.__is_equal(left_val, right_val)
-
-        return None
+        operands = binary.operands
+        if operands is not None:
+            # type inference proved what both are, nothing to check
+            return TYPED_BINARY[operands][binary.operator.type](left_val, right_val)
+
+        return semantics.binary(binary.operator.type, left_val, right_val)
 
     def visitUnary(self, unary: 'Unary') -> object:
-        val = self.evaluate(unary.right)
-        match unary.operator.type:
-            case TokenType.MINUS:
-                assert isinstance(val, float)
-                return -float(val)
-            case TokenType.BANG:
-                return self.__is_truth(val)
+        operand = unary.operand
+        if operand is not None:
+            return TYPED_UNARY[operand][unary.operator.type](self.evaluate(unary.right))
 
-        return None
+        return semantics.unary(unary.operator.type, self.evaluate(unary.right))
 
     def visitFuncExpr(self, func_: 'FuncExpr') -> object:
-        return LoxAnonymousFunction(func_, self.env)
+        return LoxAnonymousFunction(func_, self.__capture(func_.upvalues))
 
     def visitGrouping(self, grouping: 'Grouping') -> object:
         return self.evaluate(grouping.expression)
@@ -186,23 +289,13 @@ class Interpreter(ExprVisitor[object], StmtVisitor[None]):
         return self.lookup_var(variable)
 
     def lookup_var(self, variable: 'Variable') -> object:
-        lvl = self.local.get(variable, None)
-        if lvl is not None:
-            return self.env.get_at(variable.name.lexem, lvl)
-        return self.globals.get(variable.name.lexem)
-
-    def __is_equal(self, left: object, right: object) -> bool:
-        if not left and not right:
-            return True
-        if not left:
-            return False
-
-        return left == right
-
-    def __is_truth(self, val: object) -> bool:
-        if not val:
-            return False
-        if isinstance(val, bool):
-            return val
-
-        return True
+        # the hottest path of the interpreter
+        access = variable.access
+        if access is None:
+            return self.globals.get(variable.name.lexem)
+        if access == _LOCAL:
+            return self.env.values[variable.slot]
+        if access == _CELL:
+            return self.env.values[variable.slot].value
+
+        return self.env.cells[variable.slot].value
@@ -2,7 +2,7 @@ from typing import TYPE_CHECKING, final
 
 from src.ast.expr.schema import FuncExpr
 from src.ast.stmt.schema import FuncStmt
-from src.environment import Environment
+from src.environment import Cell, Frame
 from src.interperter_lib.exceptions import Return
 from src.interperter_lib.interfaces import LoxCallable
 
@@ -12,19 +12,26 @@ if TYPE_CHECKING:
 
 @final
 class LoxFunction(LoxCallable):
-    def __init__(self, declaration: FuncStmt, env: Environment) -> None:
+    def __init__(self, declaration: FuncStmt, closure: tuple[Cell, ...]) -> None:
         self.declaration = declaration
-        self.closure = env
+        # only the cells of the variables it uses, not the frames around it
+        self.closure = closure
 
     def arity(self) -> int:
         return len(self.declaration.args)
 
     def call(self, interpreter: 'Interpreter', args: list[object]) -> object:
-        for i, fun_arg in enumerate(self.declaration.args):
-            self.closure.define(name=fun_arg.lexem, value=args[i])
-
+        if interpreter.tiering is not None:
+            # counted, and compiled once it's hot
+            return interpreter.tiering.call(self, interpreter, args)
+        return self.interpret(interpreter, args)
+
+    def interpret(self, interpreter: 'Interpreter', args: list[object]) -> object:
+        # a frame per call, the args take the first slots
+        for slot in self.declaration.cells:
+            args[slot] = Cell(args[slot])
         try:
-            interpreter.executeBlock(self.declaration.body, self.closure)
+            interpreter.executeBlock(self.declaration.body, Frame(args, self.closure))
         except Return as return_:
             return return_.value
 
@@ -36,19 +43,23 @@ class LoxFunction(LoxCallable):
 
 @final
 class LoxAnonymousFunction(LoxCallable):
-    def __init__(self, declaration: FuncExpr, env: Environment) -> None:
+    def __init__(self, declaration: FuncExpr, closure: tuple[Cell, ...]) -> None:
         self.declaration = declaration
-        self.closure = env
+        self.closure = closure
 
     def arity(self) -> int:
         return len(self.declaration.args)
 
     def call(self, interpreter: 'Interpreter', args: list[object]) -> object:
-        for i, fun_arg in enumerate(self.declaration.args):
-            self.closure.define(name=fun_arg.lexem, value=args[i])
+        if interpreter.tiering is not None:
+            return interpreter.tiering.call(self, interpreter, args)
+        return self.interpret(interpreter, args)
 
+    def interpret(self, interpreter: 'Interpreter', args: list[object]) -> object:
+        for slot in self.declaration.cells:
+            args[slot] = Cell(args[slot])
         try:
-            interpreter.executeBlock(self.declaration.stmts, self.closure)
+            interpreter.executeBlock(self.declaration.stmts, Frame(args, self.closure))
         except Return as return_:
             return return_.value
 
@@ -0,0 +1,105 @@
+import operator
+from collections.abc import Callable
+from enum import IntEnum
+from typing import Any
+
+from src.tokens import TokenType
+
+
+class Type(IntEnum):
+    # what type inference can prove a value always is
+    NUMBER = 0
+    STRING = 1
+
+
+def is_truth(val: object) -> bool:
+    if not val:
+        return False
+    if isinstance(val, bool):
+        return val
+
+    return True
+
+
+def is_equal(left: object, right: object) -> bool:
+    if not left and not right:
+        return True
+    if not left:
+        return False
+
+    return left == right
+
+
+def binary(operator: TokenType, left_val: object, right_val: object) -> object:
+    """
+    what `Interpreter.visitBinary` does once both operands are evaluated,
+    the optimizer folds constants with it too so both always agree.
+    """
+    # TODO: Allow for binary to work disregarding operands types
+    # this might raise exceptions from python
+    # look on how to define a standard for Lox
+    match (operator, left_val, right_val):
+        case (TokenType.PLUS, str(), str()):
+            return left_val + right_val
+        case (TokenType.PLUS, float(), float()):
+            return left_val + right_val
+        case (TokenType.MINUS, float(), float()):
+            return left_val - right_val
+        case (TokenType.SLASH, float(), float()):
+            return left_val / right_val
+        case (TokenType.STAR, float(), float()):
+            return left_val * right_val
+        case (TokenType.LESS, float(), float()):
+            return left_val < right_val
+        case (TokenType.LESS_EQUAL, float(), float()):
+            return left_val <= right_val
+        case (TokenType.GREATER, float(), float()):
+            return left_val > right_val
+        case (TokenType.GREATER_EQUAL, float(), float()):
+            return left_val >= right_val
+        case (TokenType.EQUAL_EQUAL, _, _):
+            return is_equal(left_val, right_val)
+        case (TokenType.BANG_EQUAL, _, _):
+            return not is_equal(left_val, right_val)
+
+    return None
+
+
+def unary(operator: TokenType, val: object) -> object:
+    match operator:
+        case TokenType.MINUS:
+            assert isinstance(val, float)
+            return -float(val)
+        case TokenType.BANG:
+            return is_truth(val)
+
+    return None
+
+
+# what `binary` and `unary` compute once the operands are known to be of a
+# `Type`, indexed by it, without checking them. Operators missing here aren't
+# specialized: they give nil, or fail, for that type.
+TYPED_BINARY: tuple[dict[TokenType, Callable[[Any, Any], object]], ...] = (
+    {
+        TokenType.PLUS: operator.add,
+        TokenType.MINUS: operator.sub,
+        TokenType.SLASH: operator.truediv,
+        TokenType.STAR: operator.mul,
+        TokenType.LESS: operator.lt,
+        TokenType.LESS_EQUAL: operator.le,
+        TokenType.GREATER: operator.gt,
+        TokenType.GREATER_EQUAL: operator.ge,
+        # `is_equal` agrees with == as long as both sides are numbers
+        TokenType.EQUAL_EQUAL: operator.eq,
+        TokenType.BANG_EQUAL: operator.ne,
+    },
+    {
+        TokenType.PLUS: operator.add,
+        TokenType.EQUAL_EQUAL: operator.eq,
+        TokenType.BANG_EQUAL: operator.ne,
+    },
+)
+TYPED_UNARY: tuple[dict[TokenType, Callable[[Any], object]], ...] = (
+    {TokenType.MINUS: operator.neg},
+    {},
+)
@@ -0,0 +1,214 @@
+from time import perf_counter
+from typing import TYPE_CHECKING, TextIO, final
+
+from src.ast.stmt.schema import FuncStmt
+from src.environment import Cell
+from src.interperter_lib import semantics
+from src.interperter_lib.interfaces import LoxCallable
+from src.interperter_lib.schema import LoxAnonymousFunction, LoxFunction
+from src.interperter_lib.semantics import is_equal
+from src.tokens import Token, TokenType
+from src.transpiler import Transpiler
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from src.ast.expr.schema import FuncExpr
+    from src.interperter_lib.interpreter import Interpreter
+
+    Compiled = Callable[['Interpreter', list[object], tuple[Cell, ...]], object]
+
+DEFAULT_THRESHOLD = 100
+# a call runs a loop many times over, it takes more of them to make a function hot
+LOOP_FACTOR = 10
+# what the interpreter's error shows of the call, it's always the closing paren
+_PAREN = Token(TokenType.PAREN_CLOSE, ')', None, 0)
+
+
+@final
+class Profile:
+    """what `Tiering` knows of a function declaration, shared by all the closures made of it"""
+
+    __slots__ = ('declaration', 'calls', 'iterations', 'compiled', 'seconds', 'failure')
+
+    def __init__(self, declaration: 'FuncStmt | FuncExpr') -> None:
+        self.declaration = declaration
+        self.calls = 0
+        # of the loops in its body, while it ran on the tree walker
+        self.iterations = 0
+        self.compiled: Compiled | None = None
+        self.seconds = 0.0
+        # why it couldn't be compiled, it stays on the tree walker then
+        self.failure: str | None = None
+
+    def __str__(self) -> str:
+        declaration = self.declaration
+        if isinstance(declaration, FuncStmt):
+            return f'{declaration.name.lexem} (line {declaration.name.line})'
+        return '<anonymous|fun>'
+
+
+@final
+class Tiering:
+    """
+    Counts calls of every function and iterations of the loops in it, once
+    either reaches its threshold the body is translated to Python
+    (`FunctionCompiler`) and `compile()`d, later calls run that instead of
+    walking the tree again.
+
+    The compiled code makes every check the tree walker does, values,
+    cells, globals and functions are the interpreter's, so the two mix
+    freely and nothing about types is assumed. What can fail is generating
+    or compiling it, CPython's parser has limits on nesting, the function
+    then stays on the tree walker for good.
+    """
+
+    def __init__(self, threshold: int = DEFAULT_THRESHOLD, loop_threshold: int | None = None) -> None:
+        self.threshold = threshold
+        self.loop_threshold = threshold * LOOP_FACTOR if loop_threshold is None else loop_threshold
+        # by the id of the declaration, the profile keeps it alive
+        self.profiles: dict[int, Profile] = {}
+
+    def call(
+        self, function: LoxFunction | LoxAnonymousFunction, interpreter: 'Interpreter', args: list[object]
+    ) -> object:
+        declaration = function.declaration
+        profile = self.profiles.get(id(declaration))
+        if profile is None:
+            profile = self.profiles[id(declaration)] = Profile(declaration)
+        profile.calls += 1
+
+        compiled = profile.compiled
+        if compiled is None and profile.failure is None:
+            if profile.calls >= self.threshold or profile.iterations >= self.loop_threshold:
+                compiled = self.promote(profile, interpreter)
+        if compiled is not None:
+            return compiled(interpreter, args, function.closure)
+
+        # the loops it runs count for it
+        caller = interpreter.profile
+        interpreter.profile = profile
+        try:
+            return function.interpret(interpreter, args)
+        finally:
+            interpreter.profile = caller
+
+    def promote(self, profile: Profile, interpreter: 'Interpreter') -> 'Compiled | None':
+        start = perf_counter()
+        try:
+            profile.compiled = FunctionCompiler(profile.declaration).compile(interpreter)
+        except (SyntaxError, RecursionError, MemoryError) as e:
+            profile.failure = f'{type(e).__name__}: {e}'
+        profile.seconds = perf_counter() - start
+        return profile.compiled
+
+    def report(self, out: TextIO) -> None:
+        promoted = [profile for profile in self.profiles.values() if profile.compiled or profile.failure]
+        for profile in promoted:
+            state = 'compiled' if profile.compiled else f'failed, {profile.failure}'
+            out.write(f'{profile!s:<32} {profile.calls:8d} calls {profile.seconds * 1000:8.2f}ms {state}\n')
+        seconds = sum(profile.seconds for profile in promoted)
+        out.write(f'{len(promoted)} of {len(self.profiles)} functions promoted in {seconds * 1000:.2f}ms\n')
+
+
+@final
+class FunctionCompiler(Transpiler):
+    """
+    Translates the body of one function into a Python function of
+    `(interpreter, args, closure)` that works on the interpreter's own
+    values: globals are its `Environment`, calls go through
+    `LoxCallable.call` with its checks and errors, and the functions it
+    makes are `LoxFunction`s, compiled in turn once they're hot.
+    """
+
+    def __init__(self, declaration: 'FuncStmt | FuncExpr') -> None:
+        # the closure's cells have no Lox name here, they're `_u0`, `_u1`...
+        super().__init__([''] * len(declaration.upvalues))
+        self.declaration = declaration
+        # the declarations of the functions it makes, by their name in the code
+        self.constants: dict[str, object] = {}
+
+    def compile(self, interpreter: 'Interpreter') -> 'Compiled':
+        declaration = self.declaration
+        params = [self.local(arg, slot) for slot, arg in enumerate(declaration.args)]
+        if params:
+            self.emit(f'{", ".join(params)}, = args')
+        for slot in declaration.cells:
+            self.emit(f'{params[slot]} = _Cell({params[slot]})')
+        if declaration.upvalues:
+            self.emit(f'{", ".join(self.cell(index) for index in range(len(declaration.upvalues)))}, = closure')
+        self.statements(declaration.body if isinstance(declaration, FuncStmt) else declaration.stmts)
+
+        source = '\n'.join(['def compiled(interpreter, args, closure):', *self.function.body()])
+        namespace = {**_runtime(interpreter), **self.constants}
+        name = declaration.name.lexem if isinstance(declaration, FuncStmt) else 'anonymous'
+        exec(compile(source, f'<lox {name}>', 'exec'), namespace)
+        return namespace['compiled']  # type: ignore[return-value]
+
+    def define_global(self, name: 'Token', value: str) -> None:
+        # function bodies don't define globals, for completeness
+        self.emit(f'_names[{name.lexem!r}] = {value}')
+
+    def global_value(self, name: 'Token') -> str:
+        # the `Environment` raises for a global that isn't there
+        return f'(_names[{name.lexem!r}] if {name.lexem!r} in _names else _get({name.lexem!r}))'
+
+    def assign_global(self, name: 'Token', value: str, statement: bool) -> str:
+        if statement:
+            self.emit(f'_assign({name.lexem!r}, {value})')
+        return f'_assign_global({name.lexem!r}, {value})'
+
+    def call(self, callee: str, args: list[str]) -> str:
+        return f'_call(interpreter, {callee}, [{", ".join(args)}])'
+
+    def function_value(self, declaration: 'FuncStmt | FuncExpr', name: str | None) -> str:
+        constant = f'_declaration{len(self.constants)}'
+        self.constants[constant] = declaration
+        kind = '_LoxFunction' if name is not None else '_LoxAnonymousFunction'
+        cells = self.captured(declaration.upvalues)
+        return f'{kind}({constant}, ({", ".join(cells)}{"," if len(cells) == 1 else ""}))'
+
+    def show(self, value: str) -> str:
+        # `print` writes `str()` of it as the interpreter's f-string does
+        return value
+
+
+def _runtime(interpreter: 'Interpreter') -> dict[str, object]:
+    globals_ = interpreter.globals
+
+    def assign_global(name: str, value: object) -> object:
+        globals_.assign(name, value)
+        return value
+
+    return {
+        '_names': globals_.values,
+        '_get': globals_.get,
+        '_assign': globals_.assign,
+        '_assign_global': assign_global,
+        '_call': _call,
+        '_Cell': Cell,
+        '_set': _set,
+        '_equal': is_equal,
+        '_negate': _negate,
+        '_LoxFunction': LoxFunction,
+        '_LoxAnonymousFunction': LoxAnonymousFunction,
+    }
+
+
+def _call(interpreter: 'Interpreter', callee: object, args: list[object]) -> object:
+    # `Interpreter.visitCall` once the callee and args are evaluated
+    if not isinstance(callee, LoxCallable):
+        raise RuntimeError(f"this isn't a function to be called {_PAREN}")
+    if len(args) != callee.arity():
+        raise RuntimeError(f'Expected {callee.arity()} argumnets but got {len(args)}')
+
+    return callee.call(interpreter, args)
+
+
+def _set(cell: Cell, value: object) -> object:
+    cell.value = value
+    return value
+
+
+def _negate(value: object) -> object:
+    return semantics.unary(TokenType.MINUS, value)
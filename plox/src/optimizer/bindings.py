@@ -0,0 +1,196 @@
+from collections.abc import Iterable
+from typing import TYPE_CHECKING, final
+
+from src.ast.expr.visitor import Visitor as ExprVisitor
+from src.ast.stmt.schema import Var
+from src.ast.stmt.visitor import Visitor as StmtVisitor
+from src.parser import LazyBody
+from src.tokens import Token
+
+if TYPE_CHECKING:
+    from src.ast.expr.schema import Assign, Binary, Call, FuncExpr, Grouping, Literal, Logical, Unary, Variable
+    from src.ast.stmt.schema import Block, Expression, For, FuncStmt, IfStmt, Print, ReturnStmt, Stmt, While
+
+
+@final
+class Binding:
+    """
+    A variable as the optimizer sees it: a local declaration (a `Var`, a
+    `FuncStmt` or an arg's token) or a global name, however many times it is
+    declared, with how many times it's read and assigned.
+    """
+
+    __slots__ = ('name', 'declaration', 'declarations', 'reads', 'writes', 'escaped', 'is_global', 'early')
+
+    def __init__(self, name: str, declaration: 'Var | FuncStmt | Token | None', is_global: bool) -> None:
+        self.name = name
+        self.declaration = declaration
+        self.declarations = 0 if declaration is None else 1
+        self.reads = 0
+        self.writes = 0
+        # an unparsed function body can see it, it may read or assign it
+        self.escaped = False
+        self.is_global = is_global
+        # a global used before any of its declarations, the value it had then
+        # comes from outside what's optimized (an earlier declaration with
+        # --stream) or from another `var` of the same name
+        self.early = False
+
+    @property
+    def constant(self) -> bool:
+        """a single `var` never assigned after it's declared"""
+        return isinstance(self.declaration, Var) and self.declarations == 1 and not self.writes and not self.escaped
+
+
+@final
+class Bindings(ExprVisitor[None], StmtVisitor[None]):
+    """
+    Finds the `Binding` every `Variable` and `Assign` of a program refers to,
+    with the resolver's scoping rules, and the one every declaration makes.
+    Nodes are keyed by identity, so the program must not change in between.
+    """
+
+    def __init__(self, statements: Iterable['Stmt']) -> None:
+        self.statements = list(statements)
+        self.globals: dict[str, Binding] = {}
+        self.scopes: list[dict[str, Binding]] = []
+        self.references: dict[int, Binding] = {}
+        self.declarations: dict[int, Binding] = {}
+        self.opaque = False
+        for statement in self.statements:
+            statement.accept(self)
+
+        if self.opaque:
+            # globals are looked up by name, any of them can be used from there
+            for binding in self.globals.values():
+                binding.escaped = True
+
+    def of(self, node: 'Variable | Assign') -> Binding | None:
+        return self.references.get(id(node))
+
+    def declared(self, node: 'Var | FuncStmt') -> Binding | None:
+        return self.declarations.get(id(node))
+
+    def __declare(self, name: Token, declaration: 'Var | FuncStmt | Token') -> Binding:
+        if self.scopes:
+            binding = self.scopes[-1][name.lexem] = Binding(name.lexem, declaration, False)
+        else:
+            binding = self.globals.get(name.lexem) or self.__global(name.lexem)
+            binding.declaration = declaration
+            binding.declarations += 1
+
+        if not isinstance(declaration, Token):
+            self.declarations[id(declaration)] = binding
+        return binding
+
+    def __global(self, name: str) -> Binding:
+        binding = self.globals[name] = Binding(name, None, True)
+        return binding
+
+    def __lookup(self, node: 'Variable | Assign') -> Binding:
+        name = node.name.lexem
+        for scope in reversed(self.scopes):
+            binding = scope.get(name)
+            if binding is not None:
+                break
+        else:
+            binding = self.globals.get(name) or self.__global(name)
+            if not binding.declarations:
+                binding.early = True
+
+        self.references[id(node)] = binding
+        return binding
+
+    def __function(self, args: tuple[Token, ...], body: 'tuple[Stmt, ...] | LazyBody') -> None:
+        self.scopes.append({})
+        for arg in args:
+            self.__declare(arg, arg)
+
+        if isinstance(body, LazyBody) and not body.parsed:
+            self.opaque = True
+            for scope in self.scopes:
+                for binding in scope.values():
+                    binding.escaped = True
+        else:
+            for statement in body:
+                statement.accept(self)
+        self.scopes.pop()
+
+    def visitExpression(self, expression: 'Expression') -> None:
+        expression.expression.accept(self)
+
+    def visitWhile(self, while_: 'While') -> None:
+        while_.condition.accept(self)
+        while_.statement.accept(self)
+
+    def visitFor(self, for_: 'For') -> None:
+        self.scopes.append({})
+        if for_.initializer:
+            for_.initializer.accept(self)
+        if for_.condition:
+            for_.condition.accept(self)
+        if for_.increment:
+            for_.increment.accept(self)
+        for_.body.accept(self)
+        self.scopes.pop()
+
+    def visitIfStmt(self, if_stmt_: 'IfStmt') -> None:
+        if_stmt_.condition.accept(self)
+        if_stmt_.then_branch.accept(self)
+        if if_stmt_.else_branch:
+            if_stmt_.else_branch.accept(self)
+
+    def visitPrint(self, print_: 'Print') -> None:
+        print_.expression.accept(self)
+
+    def visitFuncStmt(self, func_: 'FuncStmt') -> None:
+        self.__declare(func_.name, func_)
+        self.__function(func_.args, func_.body)
+
+    def visitVarStmt(self, var_: 'Var') -> None:
+        # a global's initializer still sees the previous declaration
+        if var_.initializer:
+            var_.initializer.accept(self)
+        self.__declare(var_.name, var_)
+
+    def visitReturnStmt(self, return_: 'ReturnStmt') -> None:
+        if return_.value:
+            return_.value.accept(self)
+
+    def visitBlock(self, block_: 'Block') -> None:
+        self.scopes.append({})
+        for statement in block_.statements:
+            statement.accept(self)
+        self.scopes.pop()
+
+    def visitAssign(self, assign: 'Assign') -> None:
+        assign.expr.accept(self)
+        self.__lookup(assign).writes += 1
+
+    def visitCall(self, call_: 'Call') -> None:
+        call_.callee.accept(self)
+        for arg in call_.args:
+            arg.accept(self)
+
+    def visitLogical(self, logical_: 'Logical') -> None:
+        logical_.left.accept(self)
+        logical_.right.accept(self)
+
+    def visitBinary(self, binary: 'Binary') -> None:
+        binary.left.accept(self)
+        binary.right.accept(self)
+
+    def visitUnary(self, unary: 'Unary') -> None:
+        unary.right.accept(self)
+
+    def visitFuncExpr(self, func_: 'FuncExpr') -> None:
+        self.__function(func_.args, func_.stmts)
+
+    def visitGrouping(self, grouping: 'Grouping') -> None:
+        grouping.expression.accept(self)
+
+    def visitLiteral(self, literal: 'Literal') -> None:
+        return
+
+    def visitVariable(self, variable: 'Variable') -> None:
+        self.__lookup(variable).reads += 1
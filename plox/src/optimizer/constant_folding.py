@@ -0,0 +1,130 @@
+from collections.abc import Iterable
+from typing import TYPE_CHECKING, final
+
+from src.ast.expr.schema import Literal
+from src.ast.stmt.schema import Block
+from src.interperter_lib import semantics
+from src.interperter_lib.semantics import is_truth
+from src.optimizer.bindings import Binding, Bindings
+from src.optimizer.transformer import Transformer, rebuild
+from src.tokens import TokenType
+
+if TYPE_CHECKING:
+    from src.ast.expr.schema import Binary, Expr, Grouping, Logical, Unary, Variable
+    from src.ast.stmt.schema import For, IfStmt, Stmt, Var, While
+
+
+@final
+class ConstantFolder(Transformer):
+    """
+    Evaluates what doesn't depend on the program running: operators over
+    literals, through `semantics` so the result is what the interpreter would
+    have computed, and reads of a `var` never assigned to whose initializer
+    folded to a literal. `if`s and loops on a constant lose the branch
+    that can't run. Whatever would fail at runtime (`-"a"`, `1 / 0`) is left
+    as is to fail there.
+    """
+
+    def __init__(self, bindings: Bindings) -> None:
+        self.bindings = bindings
+        # values of the constant bindings whose declaration was already folded
+        self.values: dict[Binding, Literal] = {}
+
+    def visitVarStmt(self, var_: 'Var') -> 'Stmt | None':
+        initializer = self.expression(var_.initializer) if var_.initializer else None
+        binding = self.bindings.declared(var_)
+        if binding is not None and binding.constant:
+            if initializer is None:
+                self.values[binding] = Literal(None)
+            elif isinstance(initializer, Literal):
+                self.values[binding] = initializer
+
+        return rebuild(var_, initializer=initializer)
+
+    def visitIfStmt(self, if_stmt_: 'IfStmt') -> 'Stmt | None':
+        condition = self.expression(if_stmt_.condition)
+        if not isinstance(condition, Literal):
+            return rebuild(
+                if_stmt_,
+                condition=condition,
+                then_branch=self.branch(if_stmt_.then_branch),
+                else_branch=self.statement(if_stmt_.else_branch) if if_stmt_.else_branch else None,
+            )
+
+        if is_truth(condition.value):
+            return self.statement(if_stmt_.then_branch)
+
+        return self.statement(if_stmt_.else_branch) if if_stmt_.else_branch else None
+
+    def visitWhile(self, while_: 'While') -> 'Stmt | None':
+        condition = self.expression(while_.condition)
+        if isinstance(condition, Literal) and not is_truth(condition.value):
+            return None
+
+        return rebuild(while_, condition=condition, statement=self.branch(while_.statement))
+
+    def visitFor(self, for_: 'For') -> 'Stmt | None':
+        initializer = self.statement(for_.initializer) if for_.initializer else None
+        condition = self.expression(for_.condition) if for_.condition else None
+        if isinstance(condition, Literal) and not is_truth(condition.value):
+            # only the initializer runs, in a scope of its own still
+            return Block((initializer,)) if initializer else None
+
+        return rebuild(
+            for_,
+            initializer=initializer,
+            condition=condition,
+            increment=self.expression(for_.increment) if for_.increment else None,
+            body=self.branch(for_.body),
+        )
+
+    def visitLogical(self, logical_: 'Logical') -> 'Expr':
+        left = self.expression(logical_.left)
+        if not isinstance(left, Literal):
+            return rebuild(logical_, left=left, right=self.expression(logical_.right))
+
+        # `or` stops at a truthy left, `and` at a falsy one, returning it
+        if is_truth(left.value) == (logical_.operator.type == TokenType.OR):
+            return left
+
+        return self.expression(logical_.right)
+
+    def visitBinary(self, binary: 'Binary') -> 'Expr':
+        left = self.expression(binary.left)
+        right = self.expression(binary.right)
+        if isinstance(left, Literal) and isinstance(right, Literal):
+            try:
+                return Literal(semantics.binary(binary.operator.type, left.value, right.value))
+            except ArithmeticError:
+                pass
+
+        return rebuild(binary, left=left, right=right)
+
+    def visitUnary(self, unary: 'Unary') -> 'Expr':
+        right = self.expression(unary.right)
+        if isinstance(right, Literal):
+            try:
+                return Literal(semantics.unary(unary.operator.type, right.value))
+            except AssertionError:
+                pass
+
+        return rebuild(unary, right=right)
+
+    def visitGrouping(self, grouping: 'Grouping') -> 'Expr':
+        expression = self.expression(grouping.expression)
+        if isinstance(expression, Literal):
+            return expression
+
+        return rebuild(grouping, expression=expression)
+
+    def visitVariable(self, variable: 'Variable') -> 'Expr':
+        binding = self.bindings.of(variable)
+        if binding is None:
+            return variable
+
+        return self.values.get(binding, variable)
+
+
+def fold_constants(statements: Iterable['Stmt']) -> list['Stmt']:
+    statements = list(statements)
+    return ConstantFolder(Bindings(statements)).transform(statements)
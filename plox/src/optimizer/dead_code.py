@@ -0,0 +1,135 @@
+from collections.abc import Iterable
+from typing import TYPE_CHECKING, final
+
+from src.ast.expr.schema import Binary, FuncExpr, Grouping, Literal, Logical, Unary, Variable
+from src.ast.stmt.schema import Block, Expression, IfStmt, ReturnStmt, Var
+from src.optimizer.bindings import Binding, Bindings
+from src.optimizer.transformer import Transformer, rebuild
+from src.tokens import TokenType
+
+if TYPE_CHECKING:
+    from src.ast.expr.schema import Assign, Expr
+    from src.ast.stmt.schema import Stmt
+
+
+@final
+class UnreachableCode(Transformer):
+    """
+    Drops what follows a statement that always returns in the same list of
+    statements: a `return`, a block with one in it, or an `if` whose both
+    branches do.
+    """
+
+    def statements(self, statements: Iterable['Stmt']) -> tuple['Stmt', ...]:
+        transformed: list[Stmt] = []
+        for statement in statements:
+            result = statement.accept(self)
+            if result is None:
+                continue
+
+            transformed.append(result)
+            if _returns(result):
+                break
+
+        return tuple(transformed)
+
+
+@final
+class PureStatements(Transformer):
+    """
+    Drops expression statements that can't do anything: no call, no
+    assignment and nothing that could fail at runtime, like reading a global
+    (it may not be defined) or a `/` (by zero) or a `-` (of a string).
+    """
+
+    def __init__(self, bindings: Bindings) -> None:
+        self.bindings = bindings
+
+    def visitExpression(self, expression: 'Expression') -> 'Stmt | None':
+        return None if _pure(expression.expression, self.bindings) else expression
+
+
+@final
+class UnusedVariables(Transformer):
+    """
+    Drops the local `var`s nothing reads. Their initializer, unless it's pure,
+    and the values assigned to them are still evaluated, as expression
+    statements and as the bare value of the `Assign`s. Globals are kept, a program run a
+    declaration at a time may read them further down.
+    """
+
+    def __init__(self, bindings: Bindings) -> None:
+        self.bindings = bindings
+        self.removed = 0
+
+    def __unused(self, binding: Binding | None) -> bool:
+        return binding is not None and not binding.is_global and not binding.reads and not binding.escaped
+
+    def visitVarStmt(self, var_: 'Var') -> 'Stmt | None':
+        initializer = self.expression(var_.initializer) if var_.initializer else None
+        if not self.__unused(self.bindings.declared(var_)):
+            return rebuild(var_, initializer=initializer)
+
+        self.removed += 1
+        return None if initializer is None or _pure(initializer, self.bindings) else Expression(initializer)
+
+    def visitAssign(self, assign: 'Assign') -> 'Expr':
+        expr = self.expression(assign.expr)
+        if self.__unused(self.bindings.of(assign)):
+            return expr
+
+        return rebuild(assign, expr=expr)
+
+
+def _pure(expr: 'Expr', bindings: Bindings) -> bool:
+    match expr:
+        case Literal() | FuncExpr():
+            return True
+        case Variable():
+            binding = bindings.of(expr)
+            return binding is not None and not binding.is_global
+        case Grouping():
+            return _pure(expr.expression, bindings)
+        case Logical():
+            return _pure(expr.left, bindings) and _pure(expr.right, bindings)
+        case Binary():
+            return expr.operator.type != TokenType.SLASH and _pure(expr.left, bindings) and _pure(expr.right, bindings)
+        case Unary():
+            return expr.operator.type == TokenType.BANG and _pure(expr.right, bindings)
+
+    return False
+
+
+def _returns(statement: 'Stmt') -> bool:
+    match statement:
+        case ReturnStmt():
+            return True
+        case Block():
+            return any(_returns(inner) for inner in statement.statements)
+        case IfStmt():
+            return (
+                statement.else_branch is not None
+                and _returns(statement.then_branch)
+                and _returns(statement.else_branch)
+            )
+
+    return False
+
+
+def remove_unreachable(statements: Iterable['Stmt']) -> list['Stmt']:
+    return UnreachableCode().transform(statements)
+
+
+def remove_pure_statements(statements: Iterable['Stmt']) -> list['Stmt']:
+    statements = list(statements)
+    return PureStatements(Bindings(statements)).transform(statements)
+
+
+def remove_unused_variables(statements: Iterable['Stmt']) -> list['Stmt']:
+    # a `var` only read by the initializer of an unused one is unused in turn
+    statements = list(statements)
+    while True:
+        eliminator = UnusedVariables(Bindings(statements))
+        statements = eliminator.transform(statements)
+        if not eliminator.removed:
+            return statements
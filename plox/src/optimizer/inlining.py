@@ -0,0 +1,305 @@
+from collections.abc import Callable, Iterable
+from dataclasses import replace
+from typing import NamedTuple, final
+
+from src.ast.expr.schema import Assign, Call, Expr, FuncExpr, Literal, Variable
+from src.ast.stmt.schema import Block, Expression, For, FuncStmt, ReturnStmt, Stmt, Var
+from src.optimizer.bindings import Binding, Bindings
+from src.optimizer.transformer import Transformer, rebuild
+from src.parser import LazyBody
+from src.tokens import Token
+from src.visitors.ast_dumper import walk
+
+# nodes in a function body, past that it isn't inlined
+DEFAULT_BUDGET = 40
+
+
+class _Callee(NamedTuple):
+    declaration: FuncStmt
+    # the body without its final return, and what that returns (None if nothing)
+    statements: tuple[Stmt, ...]
+    result: Expr | None
+    # globals it uses, a call site where a local hides one of them can't have it
+    free: frozenset[str]
+    # a single `return` of an expression without calls or assignments
+    pure: bool
+
+
+@final
+class Inliner(Transformer):
+    """
+    Replaces calls of small top level functions by their body. A function
+    qualifies when its name is never assigned nor declared again, it doesn't
+    call itself, define functions or return anywhere but at its end, and its
+    body is at most `budget` nodes. Only calls that come after its
+    declaration are inlined, earlier ones may run before it exists.
+
+    Lox has no block expressions, so a body goes where a statement can:
+    `f(a);`, `x = f(a);`, `var x = f(a);` and `return f(a);` become a block
+    declaring the args, the body, and the use of what it returns. Anywhere
+    else, only a pure `return` expression is inlined, with args that are
+    literals or locals substituted for the params.
+
+    Args and locals get names no source can spell (`x#3`), so they can't
+    capture anything at the call site.
+    """
+
+    def __init__(self, bindings: Bindings, budget: int = DEFAULT_BUDGET) -> None:
+        self.bindings = bindings
+        self.budget = budget
+        self.callees: dict[Binding, _Callee] = {}
+        # names declared by the enclosing functions and blocks
+        self.scopes: list[set[str]] = []
+        self.renamed = 0
+        self.inlined = 0
+
+    def statements(self, statements: Iterable[Stmt]) -> tuple[Stmt, ...]:
+        transformed: list[Stmt] = []
+        for statement in statements:
+            if not isinstance(statement, Var) or not isinstance(statement.initializer, Call):
+                result = statement.accept(self)
+                if result is not None:
+                    transformed.append(result)
+                continue
+
+            # `var x = f(a);` -> `var x; { ..., x = <result>; }`
+            self.__declare(statement.name.lexem)
+            call = self.expression(statement.initializer)
+            callee = self.__callee(call)
+            if isinstance(call, Call) and callee is not None and self.__unseen(statement.name.lexem, call, callee):
+                name = statement.name
+                transformed.append(replace(statement, initializer=None))
+                transformed.append(self.__inline(call, callee, lambda result: Expression(Assign(name, result))))
+            else:
+                transformed.append(rebuild(statement, initializer=call))
+
+        return tuple(transformed)
+
+    def visitExpression(self, expression: Expression) -> Stmt | None:
+        inner = self.expression(expression.expression)
+        if isinstance(inner, Call) and (callee := self.__callee(inner)) is not None:
+            return self.__inline(inner, callee, lambda result: Expression(result) if callee.result else None)
+
+        if isinstance(inner, Assign) and (callee := self.__callee(inner.expr)) is not None:
+            assert isinstance(inner.expr, Call)
+            return self.__inline(inner.expr, callee, lambda result: Expression(replace(inner, expr=result)))
+
+        return rebuild(expression, expression=inner)
+
+    def visitReturnStmt(self, return_: ReturnStmt) -> Stmt | None:
+        value = self.expression(return_.value) if return_.value else None
+        if isinstance(value, Call) and (callee := self.__callee(value)) is not None:
+            return self.__inline(value, callee, lambda result: replace(return_, value=result))
+
+        return rebuild(return_, value=value)
+
+    def visitCall(self, call_: Call) -> Expr:
+        call = super().visitCall(call_)
+        assert isinstance(call, Call)
+        callee = self.__callee(call)
+        if callee is None or not callee.pure or not all(self.__substitutable(arg) for arg in call.args):
+            return call
+
+        assert callee.result is not None
+        self.inlined += 1
+        params = {param.lexem: arg for param, arg in zip(callee.declaration.args, call.args)}
+        return _Substitute(params).expression(callee.result)
+
+    def visitFuncStmt(self, func_: FuncStmt) -> Stmt | None:
+        self.__declare(func_.name.lexem)
+        top_level = not self.scopes
+        self.scopes.append({arg.lexem for arg in func_.args})
+        transformed = super().visitFuncStmt(func_)
+        self.scopes.pop()
+
+        assert isinstance(transformed, FuncStmt)
+        binding = self.bindings.declared(func_)
+        if (
+            top_level
+            and binding is not None
+            and binding.declarations == 1
+            and not binding.writes
+            and not binding.escaped
+        ):
+            callee = self.__qualify(transformed)
+            if callee is not None:
+                self.callees[binding] = callee
+
+        return transformed
+
+    def visitFuncExpr(self, func_: FuncExpr) -> Expr:
+        self.scopes.append({arg.lexem for arg in func_.args})
+        transformed = super().visitFuncExpr(func_)
+        self.scopes.pop()
+        return transformed
+
+    def visitVarStmt(self, var_: Var) -> Stmt | None:
+        # a local is declared before its initializer runs, it hides a global there
+        self.__declare(var_.name.lexem)
+        return super().visitVarStmt(var_)
+
+    def visitBlock(self, block_: Block) -> Stmt | None:
+        self.scopes.append(set())
+        transformed = super().visitBlock(block_)
+        self.scopes.pop()
+        return transformed
+
+    def visitFor(self, for_: For) -> Stmt | None:
+        self.scopes.append(set())
+        transformed = super().visitFor(for_)
+        self.scopes.pop()
+        return transformed
+
+    def __declare(self, name: str) -> None:
+        if self.scopes:
+            self.scopes[-1].add(name)
+
+    def __substitutable(self, arg: Expr) -> bool:
+        # the body may not read it, so it has to be fine not to evaluate it: a
+        # global may not exist and raise
+        if isinstance(arg, Literal):
+            return True
+        if isinstance(arg, Variable):
+            binding = self.bindings.of(arg)
+            return binding is not None and not binding.is_global
+        return False
+
+    def __callee(self, call: Expr) -> _Callee | None:
+        if not isinstance(call, Call) or not isinstance(call.callee, Variable):
+            return None
+
+        binding = self.bindings.of(call.callee)
+        callee = self.callees.get(binding) if binding is not None else None
+        if callee is None or len(call.args) != len(callee.declaration.args):
+            return None
+
+        # a local of the call site hiding a global the body uses
+        if any(name in scope for scope in self.scopes for name in callee.free):
+            return None
+
+        return callee
+
+    def __unseen(self, name: str, call: Call, callee: _Callee) -> bool:
+        # `var x = f(a)` declares x before running the body, neither it nor the
+        # args may see x then
+        if name in callee.free:
+            return False
+
+        return not any(isinstance(node, (Variable, Assign)) and node.name.lexem == name for *_, node in walk(call.args))
+
+    def __qualify(self, func_: FuncStmt) -> _Callee | None:
+        body = func_.body
+        if isinstance(body, LazyBody) and not body.parsed:
+            return None
+
+        statements = tuple(body)
+        nodes = [node for *_, node in walk(statements)]
+        if len(nodes) > self.budget:
+            return None
+
+        for node in nodes:
+            if isinstance(node, (FuncStmt, FuncExpr)):
+                return None
+            if isinstance(node, Variable) and node.name.lexem == func_.name.lexem:
+                # calls itself, or a local hides its name, either way not worth it
+                return None
+            if isinstance(node, ReturnStmt) and (not statements or node is not statements[-1]):
+                return None
+
+        result: Expr | None = None
+        if statements and isinstance(statements[-1], ReturnStmt):
+            result = statements[-1].value
+            statements = statements[:-1]
+
+        renamer = _Rename({arg.lexem: arg.lexem for arg in func_.args}, '')
+        renamer.statements(statements)
+        if result is not None:
+            renamer.expression(result)
+
+        pure = (
+            not statements
+            and result is not None
+            and not any(isinstance(node, (Call, Assign)) for *_, node in walk([Expression(result)]))
+        )
+        return _Callee(func_, statements, result, frozenset(renamer.free), pure)
+
+    def __inline(self, call: Call, callee: _Callee, use: Callable[[Expr], Stmt | None]) -> Stmt:
+        # `use` makes the last statement out of what the body returns, renamed
+        self.renamed += 1
+        self.inlined += 1
+        suffix = f'#{self.renamed}'
+        args = callee.declaration.args
+        renamer = _Rename({arg.lexem: arg.lexem + suffix for arg in args}, suffix)
+
+        statements: list[Stmt] = [Var(_renamed(arg, suffix), value) for arg, value in zip(args, call.args)]
+        statements.extend(renamer.statements(callee.statements))
+        last = use(renamer.expression(callee.result) if callee.result else Literal(None))
+        if last is not None:
+            statements.append(last)
+
+        return Block(tuple(statements))
+
+
+def _renamed(token: Token, suffix: str) -> Token:
+    return replace(token, lexem=token.lexem + suffix)
+
+
+@final
+class _Rename(Transformer):
+    """
+    Gives the args (`params`, by their old name) and the locals of a body new
+    names, collects the names it uses without declaring them in `free`.
+    """
+
+    def __init__(self, params: dict[str, str], suffix: str) -> None:
+        self.scopes: list[dict[str, str]] = [params]
+        self.suffix = suffix
+        self.free: set[str] = set()
+
+    def __name(self, token: Token) -> Token:
+        for scope in reversed(self.scopes):
+            name = scope.get(token.lexem)
+            if name is not None:
+                return token if name == token.lexem else replace(token, lexem=name)
+
+        self.free.add(token.lexem)
+        return token
+
+    def visitVarStmt(self, var_: Var) -> Stmt | None:
+        initializer = self.expression(var_.initializer) if var_.initializer else None
+        self.scopes[-1][var_.name.lexem] = var_.name.lexem + self.suffix
+        return replace(var_, name=_renamed(var_.name, self.suffix), initializer=initializer)
+
+    def visitBlock(self, block_: Block) -> Stmt | None:
+        self.scopes.append({})
+        transformed = super().visitBlock(block_)
+        self.scopes.pop()
+        return transformed
+
+    def visitFor(self, for_: For) -> Stmt | None:
+        self.scopes.append({})
+        transformed = super().visitFor(for_)
+        self.scopes.pop()
+        return transformed
+
+    def visitVariable(self, variable: Variable) -> Expr:
+        return rebuild(variable, name=self.__name(variable.name))
+
+    def visitAssign(self, assign: Assign) -> Expr:
+        expr = self.expression(assign.expr)
+        return rebuild(assign, name=self.__name(assign.name), expr=expr)
+
+
+@final
+class _Substitute(Transformer):
+    # the params of a pure `return` expression replaced by the call's args
+    def __init__(self, params: dict[str, Expr]) -> None:
+        self.params = params
+
+    def visitVariable(self, variable: Variable) -> Expr:
+        return self.params.get(variable.name.lexem, variable)
+
+
+def inline_functions(statements: Iterable[Stmt], budget: int = DEFAULT_BUDGET) -> list[Stmt]:
+    statements = list(statements)
+    return Inliner(Bindings(statements), budget).transform(statements)
@@ -0,0 +1,188 @@
+from collections.abc import Iterable
+from typing import TYPE_CHECKING, NamedTuple, final
+
+from src.ast.expr.schema import Assign, Binary, Call, FuncExpr, Grouping, Literal, Logical, Unary, Variable
+from src.ast.stmt.schema import Block, For, FuncStmt, Var, While
+from src.optimizer.bindings import Binding, Bindings
+from src.optimizer.transformer import Transformer
+from src.tokens import Token, TokenType
+from src.visitors.ast_dumper import walk
+
+if TYPE_CHECKING:
+    from src.ast.expr.schema import Expr
+    from src.ast.stmt.schema import Stmt
+
+
+class _Loop(NamedTuple):
+    # what a loop, all its clauses and body, assigns and declares, and
+    # whether it calls anything, which may assign whatever a closure sees
+    writes: frozenset[Binding]
+    declares: frozenset[Binding]
+    calls: bool
+
+
+@final
+class LoopInvariants(Transformer):
+    """
+    Hoists the subexpressions of a `while` or a `for` that give the same
+    value on every iteration into a `var` evaluated once before the loop, the
+    loop and those become a block.
+
+    An expression is hoisted if it has an operator and all it reads are
+    variables declared outside the loop and never assigned in it, or never
+    assigned at all if the loop makes calls. Those are locals, and globals
+    declared before a top level loop. Since it now runs even if the loop
+    doesn't, it also can't fail: no `/` but by a non zero literal and no `-`
+    but of a number literal. Function bodies in the loop are left alone.
+    """
+
+    def __init__(self, bindings: Bindings, statements: Iterable['Stmt']) -> None:
+        self.bindings = bindings
+        self.loops: dict[int, _Loop] = {}
+        for *_, node in walk(statements):
+            if isinstance(node, (While, For)):
+                self.loops[id(node)] = self.__loop(node)
+
+        # globals declared by the top level statements visited so far
+        self.declared: set[Binding] = set()
+        self.functions = 0
+        self.hoisted = 0
+
+    def __loop(self, loop: While | For) -> _Loop:
+        writes: set[Binding] = set()
+        declares: set[Binding] = set()
+        calls = False
+        for *_, node in walk([loop]):
+            if isinstance(node, Assign):
+                binding = self.bindings.of(node)
+                if binding is not None:
+                    writes.add(binding)
+            elif isinstance(node, (Var, FuncStmt)):
+                binding = self.bindings.declared(node)
+                if binding is not None:
+                    declares.add(binding)
+            elif isinstance(node, Call):
+                calls = True
+
+        return _Loop(frozenset(writes), frozenset(declares), calls)
+
+    def visitVarStmt(self, var_: Var) -> 'Stmt | None':
+        transformed = super().visitVarStmt(var_)
+        self.__declare(var_)
+        return transformed
+
+    def visitFuncStmt(self, func_: FuncStmt) -> 'Stmt | None':
+        self.__declare(func_)
+        self.functions += 1
+        transformed = super().visitFuncStmt(func_)
+        self.functions -= 1
+        return transformed
+
+    def visitFuncExpr(self, func_: FuncExpr) -> 'Expr':
+        self.functions += 1
+        transformed = super().visitFuncExpr(func_)
+        self.functions -= 1
+        return transformed
+
+    def visitWhile(self, while_: While) -> 'Stmt | None':
+        return self.__hoist(while_, super().visitWhile(while_))
+
+    def visitFor(self, for_: For) -> 'Stmt | None':
+        return self.__hoist(for_, super().visitFor(for_))
+
+    def __hoist(self, original: While | For, transformed: 'Stmt | None') -> 'Stmt | None':
+        # inner loops were done first, what they hoisted may be invariant here too
+        loop = self.loops.get(id(original))
+        if loop is None or transformed is None:
+            return transformed
+
+        hoister = _Hoist(self, loop)
+        transformed = hoister.statement(transformed)
+        if not hoister.hoisted:
+            return transformed
+
+        assert transformed is not None
+        return Block((*hoister.hoisted, transformed))
+
+    def __declare(self, node: 'Var | FuncStmt') -> None:
+        binding = self.bindings.declared(node)
+        if binding is not None and binding.is_global and not self.functions:
+            self.declared.add(binding)
+
+    def invariant(self, variable: Variable, loop: _Loop) -> bool:
+        binding = self.bindings.of(variable)
+        if binding is None or binding.escaped or binding in loop.writes or binding in loop.declares:
+            return False
+        if loop.calls and binding.writes:
+            return False
+        if binding.is_global:
+            # it has to exist when the loop starts, only sure at the top level
+            return not self.functions and binding in self.declared
+
+        return True
+
+    def temporary(self, line: int) -> Token:
+        # a name no source can spell
+        self.hoisted += 1
+        return Token(TokenType.IDENTIFIER, f'loop#{self.hoisted}', None, line)
+
+
+@final
+class _Hoist(Transformer):
+    # replaces the invariants of one loop, outside of function bodies, by temporaries
+    def __init__(self, pass_: LoopInvariants, loop: _Loop) -> None:
+        self.pass_ = pass_
+        self.loop = loop
+        self.hoisted: list[Var] = []
+
+    def expression(self, expression: 'Expr') -> 'Expr':
+        if isinstance(expression, (Binary, Unary, Logical)) and self.__invariant(expression):
+            token = self.pass_.temporary(expression.operator.line)
+            self.hoisted.append(Var(token, expression))
+            return Variable(token)
+
+        return expression.accept(self)
+
+    def visitFuncStmt(self, func_: FuncStmt) -> 'Stmt | None':
+        return func_
+
+    def visitFuncExpr(self, func_: FuncExpr) -> 'Expr':
+        return func_
+
+    def __invariant(self, expr: 'Expr') -> bool:
+        match expr:
+            case Literal():
+                return True
+            case Variable():
+                return self.pass_.invariant(expr, self.loop)
+            case Grouping():
+                return self.__invariant(expr.expression)
+            case Logical():
+                return self.__invariant(expr.left) and self.__invariant(expr.right)
+            case Binary():
+                if expr.operator.type == TokenType.SLASH and not _nonzero(expr.right):
+                    return False
+                return self.__invariant(expr.left) and self.__invariant(expr.right)
+            case Unary():
+                if expr.operator.type == TokenType.MINUS and not isinstance(_literal(expr.right), float):
+                    return False
+                return self.__invariant(expr.right)
+
+        # calls, assignments, functions
+        return False
+
+
+def _literal(expr: 'Expr') -> object:
+    while isinstance(expr, Grouping):
+        expr = expr.expression
+    return expr.value if isinstance(expr, Literal) else None
+
+
+def _nonzero(expr: 'Expr') -> bool:
+    value = _literal(expr)
+    return isinstance(value, float) and value != 0
+
+
+def hoist_invariants(statements: Iterable['Stmt']) -> list['Stmt']:
+    statements = list(statements)
+    return LoopInvariants(Bindings(statements), statements).transform(statements)
@@ -0,0 +1,97 @@
+from collections.abc import Callable, Iterable, Sequence
+from time import perf_counter
+from typing import TYPE_CHECKING, NamedTuple, TextIO, final
+
+from src.optimizer.constant_folding import fold_constants
+from src.optimizer.dead_code import remove_pure_statements, remove_unreachable, remove_unused_variables
+from src.optimizer.inlining import DEFAULT_BUDGET, inline_functions
+from src.optimizer.loop_invariants import hoist_invariants
+from src.optimizer.type_inference import specialize_types
+from src.visitors.ast_dumper import walk
+
+if TYPE_CHECKING:
+    from src.ast.stmt.schema import Stmt
+
+LEVELS = (0, 1, 2)
+
+
+class Pass(NamedTuple):
+    name: str
+    run: Callable[[list['Stmt']], list['Stmt']]
+
+
+class Timing(NamedTuple):
+    name: str
+    seconds: float
+    # AST nodes before and after the pass
+    before: int
+    after: int
+
+
+@final
+class Pipeline:
+    """
+    Runs optimizer passes one after the other, each on what the previous one
+    returned. `timings` adds up, per pass, how long it took over every run
+    (a streamed program runs it once per declaration) and, if `counted`, how
+    many nodes it was given and returned. Nodes keep the slots the resolver
+    gave them, the result has to be resolved again.
+    """
+
+    def __init__(self, passes: Sequence[Pass], counted: bool = False) -> None:
+        self.passes = tuple(passes)
+        self.counted = counted
+        self.timings = [Timing(pass_.name, 0.0, 0, 0) for pass_ in self.passes]
+
+    def run(self, statements: Iterable['Stmt']) -> list['Stmt']:
+        statements = list(statements)
+        for i, pass_ in enumerate(self.passes):
+            before = _size(statements) if self.counted else 0
+            start = perf_counter()
+            statements = pass_.run(statements)
+            seconds = perf_counter() - start
+            after = _size(statements) if self.counted else 0
+
+            timing = self.timings[i]
+            self.timings[i] = timing._replace(
+                seconds=timing.seconds + seconds, before=timing.before + before, after=timing.after + after
+            )
+
+        return statements
+
+    def report(self, out: TextIO) -> None:
+        for timing in self.timings:
+            nodes = f' {timing.before:8d} -> {timing.after:d} nodes' if self.counted else ''
+            out.write(f'{timing.name:<18} {timing.seconds * 1000:8.2f}ms{nodes}\n')
+
+
+def pipeline(level: int, inline_budget: int = DEFAULT_BUDGET, counted: bool = False) -> Pipeline:
+    """
+    the passes of an optimization level: none at 0; at 1 folding, loop
+    invariant code motion, dead code elimination and type specialization; at 2, inlining too, then the rest
+    again over the inlined bodies.
+    """
+    if level not in LEVELS:
+        raise ValueError(f'Unknown optimization level {level}')
+
+    cleanup = [
+        Pass('hoist-invariants', hoist_invariants),
+        Pass('unused-variables', remove_unused_variables),
+        Pass('pure-statements', remove_pure_statements),
+        Pass('unreachable-code', remove_unreachable),
+        Pass('specialize-types', specialize_types),
+    ]
+    passes: list[Pass] = []
+    if level >= 1:
+        passes.append(Pass('fold-constants', fold_constants))
+    if level >= 2 and inline_budget > 0:
+        passes.append(Pass('inline-functions', lambda statements: inline_functions(statements, inline_budget)))
+        passes.append(Pass('fold-constants', fold_constants))
+    if level >= 1:
+        passes.extend(cleanup)
+
+    return Pipeline(passes, counted)
+
+
+def _size(statements: list['Stmt']) -> int:
+    return sum(1 for _ in walk(statements))
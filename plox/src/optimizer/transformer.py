@@ -0,0 +1,143 @@
+from collections.abc import Iterable
+from dataclasses import replace
+from typing import TYPE_CHECKING, TypeVar
+
+from src.ast.expr.visitor import Visitor as ExprVisitor
+from src.ast.stmt.schema import Block
+from src.ast.stmt.visitor import Visitor as StmtVisitor
+from src.parser import LazyBody
+
+if TYPE_CHECKING:
+    from src.ast.expr.schema import Assign, Binary, Call, Expr, FuncExpr, Grouping, Literal, Logical, Unary, Variable
+    from src.ast.stmt.schema import Expression, For, FuncStmt, IfStmt, Print, ReturnStmt, Stmt, Var, While
+
+N = TypeVar('N')
+
+
+class Transformer(ExprVisitor['Expr'], StmtVisitor['Stmt | None']):
+    """
+    Base of the optimizer passes, an AST to AST visitor: every node comes back
+    as is unless one of its children changed, then it's copied with the new
+    children (the nodes are frozen). A statement may come back as None, it is
+    dropped then. Function bodies that weren't parsed yet are left alone.
+    """
+
+    def transform(self, statements: Iterable['Stmt']) -> list['Stmt']:
+        return list(self.statements(statements))
+
+    def expression(self, expression: 'Expr') -> 'Expr':
+        return expression.accept(self)
+
+    def statement(self, statement: 'Stmt') -> 'Stmt | None':
+        return statement.accept(self)
+
+    def branch(self, statement: 'Stmt') -> 'Stmt':
+        # where a statement has to stay, a dropped one becomes an empty block
+        transformed = statement.accept(self)
+        return Block(()) if transformed is None else transformed
+
+    def statements(self, statements: Iterable['Stmt']) -> tuple['Stmt', ...]:
+        transformed: list[Stmt] = []
+        for statement in statements:
+            result = statement.accept(self)
+            if result is not None:
+                transformed.append(result)
+
+        return tuple(transformed)
+
+    def body(self, body: 'tuple[Stmt, ...] | LazyBody') -> 'tuple[Stmt, ...] | LazyBody':
+        if isinstance(body, LazyBody) and not body.parsed:
+            return body
+
+        transformed = self.statements(body)
+        if isinstance(body, tuple) and _same_items(transformed, body):
+            return body
+
+        return transformed
+
+    def visitExpression(self, expression: 'Expression') -> 'Stmt | None':
+        return rebuild(expression, expression=self.expression(expression.expression))
+
+    def visitWhile(self, while_: 'While') -> 'Stmt | None':
+        return rebuild(while_, condition=self.expression(while_.condition), statement=self.branch(while_.statement))
+
+    def visitFor(self, for_: 'For') -> 'Stmt | None':
+        return rebuild(
+            for_,
+            initializer=self.statement(for_.initializer) if for_.initializer else None,
+            condition=self.expression(for_.condition) if for_.condition else None,
+            increment=self.expression(for_.increment) if for_.increment else None,
+            body=self.branch(for_.body),
+        )
+
+    def visitIfStmt(self, if_stmt_: 'IfStmt') -> 'Stmt | None':
+        return rebuild(
+            if_stmt_,
+            condition=self.expression(if_stmt_.condition),
+            then_branch=self.branch(if_stmt_.then_branch),
+            else_branch=self.statement(if_stmt_.else_branch) if if_stmt_.else_branch else None,
+        )
+
+    def visitPrint(self, print_: 'Print') -> 'Stmt | None':
+        return rebuild(print_, expression=self.expression(print_.expression))
+
+    def visitFuncStmt(self, func_: 'FuncStmt') -> 'Stmt | None':
+        return rebuild(func_, body=self.body(func_.body))
+
+    def visitVarStmt(self, var_: 'Var') -> 'Stmt | None':
+        return rebuild(var_, initializer=self.expression(var_.initializer) if var_.initializer else None)
+
+    def visitReturnStmt(self, return_: 'ReturnStmt') -> 'Stmt | None':
+        return rebuild(return_, value=self.expression(return_.value) if return_.value else None)
+
+    def visitBlock(self, block_: 'Block') -> 'Stmt | None':
+        statements = self.statements(block_.statements)
+        if _same_items(statements, block_.statements):
+            return block_
+
+        return replace(block_, statements=statements)
+
+    def visitAssign(self, assign: 'Assign') -> 'Expr':
+        return rebuild(assign, expr=self.expression(assign.expr))
+
+    def visitCall(self, call_: 'Call') -> 'Expr':
+        callee = self.expression(call_.callee)
+        args = tuple(self.expression(arg) for arg in call_.args)
+        if callee is call_.callee and _same_items(args, call_.args):
+            return call_
+
+        return replace(call_, callee=callee, args=args)
+
+    def visitLogical(self, logical_: 'Logical') -> 'Expr':
+        return rebuild(logical_, left=self.expression(logical_.left), right=self.expression(logical_.right))
+
+    def visitBinary(self, binary: 'Binary') -> 'Expr':
+        return rebuild(binary, left=self.expression(binary.left), right=self.expression(binary.right))
+
+    def visitUnary(self, unary: 'Unary') -> 'Expr':
+        return rebuild(unary, right=self.expression(unary.right))
+
+    def visitFuncExpr(self, func_: 'FuncExpr') -> 'Expr':
+        return rebuild(func_, stmts=self.body(func_.stmts))
+
+    def visitGrouping(self, grouping: 'Grouping') -> 'Expr':
+        return rebuild(grouping, expression=self.expression(grouping.expression))
+
+    def visitLiteral(self, literal: 'Literal') -> 'Expr':
+        return literal
+
+    def visitVariable(self, variable: 'Variable') -> 'Expr':
+        return variable
+
+
+def rebuild(node: N, **children: object) -> N:
+    # copies `node` only if a child isn't the one it already has
+    for name, child in children.items():
+        if getattr(node, name) is not child:
+            return replace(node, **children)
+
+    return node
+
+
+def _same_items(left: tuple[object, ...], right: tuple[object, ...]) -> bool:
+    return len(left) == len(right) and all(a is b for a, b in zip(left, right))
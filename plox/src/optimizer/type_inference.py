@@ -0,0 +1,139 @@
+from collections.abc import Iterable
+from typing import TYPE_CHECKING, final
+
+from src.ast.expr.schema import Assign, Binary, Grouping, Literal, Logical, Unary, Variable
+from src.ast.stmt.schema import FuncStmt, Var
+from src.interperter_lib.semantics import TYPED_BINARY, TYPED_UNARY, Type
+from src.optimizer.bindings import Binding, Bindings
+from src.optimizer.transformer import Transformer, rebuild
+from src.tokens import Token, TokenType
+from src.visitors.ast_dumper import walk
+
+if TYPE_CHECKING:
+    from src.ast.expr.schema import Expr
+    from src.ast.stmt.schema import Stmt
+
+# besides the `Type`s: no value reached it (yet), and anything else or a mix
+_UNSEEN = -1
+_ANY = -2
+# operators whose result has the type of their operands, when it has one
+_ARITHMETIC = (TokenType.PLUS, TokenType.MINUS, TokenType.STAR, TokenType.SLASH)
+
+
+@final
+class TypeInference:
+    """
+    Works out which variables only ever hold numbers or only strings, flow
+    insensitively: a variable's type is the join of every value it's given,
+    its initializer and all the assignments to it, anywhere in the program.
+    Args, functions, globals never declared or used before they are and
+    whatever an unparsed body can see may hold anything. Starts from nothing
+    seen and goes over the assignments until no type changes, so loops like
+    `i = i + 1` settle on a number.
+    """
+
+    def __init__(self, bindings: Bindings, statements: Iterable['Stmt']) -> None:
+        self.bindings = bindings
+        self.types: dict[Binding, int] = {}
+        definitions: list[tuple[Binding, Expr | None]] = []
+        for *_, node in walk(statements):
+            if isinstance(node, Var):
+                binding = bindings.declared(node)
+                if binding is not None:
+                    definitions.append((binding, node.initializer))
+            elif isinstance(node, Assign):
+                binding = bindings.of(node)
+                if binding is not None:
+                    definitions.append((binding, node.expr))
+            elif isinstance(node, FuncStmt):
+                binding = bindings.declared(node)
+                if binding is not None:
+                    self.types[binding] = _ANY
+
+        changed = True
+        while changed:
+            changed = False
+            for binding, value in definitions:
+                old = self.types.get(binding, _UNSEEN)
+                new = _join(old, self.kind(value) if value is not None else _ANY)
+                if new != old:
+                    self.types[binding] = new
+                    changed = True
+
+    def kind(self, expr: 'Expr') -> int:
+        """the `Type` `expr` always evaluates to, `_ANY` if it has none"""
+        match expr:
+            case Literal():
+                if isinstance(expr.value, float):
+                    return Type.NUMBER
+                return Type.STRING if isinstance(expr.value, str) else _ANY
+            case Variable():
+                return self.__variable(expr)
+            case Assign() | Grouping():
+                return self.kind(expr.expr if isinstance(expr, Assign) else expr.expression)
+            case Logical():
+                # either side is what it evaluates to
+                return _join(self.kind(expr.left), self.kind(expr.right))
+            case Binary() if expr.operator.type in _ARITHMETIC:
+                kind = _join(self.kind(expr.left), self.kind(expr.right))
+                if kind == Type.STRING and expr.operator.type != TokenType.PLUS:
+                    return _ANY
+                return kind
+            case Unary() if expr.operator.type == TokenType.MINUS:
+                kind = self.kind(expr.right)
+                return kind if kind in (_UNSEEN, Type.NUMBER) else _ANY
+
+        # calls, functions, comparisons, `!`
+        return _ANY
+
+    def __variable(self, variable: 'Variable') -> int:
+        binding = self.bindings.of(variable)
+        if binding is None or binding.escaped or isinstance(binding.declaration, Token):
+            return _ANY
+        if binding.is_global and (not binding.declarations or binding.early):
+            return _ANY
+
+        return self.types.get(binding, _UNSEEN)
+
+
+@final
+class Specializer(Transformer):
+    """
+    Tags every `Binary` and `Unary` whose operands `TypeInference` proved to
+    be of a `Type` the operator has a `TYPED_BINARY`/`TYPED_UNARY` entry for,
+    the interpreter runs those without checking the operands.
+    """
+
+    def __init__(self, inference: TypeInference) -> None:
+        self.inference = inference
+
+    def visitBinary(self, binary: 'Binary') -> 'Expr':
+        kind = self.inference.kind(binary.left)
+        typed = kind >= 0 and kind == self.inference.kind(binary.right) and binary.operator.type in TYPED_BINARY[kind]
+        operands = Type(kind) if typed else None
+        return rebuild(
+            binary,
+            left=self.expression(binary.left),
+            right=self.expression(binary.right),
+            operands=operands,
+        )
+
+    def visitUnary(self, unary: 'Unary') -> 'Expr':
+        kind = self.inference.kind(unary.right)
+        operand = Type(kind) if kind >= 0 and unary.operator.type in TYPED_UNARY[kind] else None
+        return rebuild(unary, right=self.expression(unary.right), operand=operand)
+
+
+def _join(left: int, right: int) -> int:
+    if left == _UNSEEN:
+        return right
+    if right == _UNSEEN or left == right:
+        return left
+
+    return _ANY
+
+
+def specialize_types(statements: Iterable['Stmt']) -> list['Stmt']:
+    statements = list(statements)
+    bindings = Bindings(statements)
+    return Specializer(TypeInference(bindings, statements)).transform(statements)
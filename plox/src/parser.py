@@ -1,26 +1,59 @@
-from typing import final
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from enum import IntEnum, auto
+from typing import final, overload
 
 from src.ast.expr.schema import Assign, Binary, Call, Expr, FuncExpr, Grouping, Literal, Logical, Unary, Variable
-from src.ast.stmt.schema import Block, Expression, FuncStmt, IfStmt, Print, ReturnStmt, Stmt, Var, While
+from src.ast.stmt.schema import Block, Expression, For, FuncStmt, IfStmt, Print, ReturnStmt, Stmt, Var, While
+from src.token_buffer import TYPE_CODES, TokenBuffer
 from src.tokens import Token, TokenType
 
+_BRACE_OPEN = TYPE_CODES[TokenType.BRACE_OPEN]
+_BRACE_CLOSE = TYPE_CODES[TokenType.BRACE_CLOSE]
+_EOF = TYPE_CODES[TokenType.EOF]
+
 
 @final
 class ParseError(RuntimeError): ...
 
 
+class Precedence(IntEnum):
+    # lowest to highest, named after the grammar rules in grammar/v0.md
+    ASSIGNMENT = auto()
+    OR = auto()
+    AND = auto()
+    EQUALITY = auto()
+    COMPARISON = auto()  # - +
+    TERM = auto()  # > >= < <=
+    FACTOR = auto()
+    UNARY = auto()
+    CALL = auto()
+    CEILING = auto()
+
+
 class Parser:
-    def __init__(self, tokens: list[Token]) -> None:
-        self.tokens = tokens
-        self.current = 0
+    def __init__(self, tokens: Iterable[Token], lazy: bool = False, start: int = 0) -> None:
+        """
+        with `lazy` function bodies are only brace matched and parsed the first
+        time they are used (see `LazyBody`), that needs `tokens` to be a
+        `TokenBuffer` to come back to. `start` is the buffer index to begin at.
+        """
+        self.buffer: TokenBuffer | None = None
+        if lazy or start:
+            if not isinstance(tokens, TokenBuffer):
+                raise ValueError('lazy parsing needs a TokenBuffer')
+            self.buffer = tokens
+
+        # tokens are pulled on demand, we only ever hold the one we are looking
+        # at and the one before it, so a lazy token stream works as well as a list
+        self.tokens: Iterator[Token] = tokens.iter_from(start) if self.buffer else iter(tokens)
+        self.current = start
+        self.lazy = lazy
+        self.__next_token = next(self.tokens)
+        self.__previous_token = self.__next_token
 
     def parse(self) -> list[Stmt] | None:
         try:
-            statements: list[Stmt] = []
-            while not self.__is_at_end():
-                statements.append(self.declaration())
-
-            return statements
+            return list(self.parse_iter())
         except ParseError as e:
             # For now, later we are going to handle the exception by syncronizing
             print(
@@ -29,6 +62,14 @@ class Parser:
             )
             return None
 
+    def parse_iter(self) -> Iterator[Stmt]:
+        """
+        yields top level declarations as soon as they are parsed, unlike `parse`
+        a `ParseError` is raised to the caller.
+        """
+        while not self.__is_at_end():
+            yield self.declaration()
+
     def declaration(self) -> Stmt:
         if self.__match(TokenType.FUN):
             return self.fun_declaration()
@@ -71,8 +112,7 @@ class Parser:
 
         self.__consume(TokenType.PAREN_CLOSE, "expected ')' to close fun call arguments list.")
         self.__consume(TokenType.BRACE_OPEN, "expected '{' to define fun body.")
-        stmts = self.block()
-        return FuncStmt(name=name, args=args, body=stmts)
+        return FuncStmt(name=name, args=tuple(args), body=self.__function_body())
 
     def var_declaration(self) -> Stmt:
         # var token is already consumed
@@ -122,18 +162,7 @@ class Parser:
 
         body = self.statement()
 
-        if increment:
-            body = Block(statements=[body, Expression(increment)])
-
-        if not condition:
-            condition = Literal(True)
-
-        body = While(condition, body)
-
-        if initializer:
-            body = Block(statements=[initializer, body])
-
-        return body
+        return For(initializer, condition, increment, body)
 
     def while_statment(self) -> Stmt:
         self.__consume(TokenType.PAREN_OPEN, "Expect '(' after 'while'.")
@@ -159,13 +188,13 @@ class Parser:
         self.__consume(TokenType.SEMICOLON, "Expect ';' after value.")
         return Print(expression=expr)
 
-    def block(self) -> list[Stmt]:
+    def block(self) -> tuple[Stmt, ...]:
         statements: list[Stmt] = []
         while not self.__check(TokenType.BRACE_CLOSE) and not self.__is_at_end():
             statements.append(self.declaration())
 
         self.__consume(TokenType.BRACE_CLOSE, "Block supposed to be closed with '}'")
-        return statements
+        return tuple(statements)
 
     def expression_statement(self) -> Stmt:
         expr = self.expression()
@@ -173,106 +202,91 @@ class Parser:
         return Expression(expression=expr)
 
     def expression(self) -> Expr:
-        # TODO:
-        # handle FunctionExpression
-        #
-        return self.assignment()
+        return self.__parse_precedence(Precedence.ASSIGNMENT)
+
+    def __parse_precedence(self, precedence: Precedence) -> Expr:
+        """
+        Pratt parser: a prefix rule for the token that starts the expression,
+        then infix rules for as long as the next operator binds at least as
+        tight as `precedence`.
+
+        `and`, `or` and `=` don't chain (`a or b or c` is an error, as it
+        always was): once one of them is applied only operators binding looser
+        than it may follow, that's what `ceiling` is for.
+        """
+        if self.__is_at_end():
+            # `__advance` would hand out the previous token again, `-` or `(` forever
+            token = self.__peek()
+            raise ParseError(f'{token}:{token.line} expected expression')
 
-    def assignment(self) -> Expr:
-        expr = self.logical_or()
-
-        if self.__match(TokenType.EQUAL):
-            equals_token = self.__previous()
-            value = self.assignment()
-
-            if isinstance(expr, Variable):
-                return Assign(name=expr.name, expr=value)
-
-            raise ParseError(f'{equals_token} invalid assignment target.')
-
-        return expr
-
-    def logical_or(self) -> Expr:
-        expr = self.logical_and()
-        if self.__match(TokenType.OR):
-            return Logical(
-                left=expr,
-                operator=self.__previous(),
-                right=self.logical_and(),
-            )
-
-        return expr
-
-    def logical_and(self) -> Expr:
-        expr = self.equality()
-        if self.__match(TokenType.AND):
-            return Logical(
-                left=expr,
-                operator=self.__previous(),
-                right=self.equality(),
-            )
-
-        return expr
+        token = self.__advance()
+        prefix = self.__PREFIX_RULES.get(token.type)
+        if prefix is None:
+            raise ParseError(f'{token}:{token.line} current token is invalid at this position')
 
-    def equality(self) -> Expr:
-        expr = self.comparison()
+        expr = prefix(self, token)
+        ceiling = Precedence.CEILING
+        infix_rules = self.__INFIX_RULES
+        while True:
+            rule = infix_rules.get(self.__next_token.type)
+            if rule is None:
+                break
+            rule_precedence, infix, chains = rule
+            if rule_precedence < precedence or rule_precedence >= ceiling:
+                break
 
-        while self.__match(TokenType.BANG_EQUAL, TokenType.EQUAL_EQUAL):
-            operator = self.__previous()
-            right = self.comparison()
-            expr = Binary(left=expr, operator=operator, right=right)
+            expr = infix(self, expr, self.__advance())
+            if not chains:
+                ceiling = rule_precedence
 
         return expr
 
-    def comparison(self) -> Expr:
-        expr = self.term()
-
-        while self.__match(TokenType.MINUS, TokenType.PLUS):
-            op = self.__previous()
-            right = self.term()
-            expr = Binary(left=expr, operator=op, right=right)
-
-        return expr
+    def __literal(self, token: Token) -> Expr:
+        match token.type:
+            case TokenType.STRING:
+                return Literal(value=token.lexem)
+            case TokenType.NUMBER:
+                return Literal(value=float(token.lexem))
+            case TokenType.TRUE:
+                return Literal(value=True)
+            case TokenType.FALSE:
+                return Literal(value=False)
 
-    def term(self) -> Expr:
-        expr = self.factor()
+        return Literal(value=None)
 
-        while self.__match(TokenType.GREATER, TokenType.GREATER_EQUAL, TokenType.LESS, TokenType.LESS_EQUAL):
-            op = self.__previous()
-            right = self.factor()
-            expr = Binary(left=expr, operator=op, right=right)
+    def __variable(self, token: Token) -> Expr:
+        return Variable(name=token)
 
-        return expr
+    def __grouping(self, token: Token) -> Expr:
+        expr = self.expression()
+        self.__consume(TokenType.PAREN_CLOSE, 'no grouping PAREN_CLOSE')
 
-    def factor(self) -> Expr:
-        expr = self.unary()
+        return Grouping(expression=expr)
 
-        while self.__match(TokenType.SLASH, TokenType.STAR):
-            op = self.__previous()
-            right = self.unary()
-            expr = Binary(left=expr, operator=op, right=right)
+    def __fun(self, token: Token) -> Expr:
+        return self.fun_expression()
 
-        return expr
+    def __unary(self, token: Token) -> Expr:
+        return Unary(operator=token, right=self.__parse_precedence(Precedence.UNARY))
 
-    def unary(self) -> Expr:
-        if self.__match(TokenType.BANG, TokenType.MINUS):
-            return Unary(
-                operator=self.__previous(),
-                right=self.unary(),
-            )
+    def __binary(self, left: Expr, operator: Token) -> Expr:
+        right = self.__parse_precedence(self.__INFIX_RULES[operator.type][0] + 1)
+        return Binary(left=left, operator=operator, right=right)
 
-        return self.call()
+    def __logical(self, left: Expr, operator: Token) -> Expr:
+        right = self.__parse_precedence(self.__INFIX_RULES[operator.type][0] + 1)
+        return Logical(left=left, operator=operator, right=right)
 
-    def call(self) -> Expr:
-        expr = self.primary()
+    def __assignment(self, target: Expr, equals_token: Token) -> Expr:
+        # right associative, `a = b = c` is `a = (b = c)`
+        value = self.__parse_precedence(Precedence.ASSIGNMENT)
+        if isinstance(target, Variable):
+            return Assign(name=target.name, expr=value)
 
-        while True:
-            if self.__match(TokenType.PAREN_OPEN):
-                expr = self.__finish_call(expr)
-            else:
-                break
+        raise ParseError(f'{equals_token} invalid assignment target.')
 
-        return expr
+    def __call(self, callee: Expr, paren_open: Token) -> Expr:
+        return self.__finish_call(callee)
 
     def fun_expression(
         self,
@@ -293,41 +307,46 @@ class Parser:
 
         self.__consume(TokenType.PAREN_CLOSE, "expected ')' to close fun call arguments list.")
         self.__consume(TokenType.BRACE_OPEN, "expected '{' to define fun body.")
-        return FuncExpr(args=args, stmts=self.block())
-
-    def primary(self) -> Expr:
-        token = self.__advance()
-        match token.type:
-            case TokenType.STRING:
-                return Literal(value=token.lexem)
-            case TokenType.NUMBER:
-                return Literal(value=float(token.lexem))
-            case TokenType.IDENTIFIER:
-                return Variable(name=token)
-            case TokenType.TRUE:
-                return Literal(value=True)
-            case TokenType.FALSE:
-                return Literal(value=False)
-            case TokenType.NIL:
-                return Literal(value=None)
-            case TokenType.PAREN_OPEN:
-                expr = self.expression()
-                self.__consume(TokenType.PAREN_CLOSE, 'no grouping PAREN_CLOSE')
-
-                return Grouping(expression=expr)
-            case TokenType.FUN:
-                return self.fun_expression()
-            case _:
-                raise ParseError(f'{token}:{token.line} current token is invalid at this position')
+        return FuncExpr(args=tuple(args), stmts=self.__function_body())
+
+    def __function_body(self) -> 'tuple[Stmt, ...] | LazyBody':
+        # `{` is already consumed
+        if not self.lazy:
+            return self.block()
+
+        # only the brace nesting is looked at, no `Token` is built for the body
+        assert self.buffer is not None
+        types = self.buffer.types
+        start = end = self.current
+        depth = 1
+        while True:
+            code = types[end]
+            if code == _BRACE_CLOSE:
+                depth -= 1
+                if depth == 0:
+                    break
+            elif code == _BRACE_OPEN:
+                depth += 1
+            elif code == _EOF:
+                raise ParseError("Block supposed to be closed with '}'")
+            end += 1
+
+        self.tokens = self.buffer.iter_from(end)
+        self.current = end
+        self.__next_token = next(self.tokens)
+        self.__consume(TokenType.BRACE_CLOSE, "Block supposed to be closed with '}'")
+        return LazyBody(self.buffer, start)
 
     def __previous(self) -> Token:
-        return self.tokens[self.current - 1]
+        return self.__previous_token
 
     def __peek(self) -> Token:
-        return self.tokens[self.current]
+        return self.__next_token
 
     def __advance(self) -> Token:
         if not self.__is_at_end():
+            self.__previous_token = self.__next_token
+            self.__next_token = next(self.tokens)
             self.current += 1
 
         return self.__previous()
@@ -335,16 +354,11 @@ class Parser:
     def __is_at_end(self) -> bool:
         return self.__peek().type == TokenType.EOF
 
-    def __check(self, *token_types: TokenType) -> bool:
-        # there might be a bug
-        for token_type in token_types:
-            if self.tokens[self.current].type == token_type:
-                return True
-
-        return False
+    def __check(self, token_type: TokenType) -> bool:
+        return self.__next_token.type == token_type
 
-    def __match(self, *token_types: TokenType) -> bool:
-        res = self.__check(*token_types)
+    def __match(self, token_type: TokenType) -> bool:
+        res = self.__check(token_type)
 
         if res:
             self.__advance()
@@ -373,5 +387,83 @@ class Parser:
         return Call(
             callee=callee,
             paren=paren_close,
-            args=args,
+            args=tuple(args),
         )
+
+    __PREFIX_RULES: dict[TokenType, Callable[['Parser', Token], Expr]] = {
+        TokenType.STRING: __literal,
+        TokenType.NUMBER: __literal,
+        TokenType.TRUE: __literal,
+        TokenType.FALSE: __literal,
+        TokenType.NIL: __literal,
+        TokenType.IDENTIFIER: __variable,
+        TokenType.PAREN_OPEN: __grouping,
+        TokenType.FUN: __fun,
+        TokenType.BANG: __unary,
+        TokenType.MINUS: __unary,
+    }
+
+    # operator -> (precedence, rule, whether it chains with itself)
+    __INFIX_RULES: dict[TokenType, tuple[Precedence, Callable[['Parser', Expr, Token], Expr], bool]] = {
+        TokenType.EQUAL: (Precedence.ASSIGNMENT, __assignment, False),
+        TokenType.OR: (Precedence.OR, __logical, False),
+        TokenType.AND: (Precedence.AND, __logical, False),
+        TokenType.BANG_EQUAL: (Precedence.EQUALITY, __binary, True),
+        TokenType.EQUAL_EQUAL: (Precedence.EQUALITY, __binary, True),
+        TokenType.MINUS: (Precedence.COMPARISON, __binary, True),
+        TokenType.PLUS: (Precedence.COMPARISON, __binary, True),
+        TokenType.GREATER: (Precedence.TERM, __binary, True),
+        TokenType.GREATER_EQUAL: (Precedence.TERM, __binary, True),
+        TokenType.LESS: (Precedence.TERM, __binary, True),
+        TokenType.LESS_EQUAL: (Precedence.TERM, __binary, True),
+        TokenType.SLASH: (Precedence.FACTOR, __binary, True),
+        TokenType.STAR: (Precedence.FACTOR, __binary, True),
+        TokenType.PAREN_OPEN: (Precedence.CALL, __call, True),
+    }
+
+
+@final
+class LazyBody(Sequence[Stmt]):
+    """
+    Body of a function parsed with `Parser(lazy=True)`: at first only the
+    buffer index of the token after its `{` is kept, the statements are parsed
+    the first time the body is looked into, which for the interpreter is the
+    first call of the function. Functions nested in it are lazy again.
+
+    Code that can do without the statements (the `Resolver`, the `AstPrinter`)
+    checks `parsed` first, the resolver leaves an `on_parse` callback behind to
+    resolve the body once it's there.
+    """
+
+    def __init__(self, buffer: TokenBuffer, start: int) -> None:
+        self.buffer = buffer
+        self.start = start
+        self.on_parse: Callable[[tuple[Stmt, ...]], None] | None = None
+        self.__statements: tuple[Stmt, ...] | None = None
+
+    @property
+    def parsed(self) -> bool:
+        return self.__statements is not None
+
+    def statements(self) -> tuple[Stmt, ...]:
+        if self.__statements is None:
+            statements = Parser(self.buffer, lazy=True, start=self.start).block()
+            if self.on_parse:
+                self.on_parse(statements)
+                self.on_parse = None
+            self.__statements = statements
+
+        return self.__statements
+
+    @overload
+    def __getitem__(self, i: int) -> Stmt: ...
+    @overload
+    def __getitem__(self, i: slice) -> tuple[Stmt, ...]: ...
+    def __getitem__(self, i: int | slice) -> Stmt | tuple[Stmt, ...]:
+        return self.statements()[i]
+
+    def __iter__(self) -> Iterator[Stmt]:
+        return iter(self.statements())
+
+    def __len__(self) -> int:
+        return len(self.statements())
@@ -0,0 +1,150 @@
+import mmap
+import os
+import re
+from collections.abc import Iterator
+from typing import final
+
+from src.symbols import SYMBOLS, SymbolTable
+from src.token_buffer import TokenBuffer
+from src.tokens import KEYWORDS, OPERATORS, Token, TokenType
+
+# one alternative per lexical class, the order matters: the unterminated
+# string/comment alternatives only match once the complete ones failed (and
+# before `/` is taken as an operator), `error` catches any single character
+# nothing else wanted.
+_PATTERN = r"""
+      (?P<blank>[ \t\r\n]+)
+    | (?P<identifier>[A-Za-z_]+)
+    | (?P<number>[0-9]+(?:\.[0-9]+)?)
+    | (?P<string>"[^"]*")
+    | (?P<line_comment>//[^\n]*)
+    | (?P<block_comment>/\*.*?\*/)
+    | (?P<open_comment>/\*)
+    | (?P<operator>[=!<>]=?|[-+*/,;{}()])
+    | (?P<open_string>")
+    | (?P<error>.)
+"""
+TOKEN_PATTERN = re.compile(_PATTERN, re.VERBOSE | re.DOTALL)
+# same pattern over utf-8 bytes, used when scanning straight out of a mmap'd file
+BYTES_TOKEN_PATTERN = re.compile(_PATTERN.encode(), re.VERBOSE | re.DOTALL)
+
+
+@final
+class RegexScanner:
+    """
+    Drop-in replacement for `Scanner` that walks the source once with a single
+    precompiled pattern instead of dispatching character by character.
+    It produces exactly the same token stream, errors included, but for
+    digits: only ASCII ones make a number, the other characters `isdigit`
+    takes (`٣`, `²`) are unexpected here, in str and bytes sources alike.
+
+    The source can also be utf-8 bytes or a mmap of them, then the lexemes are
+    decoded one token at a time and the source is never copied.
+
+    Identifiers are interned in `symbols`, all the tokens for a name share one
+    string object. String literals aren't, a program can make up any number
+    of them and the table lives as long as the process.
+    """
+
+    def __init__(self, source: str | bytes | mmap.mmap, symbols: SymbolTable = SYMBOLS) -> None:
+        self.source = source
+        self.symbols = symbols
+
+    def scan_tokens(self) -> list[Token]:
+        return list(self.iter_tokens())
+
+    def scan_buffer(self) -> TokenBuffer:
+        """
+        scans the whole source into a compact `TokenBuffer`, no `Token` is
+        created until someone asks the buffer for one.
+        """
+        buffer = TokenBuffer(self.source, self.symbols)
+        append = buffer.append
+        for token_type, _, symbol, start, end, line in self.iter_spans():
+            append(token_type, symbol, start, end, line)
+
+        return buffer
+
+    def iter_tokens(self) -> Iterator[Token]:
+        for token_type, lexem, _, _, _, line in self.iter_spans():
+            yield Token(token_type, lexem, None, line)
+
+    def iter_spans(  # noqa: C901
+        self,
+        pos: int = 0,
+        line: int = 1,
+    ) -> Iterator[tuple[TokenType, str, int, int, int, int]]:
+        """
+        yields `(type, lexem, symbol, start, end, line)` for every token,
+        `symbol` is the interned id of identifiers (-1 otherwise),
+        `start` and `end` delimit the token in the source (quotes included for
+        strings).
+
+        Scanning can start at any token boundary `pos`, `line` being its line.
+        """
+        source = self.source
+        binary = not isinstance(source, str)
+        pattern = BYTES_TOKEN_PATTERN if binary else TOKEN_PATTERN
+        newline = b'\n' if binary else '\n'
+        keywords = KEYWORDS
+        operators = OPERATORS
+        intern = self.symbols.intern
+        names = self.symbols.names
+
+        for m in pattern.finditer(source, pos):
+            kind = m.lastgroup
+            if kind == 'blank':
+                line += m.group().count(newline)
+                continue
+            if kind == 'line_comment':
+                continue
+            if kind == 'block_comment':
+                line += m.group().count(newline)
+                continue
+
+            if kind == 'open_string':
+                raise ValueError('Non terminal string')
+            if kind == 'open_comment':
+                raise ValueError('non terminal multiline comment')
+            if kind == 'error':
+                char = m.group()
+                if binary:
+                    # the offending byte might be the head of a multi-byte character
+                    char = bytes(source[m.start() : m.start() + 4]).decode(errors='replace')[0]
+                raise ValueError(f'line {line}: Unexpected character -> {char!r}')
+
+            lexem = m.group()
+            if binary:
+                lexem = lexem.decode()
+
+            if kind == 'identifier':
+                keyword = keywords.get(lexem)
+                if keyword is not None:
+                    yield keyword, lexem, -1, m.start(), m.end(), line
+                else:
+                    symbol = intern(lexem)
+                    yield TokenType.IDENTIFIER, names[symbol], symbol, m.start(), m.end(), line
+            elif kind == 'operator':
+                yield operators[lexem], lexem, -1, m.start(), m.end(), line
+            elif kind == 'number':
+                yield TokenType.NUMBER, lexem, -1, m.start(), m.end(), line
+            else:
+                line += lexem.count('\n')
+                yield TokenType.STRING, lexem[1:-1], -1, m.start(), m.end(), line
+
+        yield TokenType.EOF, '', -1, len(source), len(source), line
+
+
+def scan_file(path: str) -> Iterator[Token]:
+    """
+    Lazily yields the tokens of the file at `path`, scanning it through a
+    read-only memory map so it never has to be read into memory as a whole.
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            # empty files can't be mapped
+            yield Token(TokenType.EOF, '', None, 1)
+            return
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as source:
+            yield from RegexScanner(source).iter_tokens()
@@ -1,14 +1,20 @@
+from collections.abc import Iterable
 from enum import StrEnum
-from typing import TYPE_CHECKING, final
+from typing import TYPE_CHECKING, NamedTuple, final
 
+from src.ast.expr.schema import Assign, Binary, Literal, Variable
 from src.ast.expr.visitor import Visitor as ExprVisitor
+from src.ast.stmt.schema import Var
 from src.ast.stmt.visitor import Visitor as StmtVisitor
+from src.environment import Access
 from src.interperter_lib.interpreter import Interpreter
-from src.tokens import Token
+from src.parser import LazyBody
+from src.tokens import Token, TokenType
+from src.visitors.ast_dumper import walk
 
 if TYPE_CHECKING:
-    from src.ast.expr.schema import Assign, Binary, Call, Expr, FuncExpr, Grouping, Literal, Logical, Unary, Variable
-    from src.ast.stmt.schema import Block, Expression, FuncStmt, IfStmt, Print, ReturnStmt, Stmt, Var, While
+    from src.ast.expr.schema import Call, Expr, FuncExpr, Grouping, Logical, Unary
+    from src.ast.stmt.schema import Block, Expression, For, FuncStmt, IfStmt, Print, ReturnStmt, Stmt, While
 
 
 class FunctionType(StrEnum):
@@ -16,15 +22,102 @@ class FunctionType(StrEnum):
     FUNCTION = 'FUNCTION'
 
 
+class Local(NamedTuple):
+    # position of the declaration in its scope, its frame slot comes out of it
+    # once we know where the scope lives (`Scope.slot`)
+    index: int
+    defined: bool
+
+
 @final
-class Resolver(ExprVisitor[object], StmtVisitor[None]):
-    scopes: list[dict[str, bool]] = []
+class Scope:
+    """
+    A block or function scope while resolving. Function scopes get a runtime
+    `Frame`, a call makes it, blocks put their locals in the frame of the
+    closest scope that has one (their owner) after the locals their parents
+    had declared when they began, siblings reuse the same slots. That goes
+    for captured locals too, they are `Cell`s the closures hold on to.
+
+    Blocks at the top level get one if they declare something and there's
+    no parent block that does to put their locals in, which is only known
+    when they end.
+    """
+
+    __slots__ = ('names', 'parent', 'function', 'start', 'frame', 'cells', 'upvalues')
+
+    def __init__(self, parent: 'Scope | None', function: 'FuncStmt | FuncExpr | None' = None) -> None:
+        self.names: dict[str, Local] = {}
+        self.parent = parent
+        self.function = function
+        self.start = len(parent.names) if parent is not None else 0
+        self.frame = True
+        # indexes of the locals a closure captured
+        self.cells: set[int] = set()
+        # a function's captured (scope, index) -> position in its closure's cells
+        self.upvalues: dict[tuple[Scope, int], int] = {}
+
+    def close(self) -> None:
+        if self.function is not None:
+            self.frame = True
+        elif not self.names:
+            self.frame = False
+        else:
+            self.frame = not self.__has_owner()
+
+    def __has_owner(self) -> bool:
+        # a parent declaring something ends up with a frame or puts its locals
+        # in one of its own parents', either way there is a frame for ours
+        scope = self.parent
+        while scope is not None:
+            if scope.function is not None or scope.names:
+                return True
+            scope = scope.parent
+
+        return False
+
+    def offset(self) -> int:
+        # where our locals start in the owner's frame
+        if self.frame:
+            return 0
+        assert self.parent is not None
+        return self.parent.offset() + self.start
+
+    def slot(self, index: int) -> int:
+        return self.offset() + index
+
+    def upvalue_source(self, target: 'Scope', index: int) -> int:
+        # where the closure of our function takes a cell from when it's made:
+        # a slot of the frame it's made in, or a cell of the enclosing closure
+        scope = self.parent
+        while scope is not target:
+            assert scope is not None
+            if scope.function is not None:
+                return -1 - scope.upvalues[(target, index)]
+            scope = scope.parent
+
+        return target.slot(index)
 
+
+@final
+class Resolver(ExprVisitor[object], StmtVisitor[None]):
     def __init__(self, interpreter: Interpreter) -> None:
         self.interpreter = interpreter
+        # per instance, a resolution error half way must not leave scopes behind for the next one
+        self.scopes: list[Scope] = []
+        # how many locals of an enclosing scope are visible, for a lazy body
+        # resolved after the scopes around it went on declaring
+        self.visible: dict[Scope, int] = {}
         self.current_function = FunctionType.NONE
-
-    def resolve(self, stmts: list['Stmt']) -> None:
+        # slots depend on scopes that haven't ended yet and whether a local is
+        # a cell on closures that may come after, they are worked out once the
+        # outermost scope ends
+        self.declarations: list[tuple['Var | FuncStmt', Scope, int]] = []
+        self.references: list[tuple['Variable | Assign', Scope, int]] = []
+        self.functions: list[Scope] = []
+        # `for`s of the counted shape, counted unless their counter is a cell
+        self.counted: list[For] = []
+
+    def resolve(self, stmts: Iterable['Stmt']) -> None:
         for stmt in stmts:
             self.resolve_statment(stmt)
 
@@ -41,6 +134,21 @@ class Resolver(ExprVisitor[object], StmtVisitor[None]):
         self.resolve_expression(while_.condition)
         self.resolve_statment(while_.statement)
 
+    def visitFor(self, for_: 'For') -> None:
+        self.__b_scope()
+        if for_.initializer:
+            self.resolve_statment(for_.initializer)
+        if for_.condition:
+            self.resolve_expression(for_.condition)
+        if for_.increment:
+            self.resolve_expression(for_.increment)
+        self.resolve_statment(for_.body)
+        # before the scope ends, that may be when counted loops are annotated
+        _annotate(for_, 'counted', False)
+        if _counted_shape(for_):
+            self.counted.append(for_)
+        _annotate(for_, 'frame', self.__e_scope().frame)
+
     def visitIfStmt(self, if_stmt_: 'IfStmt') -> None:
         self.resolve_expression(if_stmt_.condition)
         self.resolve_statment(if_stmt_.then_branch)
@@ -51,7 +159,7 @@ class Resolver(ExprVisitor[object], StmtVisitor[None]):
         self.resolve_expression(print_.expression)
 
     def visitFuncStmt(self, func_: 'FuncStmt') -> None:
-        self.__declare(func_.name)
+        self.__declare(func_.name, func_)
         self.__define(func_.name)
 
         self.resolve_function(func_, FunctionType.FUNCTION)
@@ -60,17 +168,46 @@ class Resolver(ExprVisitor[object], StmtVisitor[None]):
         enclosing_type = self.current_function
         self.current_function = type
 
-        self.__b_scope()
+        self.__b_scope(func_)
         for arg in func_.args:
             self.__declare(arg)
             self.__define(arg)
 
-        self.resolve(func_.body)
+        self.resolve_body(func_.body)
         self.__e_scope()
         self.current_function = enclosing_type
 
+    def resolve_body(self, body: 'tuple[Stmt, ...] | LazyBody') -> None:
+        if not isinstance(body, LazyBody) or body.parsed:
+            self.resolve(body)
+            return
+
+        # not parsed yet, resolve it when it is against the scopes as they are
+        # now, later declarations of the enclosing scopes aren't visible to it.
+        # Its closure is made before we know what it uses, so it captures all
+        # of them, its args included
+        scopes = list(self.scopes)
+        # a lazy body nested in another one sees only what that one saw
+        visible = {scope: self.visible.get(scope, len(scope.names)) for scope in scopes[:-1]}
+        function = scopes[-1]
+        function.cells.update(range(len(function.names)))
+        for scope in scopes[:-1]:
+            for index in range(visible[scope]):
+                self.__capture(scope, index)
+        function_type = self.current_function
+
+        def resolve_later(statements: tuple['Stmt', ...]) -> None:
+            resolver = Resolver(self.interpreter)
+            resolver.scopes = scopes
+            resolver.visible = visible
+            resolver.current_function = function_type
+            resolver.resolve(statements)
+            resolver.__finish()
+
+        body.on_parse = resolve_later
+
     def visitVarStmt(self, var_: 'Var') -> None:
-        self.__declare(var_.name)
+        self.__declare(var_.name, var_)
         if var_.initializer:
             self.resolve_expression(var_.initializer)
         self.__define(var_.name)
@@ -88,7 +225,7 @@ class Resolver(ExprVisitor[object], StmtVisitor[None]):
         self.resolve(block_.statements)
         # resolve
         # end scope
-        self.__e_scope()
+        _annotate(block_, 'frame', self.__e_scope().frame)
 
     def visitAssign(self, assign: 'Assign') -> object:
         self.resolve_expression(assign.expr)
@@ -111,12 +248,12 @@ class Resolver(ExprVisitor[object], StmtVisitor[None]):
         self.resolve_expression(unary.right)
 
     def visitFuncExpr(self, func_: 'FuncExpr') -> object:
-        self.__b_scope()
+        self.__b_scope(func_)
         for arg in func_.args:
             self.__declare(arg)
             self.__define(arg)
 
-        self.resolve(func_.stmts)
+        self.resolve_body(func_.stmts)
         self.__e_scope()
 
     def visitGrouping(self, grouping: 'Grouping') -> object:
@@ -126,36 +263,152 @@ class Resolver(ExprVisitor[object], StmtVisitor[None]):
         return
 
     def visitVariable(self, variable: 'Variable') -> object:
-        if len(self.scopes) != 0 and self.scopes[-1].get(variable.name.lexem) is False:
+        local = self.scopes[-1].names.get(variable.name.lexem) if self.scopes else None
+        if local is not None and not local.defined:
             raise Exception("Can't read local variable in its own initializer.")
 
         self.__resolve_local(variable, variable.name)
 
-    def __b_scope(self) -> None:
-        self.scopes.append({})
-
-    def __e_scope(self) -> None:
-        self.scopes.pop()
-
-    def __declare(self, name: Token) -> None:
+    def __b_scope(self, function: 'FuncStmt | FuncExpr | None' = None) -> None:
+        scope = Scope(self.scopes[-1] if self.scopes else None, function)
+        self.scopes.append(scope)
+        if function is not None:
+            self.functions.append(scope)
+
+    def __e_scope(self) -> Scope:
+        scope = self.scopes.pop()
+        scope.close()
+        if not self.scopes:
+            self.__finish()
+
+        return scope
+
+    def __finish(self) -> None:
+        for declaration, scope, index in self.declarations:
+            _annotate(declaration, 'access', Access.CELL if index in scope.cells else Access.LOCAL)
+            _annotate(declaration, 'slot', scope.slot(index))
+        for expr, scope, index in self.references:
+            self.interpreter.resolve(expr, Access.CELL if index in scope.cells else Access.LOCAL, scope.slot(index))
+        for scope in self.functions:
+            function = scope.function
+            assert function is not None
+            _annotate(function, 'cells', tuple(sorted(i for i in scope.cells if i < len(function.args))))
+            _annotate(function, 'upvalues', tuple(scope.upvalue_source(*key) for key in scope.upvalues))
+        for for_ in self.counted:
+            assert isinstance(for_.initializer, Var)
+            _annotate(for_, 'counted', for_.initializer.access == Access.LOCAL)
+
+        self.declarations.clear()
+        self.references.clear()
+        self.functions.clear()
+        self.counted.clear()
+
+    def __declare(self, name: Token, declaration: 'Var | FuncStmt | None' = None) -> None:
         if len(self.scopes) == 0:
+            if declaration is not None:
+                # a global, said explicitly as the node may have been resolved before (watch mode)
+                _annotate(declaration, 'access', None)
+                _annotate(declaration, 'slot', None)
             return
 
         inner_most_scope = self.scopes[-1]
-        if inner_most_scope.get(name.lexem) is not None:
+        if inner_most_scope.names.get(name.lexem) is not None:
             raise Exception(f'{name.lexem} already a variable with this name in this scope.')
-        inner_most_scope[name.lexem] = False
+        index = len(inner_most_scope.names)
+        inner_most_scope.names[name.lexem] = Local(index, False)
+        if declaration is not None:
+            self.declarations.append((declaration, inner_most_scope, index))
 
     def __define(self, name: Token) -> None:
         if len(self.scopes) == 0:
             return
 
-        inner_most_scope = self.scopes[-1]
-        inner_most_scope[name.lexem] = True
-
-    def __resolve_local(self, expr: 'Expr', name: Token) -> None:
-        for i in range(1, len(self.scopes) + 1):
-            scope = self.scopes[-i]
-            if name.lexem in scope:
-                self.interpreter.resolve(expr, i - 1)
+        names = self.scopes[-1].names
+        names[name.lexem] = names[name.lexem]._replace(defined=True)
+
+    def __resolve_local(self, expr: 'Variable | Assign', name: Token) -> None:
+        for scope in reversed(self.scopes):
+            local = scope.names.get(name.lexem)
+            if local is not None and local.index < self.visible.get(scope, local.index + 1):
+                if self.__same_frame(scope):
+                    self.references.append((expr, scope, local.index))
+                else:
+                    self.interpreter.resolve(expr, Access.UPVALUE, self.__capture(scope, local.index))
                 return
+
+        # a global, said explicitly as the node may have been resolved before (watch mode)
+        self.interpreter.resolve(expr, None, None)
+
+    def __same_frame(self, target: Scope) -> bool:
+        # no function between the innermost scope and `target`
+        for scope in reversed(self.scopes):
+            if scope is target:
+                return True
+            if scope.function is not None:
+                return False
+
+        return False
+
+    def __capture(self, target: Scope, index: int) -> int:
+        """
+        makes local `index` of `target` a cell and an upvalue of every function
+        between it and the innermost scope, returns its position in the cells
+        of the innermost one.
+        """
+        target.cells.add(index)
+        key = (target, index)
+        position = -1
+        for scope in reversed(self.scopes):
+            if scope is target:
+                break
+            if scope.function is not None:
+                upvalues = scope.upvalues
+                if key not in upvalues:
+                    upvalues[key] = len(upvalues)
+                if position < 0:
+                    position = upvalues[key]
+
+        return position
+
+
+def _counted_shape(for_: 'For') -> bool:
+    # `for (var i = a; i < b; i = i + c)` (or `<=`) with b and c literals or
+    # other variables, and no assignment to an `i` in the body
+    counter, condition, increment = for_.initializer, for_.condition, for_.increment
+    if not isinstance(counter, Var) or counter.initializer is None:
+        return False
+
+    name = counter.name.lexem
+    if not (
+        isinstance(condition, Binary)
+        and condition.operator.type in (TokenType.LESS, TokenType.LESS_EQUAL)
+        and _is_variable(condition.left, name)
+        and _is_operand(condition.right, name)
+    ):
+        return False
+
+    if not (
+        isinstance(increment, Assign)
+        and increment.name.lexem == name
+        and isinstance(increment.expr, Binary)
+        and increment.expr.operator.type == TokenType.PLUS
+        and _is_variable(increment.expr.left, name)
+        and _is_operand(increment.expr.right, name)
+    ):
+        return False
+
+    return not any(isinstance(node, Assign) and node.name.lexem == name for *_, node in walk([for_.body]))
+
+
+def _is_variable(expr: 'Expr', name: str) -> bool:
+    return isinstance(expr, Variable) and expr.name.lexem == name
+
+
+def _is_operand(expr: 'Expr', counter: str) -> bool:
+    # reading it can't change anything, the loop reads it every time anyway
+    return isinstance(expr, Literal) or (isinstance(expr, Variable) and expr.name.lexem != counter)
+
+
+def _annotate(node: 'Stmt', name: str, value: object) -> None:
+    # resolver results are kept on the nodes, frozen for everybody but us
+    object.__setattr__(node, name, value)
@@ -0,0 +1,38 @@
+import sys
+from typing import final
+
+
+@final
+class SymbolTable:
+    """
+    Interns identifier lexemes: every distinct text is stored once and gets a
+    dense integer id. The stored text is `sys.intern`ed, so the dicts keyed by
+    names (`Environment`, `Resolver` scopes) hash it once and compare keys by
+    identity, names written in our own code included.
+    """
+
+    def __init__(self) -> None:
+        self.ids: dict[str, int] = {}
+        self.names: list[str] = []
+
+    def intern(self, name: str) -> int:
+        symbol = self.ids.get(name)
+        if symbol is None:
+            name = sys.intern(name)
+            symbol = len(self.names)
+            self.names.append(name)
+            self.ids[name] = symbol
+
+        return symbol
+
+    def name(self, symbol: int) -> str:
+        return self.names[symbol]
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+
+# shared by every scanner unless told otherwise, so the same name scanned from
+# two different sources (or two runs of a watch loop) is still one object. It's
+# never cleared, only identifiers go in: as many as the programs have names
+SYMBOLS = SymbolTable()
@@ -0,0 +1,86 @@
+import mmap
+from array import array
+from collections.abc import Iterator
+from typing import final
+
+from src.symbols import SymbolTable
+from src.tokens import FIXED_LEXEMES, Token, TokenType
+
+TOKEN_TYPES = tuple(TokenType)
+TYPE_CODES = {token_type: code for code, token_type in enumerate(TOKEN_TYPES)}
+# offsets and lines, C only promises 2 bytes for 'I' and 'L' is 8 on most 64 bit
+# platforms, take the smallest that holds sources up to 4GiB
+UINT32 = 'I' if array('I').itemsize >= 4 else 'L'
+
+
+@final
+class TokenBuffer:
+    """
+    Struct of arrays token storage, one small integer per field per token
+    instead of a `Token` object each. Offsets point into `source` (quotes
+    included for strings) and lexemes are sliced out of it only when asked for,
+    identifiers don't even need that, they come from `symbols`.
+
+    Iterating the buffer, or indexing it, hands out regular `Token`s built on
+    the fly, so anything that consumes tokens (the `Parser`) can take a buffer.
+    """
+
+    def __init__(self, source: str | bytes | mmap.mmap, symbols: SymbolTable) -> None:
+        self.source = source
+        self.symbols = symbols
+        self.binary = not isinstance(source, str)
+        self.types = array('B')
+        self.symbol_ids = array('i')
+        self.starts = array(UINT32)
+        self.ends = array(UINT32)
+        self.lines = array(UINT32)
+
+    def append(self, token_type: TokenType, symbol: int, start: int, end: int, line: int) -> None:
+        self.types.append(TYPE_CODES[token_type])
+        self.symbol_ids.append(symbol)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.lines.append(line)
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def __getitem__(self, i: int) -> Token:
+        return Token(TOKEN_TYPES[self.types[i]], self.lexeme(i), None, self.lines[i])
+
+    def __iter__(self) -> Iterator[Token]:
+        return self.iter_from(0)
+
+    def iter_from(self, i: int) -> Iterator[Token]:
+        for j in range(i, len(self.types)):
+            yield self[j]
+
+    def type_at(self, i: int) -> TokenType:
+        return TOKEN_TYPES[self.types[i]]
+
+    def line_at(self, i: int) -> int:
+        return self.lines[i]
+
+    def lexeme(self, i: int) -> str:
+        token_type = TOKEN_TYPES[self.types[i]]
+        fixed = FIXED_LEXEMES.get(token_type)
+        if fixed is not None:
+            return fixed
+
+        symbol = self.symbol_ids[i]
+        if symbol >= 0:
+            return self.symbols.names[symbol]
+
+        start, end = self.starts[i], self.ends[i]
+        if token_type == TokenType.STRING:
+            start, end = start + 1, end - 1
+        lexem = self.source[start:end]
+        if self.binary:
+            return lexem.decode()
+
+        return lexem
+
+    def nbytes(self) -> int:
+        """memory held by the buffer itself, the source not included"""
+        arrays = (self.types, self.symbol_ids, self.starts, self.ends, self.lines)
+        return sum(a.buffer_info()[1] * a.itemsize for a in arrays)
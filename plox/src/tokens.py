@@ -1,6 +1,7 @@
-from dataclasses import dataclass
 from enum import StrEnum, auto
 
+from src.ast.node import node
+
 
 class TokenType(StrEnum):
     # single char tokens
@@ -55,7 +56,7 @@ class TokenType(StrEnum):
     EOF = auto()
 
 
-@dataclass(frozen=True)
+@node
 class Token:
     type: TokenType
     lexem: str
@@ -64,3 +65,48 @@ class Token:
 
     def __str__(self) -> str:
         return f'[{self.type}]({self.lexem})'
+
+
+KEYWORDS = {
+    'and': TokenType.AND,
+    'class': TokenType.CLASS,
+    'else': TokenType.ELSE,
+    'false': TokenType.FALSE,
+    'for': TokenType.FOR,
+    'fun': TokenType.FUN,
+    'if': TokenType.IF,
+    'nil': TokenType.NIL,
+    'or': TokenType.OR,
+    'print': TokenType.PRINT,
+    'return': TokenType.RETURN,
+    'super': TokenType.SUPER,
+    'this': TokenType.THIS,
+    'true': TokenType.TRUE,
+    'var': TokenType.VAR,
+    'while': TokenType.WHILE,
+}
+
+OPERATORS = {
+    '+': TokenType.PLUS,
+    '-': TokenType.MINUS,
+    '*': TokenType.STAR,
+    '/': TokenType.SLASH,
+    ',': TokenType.COMMA,
+    ';': TokenType.SEMICOLON,
+    '{': TokenType.BRACE_OPEN,
+    '}': TokenType.BRACE_CLOSE,
+    '(': TokenType.PAREN_OPEN,
+    ')': TokenType.PAREN_CLOSE,
+    '=': TokenType.EQUAL,
+    '==': TokenType.EQUAL_EQUAL,
+    '!': TokenType.BANG,
+    '!=': TokenType.BANG_EQUAL,
+    '>': TokenType.GREATER,
+    '>=': TokenType.GREATER_EQUAL,
+    '<': TokenType.LESS,
+    '<=': TokenType.LESS_EQUAL,
+}
+
+# the lexeme is implied by the type for everything but identifiers, strings and numbers
+FIXED_LEXEMES = {token_type: lexem for lexem, token_type in (KEYWORDS | OPERATORS).items()}
+FIXED_LEXEMES[TokenType.EOF] = ''
@@ -0,0 +1,441 @@
+from abc import abstractmethod
+from collections.abc import Iterable, Sequence
+from typing import TYPE_CHECKING, final
+
+from src.ast.expr.schema import Assign, Expr, Literal
+from src.ast.expr.visitor import Visitor as ExprVisitor
+from src.ast.stmt.schema import FuncStmt
+from src.ast.stmt.visitor import Visitor as StmtVisitor
+from src.environment import Access
+from src.interperter_lib.semantics import Type
+from src.tokens import TokenType
+
+if TYPE_CHECKING:
+    from src.ast.expr.schema import Binary, Call, FuncExpr, Grouping, Logical, Unary, Variable
+    from src.ast.stmt.schema import Block, Expression, For, IfStmt, Print, ReturnStmt, Stmt, Var, While
+    from src.tokens import Token
+
+_INDENT = '    '
+# what the generated module needs besides itself, it imports nothing from plox
+_RUNTIME = """\
+from time import time_ns
+from types import FunctionType
+
+
+class _Cell:
+    # a captured local, the closures get the cell itself as a default argument
+    __slots__ = ('value',)
+
+    def __init__(self, value=None):
+        self.value = value
+
+
+def _existing(name, value):
+    # a global is only assigned once it's declared, `name` is its Python one
+    if name not in globals():
+        raise RuntimeError(f'Variable {name[:-2]} doesnt exist')
+    return value
+
+
+def _set(cell, value):
+    cell.value = value
+    return value
+
+
+def _equal(left, right):
+    if not left and not right:
+        return True
+    if not left:
+        return False
+    return left == right
+
+
+def _negate(value):
+    assert isinstance(value, float)
+    return -value
+
+
+def _clock():
+    return time_ns()
+
+
+def _show(value):
+    # Lox functions are named `<name>_f`, anonymous ones `anonymous_f<n>`
+    if type(value) is FunctionType:
+        if value is _clock:
+            return '<native|fun time>'
+        name = value.__name__
+        return '<anonymous|fun>' if name[-1].isdigit() else f'<fun {name[:-2]}>'
+    return f'{value}'
+
+
+clock_g = _clock
+"""
+# operators `semantics.binary` only computes for two numbers, the rest gives nil
+_NUMBERS = {
+    TokenType.MINUS: '-',
+    TokenType.STAR: '*',
+    TokenType.SLASH: '/',
+    TokenType.LESS: '<',
+    TokenType.LESS_EQUAL: '<=',
+    TokenType.GREATER: '>',
+    TokenType.GREATER_EQUAL: '>=',
+}
+# and what they are once type inference proved their operands' type
+_TYPED = {**_NUMBERS, TokenType.PLUS: '+', TokenType.EQUAL_EQUAL: '==', TokenType.BANG_EQUAL: '!='}
+
+
+@final
+class Function:
+    """a Python function being generated"""
+
+    def __init__(self, upvalues: Sequence[str]) -> None:
+        # relative to the function body, it's indented once merged in its parent
+        self.lines: list[str] = []
+        self.depth = 0
+        # slot -> Lox name of the local living in it now, later locals take
+        # the slots of the ones gone out of scope
+        self.slots: dict[int, str] = {}
+        # Lox names of the cells of the closure, `n_u0` in Python
+        self.upvalues = tuple(upvalues)
+        # the globals it assigns, a module has to declare them `global`
+        self.globals: set[str] = set()
+        self.temporaries = 0
+        self.anonymous = 0
+
+    def body(self) -> list[str]:
+        lines = []
+        if self.globals:
+            lines.append(f'{_INDENT}global {", ".join(sorted(self.globals))}')
+        lines.extend(f'{_INDENT}{line}' for line in self.lines)
+        return lines or [f'{_INDENT}pass']
+
+
+class Transpiler(ExprVisitor[str], StmtVisitor[None]):
+    """
+    Base of the generators of Python source from a resolved tree: statements
+    are emitted as lines of the `Function` being generated, expressions come
+    back as Python expressions. Where the values live and what they are is
+    up to the subclass: globals, calls, functions and printing.
+
+    Locals become Python locals named after their Lox name and slot
+    (`i_2`), distinct for as long as they live. A local a closure captures
+    is a cell (the resolver's `Access.CELL`), closures reach it as `n_u0`.
+    Operators check their operands inline, unless type inference already
+    did, and Lox truthiness is Python's.
+    """
+
+    def __init__(self, upvalues: Sequence[str] = ()) -> None:
+        self.function = Function(upvalues)
+
+    @abstractmethod
+    def define_global(self, name: 'Token', value: str) -> None: ...
+
+    @abstractmethod
+    def global_value(self, name: 'Token') -> str: ...
+
+    @abstractmethod
+    def assign_global(self, name: 'Token', value: str, statement: bool) -> str:
+        """emits the assignment when it's a `statement`, returns it as an expression"""
+
+    @abstractmethod
+    def call(self, callee: str, args: list[str]) -> str: ...
+
+    @abstractmethod
+    def function_value(self, declaration: 'FuncStmt | FuncExpr', name: str | None) -> str:
+        """emits what makes the function, returns the expression of the function made"""
+
+    @abstractmethod
+    def show(self, value: str) -> str:
+        """what `print` writes"""
+
+    def emit(self, line: str) -> None:
+        self.function.lines.append(f'{_INDENT * self.function.depth}{line}')
+
+    def statements(self, statements: Iterable['Stmt']) -> None:
+        for statement in statements:
+            statement.accept(self)
+
+    def suite(self, *statements: 'Stmt | Expr | None') -> None:
+        # an indented block, `pass` if it's empty
+        function = self.function
+        function.depth += 1
+        start = len(function.lines)
+        for statement in statements:
+            if isinstance(statement, Assign):
+                self.__assign(statement, statement=True)
+            elif isinstance(statement, Expr):
+                self.emit(self.expression(statement))
+            elif statement is not None:
+                statement.accept(self)
+        if len(function.lines) == start:
+            self.emit('pass')
+        function.depth -= 1
+
+    def expression(self, expression: 'Expr') -> str:
+        return expression.accept(self)
+
+    def temporary(self) -> str:
+        self.function.temporaries += 1
+        return f'_t{self.function.temporaries}'
+
+    def local(self, name: 'Token', slot: int) -> str:
+        self.function.slots[slot] = _identifier(name)
+        return f'{_identifier(name)}_{slot}'
+
+    def cell(self, index: int) -> str:
+        return f'{self.function.upvalues[index]}_u{index}'
+
+    def captured(self, sources: Iterable[int]) -> list[str]:
+        # the cells a closure made here gets, from a slot or the closure's own
+        return [
+            f'{self.function.slots[source]}_{source}' if source >= 0 else self.cell(-1 - source) for source in sources
+        ]
+
+    def visitExpression(self, expression: 'Expression') -> None:
+        if isinstance(expression.expression, Assign):
+            # a plain assignment statement, not an assignment expression
+            self.__assign(expression.expression, statement=True)
+            return
+
+        self.emit(self.expression(expression.expression))
+
+    def visitPrint(self, print_: 'Print') -> None:
+        self.emit(f'print({self.show(self.expression(print_.expression))})')
+
+    def visitVarStmt(self, var_: 'Var') -> None:
+        if var_.access is None or var_.slot is None:
+            self.define_global(var_.name, self.expression(var_.initializer) if var_.initializer else 'None')
+            return
+
+        name = self.local(var_.name, var_.slot)
+        if var_.access == Access.CELL:
+            # the cell is there before the initializer runs, a closure it makes may capture it
+            self.emit(f'{name} = _Cell()')
+            if var_.initializer:
+                self.emit(f'{name}.value = {self.expression(var_.initializer)}')
+            return
+
+        self.emit(f'{name} = {self.expression(var_.initializer) if var_.initializer else "None"}')
+
+    def visitFuncStmt(self, func_: 'FuncStmt') -> None:
+        if func_.access is None or func_.slot is None:
+            self.define_global(func_.name, self.function_value(func_, _identifier(func_.name)))
+            return
+
+        name = self.local(func_.name, func_.slot)
+        if func_.access == Access.CELL:
+            # it may capture itself
+            self.emit(f'{name} = _Cell()')
+            self.emit(f'{name}.value = {self.function_value(func_, _identifier(func_.name))}')
+            return
+
+        self.emit(f'{name} = {self.function_value(func_, _identifier(func_.name))}')
+
+    def visitReturnStmt(self, return_: 'ReturnStmt') -> None:
+        self.emit(f'return {self.expression(return_.value)}' if return_.value else 'return None')
+
+    def visitBlock(self, block_: 'Block') -> None:
+        # locals have a name of their own, no scope to make
+        self.statements(block_.statements)
+
+    def visitIfStmt(self, if_stmt_: 'IfStmt') -> None:
+        # `is_truth` is Python's truthiness, for every value a program can make
+        self.emit(f'if {self.expression(if_stmt_.condition)}:')
+        self.suite(if_stmt_.then_branch)
+        if if_stmt_.else_branch:
+            self.emit('else:')
+            self.suite(if_stmt_.else_branch)
+
+    def visitWhile(self, while_: 'While') -> None:
+        self.emit(f'while {self.expression(while_.condition)}:')
+        self.suite(while_.statement)
+
+    def visitFor(self, for_: 'For') -> None:
+        if for_.initializer:
+            for_.initializer.accept(self)
+        self.emit(f'while {self.expression(for_.condition) if for_.condition else "True"}:')
+        self.suite(for_.body, for_.increment)
+
+    def visitAssign(self, assign: 'Assign') -> str:
+        return self.__assign(assign, statement=False)
+
+    def __assign(self, assign: 'Assign', statement: bool) -> str:
+        value = self.expression(assign.expr)
+        if assign.access is None:
+            return self.assign_global(assign.name, value, statement)
+        if assign.access == Access.LOCAL:
+            target = f'{_identifier(assign.name)}_{assign.slot}'
+            if statement:
+                self.emit(f'{target} = {value}')
+            return f'({target} := {value})'
+
+        assert assign.slot is not None
+        cell = f'{_identifier(assign.name)}_{assign.slot}' if assign.access == Access.CELL else self.cell(assign.slot)
+        if statement:
+            self.emit(f'{cell}.value = {value}')
+        return f'_set({cell}, {value})'
+
+    def visitCall(self, call_: 'Call') -> str:
+        return self.call(self.expression(call_.callee), [self.expression(arg) for arg in call_.args])
+
+    def visitLogical(self, logical_: 'Logical') -> str:
+        # `or` and `and` evaluate to the operand they stop at, as in Python
+        operator = 'or' if logical_.operator.type == TokenType.OR else 'and'
+        return f'({self.expression(logical_.left)} {operator} {self.expression(logical_.right)})'
+
+    def visitBinary(self, binary: 'Binary') -> str:
+        left, right = self.expression(binary.left), self.expression(binary.right)
+        operator = binary.operator.type
+        if binary.operands is not None and operator in _TYPED:
+            return f'({left} {_TYPED[operator]} {right})'
+        if operator == TokenType.EQUAL_EQUAL:
+            return f'_equal({left}, {right})'
+        if operator == TokenType.BANG_EQUAL:
+            return f'(not _equal({left}, {right}))'
+
+        # both operands are evaluated, in order, before either is checked
+        a = self.temporary()
+        if isinstance(binary.right, Literal) and type(binary.right.value) in (float, str):
+            # only the left operand is left to check
+            kind = type(binary.right.value).__name__
+            if operator == TokenType.PLUS:
+                return f'({a} + {right} if type({a} := {left}) is {kind} else None)'
+            if kind == 'float':
+                return f'({a} {_NUMBERS[operator]} {right} if type({a} := {left}) is float else None)'
+
+        b = self.temporary()
+        if operator == TokenType.PLUS:
+            check = f'type({a} := {left}) is type({b} := {right}) and type({a}) in (float, str)'
+            return f'({a} + {b} if {check} else None)'
+
+        check = f'(type({a} := {left}) is float) & (type({b} := {right}) is float)'
+        return f'({a} {_NUMBERS[operator]} {b} if {check} else None)'
+
+    def visitUnary(self, unary: 'Unary') -> str:
+        right = self.expression(unary.right)
+        if unary.operator.type == TokenType.BANG:
+            # the interpreter's `!` is the truth of the operand, not its negation
+            return f'bool({right})'
+        if unary.operand == Type.NUMBER:
+            return f'(-{right})'
+
+        value = self.temporary()
+        return f'(-{value} if type({value} := {right}) is float else _negate({value}))'
+
+    def visitFuncExpr(self, func_: 'FuncExpr') -> str:
+        return self.function_value(func_, None)
+
+    def visitGrouping(self, grouping: 'Grouping') -> str:
+        return self.expression(grouping.expression)
+
+    def visitLiteral(self, literal: 'Literal') -> str:
+        return repr(literal.value)
+
+    def visitVariable(self, variable: 'Variable') -> str:
+        if variable.access is None:
+            return self.global_value(variable.name)
+        if variable.access == Access.LOCAL:
+            return f'{_identifier(variable.name)}_{variable.slot}'
+        if variable.access == Access.CELL:
+            return f'{_identifier(variable.name)}_{variable.slot}.value'
+
+        assert variable.slot is not None
+        return f'{self.cell(variable.slot)}.value'
+
+
+@final
+class PythonTranspiler(Transpiler):
+    """
+    Generates a Python module doing what a resolved program does, for
+    CPython to run without any interpreter in between: globals are module
+    globals (`i_g`) and functions Python functions, closures get the cells
+    they use as keyword only defaults, bound when the `def` runs, so a `var`
+    run again makes a new cell as it does for the interpreter.
+
+    What differs from the interpreter is how errors show up: Python's
+    `TypeError` for calls to something that isn't a function or with the
+    wrong number of args, `NameError` for reading an undefined global.
+    Assigning one raises as the interpreter does.
+    """
+
+    def transpile(self, statements: Iterable['Stmt'], source: str = '<lox>') -> str:
+        main = self.function
+        self.statements(statements)
+        lines = [
+            f'# generated by plox from {source}, runs on its own: python <this file>',
+            _RUNTIME,
+            '',
+            'def main():',
+            *main.body(),
+            '',
+            '',
+            "if __name__ == '__main__':",
+            f'{_INDENT}main()',
+            '',
+        ]
+        return '\n'.join(lines)
+
+    def __global(self, name: 'Token') -> str:
+        # one it assigns, Python wants it declared
+        self.function.globals.add(f'{_identifier(name)}_g')
+        return f'{_identifier(name)}_g'
+
+    def define_global(self, name: 'Token', value: str) -> None:
+        self.emit(f'{self.__global(name)} = {value}')
+
+    def global_value(self, name: 'Token') -> str:
+        return f'{_identifier(name)}_g'
+
+    def assign_global(self, name: 'Token', value: str, statement: bool) -> str:
+        target = self.__global(name)
+        value = f'_existing({target!r}, {value})'
+        if statement:
+            self.emit(f'{target} = {value}')
+        return f'({target} := {value})'
+
+    def call(self, callee: str, args: list[str]) -> str:
+        return f'{callee}({", ".join(args)})'
+
+    def function_value(self, declaration: 'FuncStmt | FuncExpr', name: str | None) -> str:
+        # a `def` right before the statement making the function, closures
+        # only capture cells and those don't change within a statement
+        enclosing = self.function
+        if name is None:
+            enclosing.anonymous += 1
+            name = f'anonymous_f{enclosing.anonymous}'
+        else:
+            name = f'{name}_f'
+
+        upvalues = [
+            enclosing.slots[source] if source >= 0 else enclosing.upvalues[-1 - source]
+            for source in declaration.upvalues
+        ]
+        function = self.function = Function(upvalues)
+        params = [self.local(arg, slot) for slot, arg in enumerate(declaration.args)]
+        for slot in declaration.cells:
+            self.emit(f'{params[slot]} = _Cell({params[slot]})')
+        self.statements(declaration.body if isinstance(declaration, FuncStmt) else declaration.stmts)
+        self.function = enclosing
+
+        captured = [
+            f'{upvalue}_u{index}={source}'
+            for index, (upvalue, source) in enumerate(zip(upvalues, self.captured(declaration.upvalues), strict=True))
+        ]
+        signature = ', '.join(params + (['*', *captured] if captured else []))
+        self.emit(f'def {name}({signature}):')
+        for line in function.body():
+            self.emit(line)
+        return name
+
+    def show(self, value: str) -> str:
+        return f'_show({value})'
+
+
+def _identifier(name: 'Token') -> str:
+    # the inliner's renamed locals are `x#1`, Lox names have no digits so `x__1` is free
+    return name.lexem.replace('#', '__')
+
+
+def transpile(statements: Iterable['Stmt'], source: str = '<lox>') -> str:
+    return PythonTranspiler().transpile(statements, source)
@@ -0,0 +1,255 @@
+import json
+from abc import ABC, abstractmethod
+from collections.abc import Iterable, Iterator
+from dataclasses import fields
+from typing import TYPE_CHECKING, TextIO, final
+
+from src.ast.expr.schema import Expr, Literal
+from src.ast.expr.visitor import Visitor as ExprVisitor
+from src.ast.stmt.schema import Stmt
+from src.ast.stmt.visitor import Visitor as StmtVistior
+from src.environment import Access
+from src.interperter_lib.semantics import Type
+from src.parser import LazyBody
+from src.tokens import Token
+
+if TYPE_CHECKING:
+    from src.ast.expr.schema import Assign, Binary, Call, FuncExpr, Grouping, Logical, Unary, Variable
+    from src.ast.stmt.schema import Block, Expression, For, FuncStmt, IfStmt, Print, ReturnStmt, Var, While
+
+
+class AstDumper(ABC):
+    """
+    Writes a program's AST to `out` node by node as it walks it, nothing but
+    the path down to the current node is held, whatever the program size.
+    Function bodies that weren't parsed yet (`LazyBody`) are left alone.
+    """
+
+    def __init__(self, out: TextIO) -> None:
+        self.out = out
+
+    @abstractmethod
+    def dump(self, statements: Iterable[Stmt]) -> None: ...
+
+
+@final
+class SExprDumper(AstDumper, ExprVisitor[None], StmtVistior[None]):
+    """the `AstPrinter` format, every top level statement followed by `separator`"""
+
+    def __init__(self, out: TextIO, separator: str = '\n') -> None:
+        super().__init__(out)
+        self.write = out.write
+        self.separator = separator
+
+    def dump(self, statements: Iterable[Stmt]) -> None:
+        for statement in statements:
+            statement.accept(self)
+            self.write(self.separator)
+
+    def parenthesize(self, name: str, *exprs: Expr) -> None:
+        self.write(f'({name}')
+        for expr in exprs:
+            self.write(' ')
+            expr.accept(self)
+        self.write(')')
+
+    def write_block(self, stmts: 'tuple[Stmt, ...] | LazyBody') -> None:
+        if isinstance(stmts, LazyBody) and not stmts.parsed:
+            # dumping must not parse it
+            self.write('(block ...)')
+            return
+
+        self.write('(block')
+        for stmt in stmts:
+            self.write(' ')
+            stmt.accept(self)
+        self.write(')')
+
+    def visitExpression(self, expression: 'Expression') -> None:
+        expression.expression.accept(self)
+
+    def visitWhile(self, while_: 'While') -> None:
+        self.write('(while ')
+        while_.condition.accept(self)
+        self.write(' ')
+        while_.statement.accept(self)
+        self.write(')')
+
+    def visitFor(self, for_: 'For') -> None:
+        # a missing clause shows as nil
+        self.write('(for ')
+        for clause in (for_.initializer, for_.condition, for_.increment):
+            if clause is None:
+                self.write('nil')
+            else:
+                clause.accept(self)
+            self.write(' ')
+        for_.body.accept(self)
+        self.write(')')
+
+    def visitIfStmt(self, if_stmt_: 'IfStmt') -> None:
+        self.write('(if ')
+        if_stmt_.condition.accept(self)
+        self.write(' then ')
+        if_stmt_.then_branch.accept(self)
+
+        if if_stmt_.else_branch:
+            self.write(' else ')
+            if_stmt_.else_branch.accept(self)
+        self.write(')')
+
+    def visitPrint(self, print_: 'Print') -> None:
+        self.parenthesize('print', print_.expression)
+
+    def visitFuncStmt(self, func_: 'FuncStmt') -> None:
+        self.write(f'fun({func_.name.lexem} ')
+        self.write_block(func_.body)
+        self.write(')')
+
+    def visitReturnStmt(self, return_: 'ReturnStmt') -> None:
+        if return_.value:
+            self.parenthesize('return', return_.value)
+        else:
+            self.write('return nil')
+
+    def visitVarStmt(self, var_: 'Var') -> None:
+        if not var_.initializer:
+            self.write(f'(define_var {var_.name.lexem} )')
+        else:
+            self.parenthesize(f'define_var({var_.name.lexem})', var_.initializer)
+
+    def visitBlock(self, block_: 'Block') -> None:
+        self.write_block(block_.statements)
+
+    def visitAssign(self, assign: 'Assign') -> None:
+        self.parenthesize(f'assign_var({assign.name.lexem})', assign.expr)
+
+    def visitCall(self, call_: 'Call') -> None:
+        self.parenthesize('call', call_.callee, *call_.args)
+
+    def visitLogical(self, logical_: 'Logical') -> None:
+        logical_.left.accept(self)
+        self.write(f' {logical_.operator.type} ')
+        logical_.right.accept(self)
+
+    def visitBinary(self, binary: 'Binary') -> None:
+        self.parenthesize(binary.operator.lexem, binary.left, binary.right)
+
+    def visitUnary(self, unary: 'Unary') -> None:
+        self.parenthesize(unary.operator.lexem, unary.right)
+
+    def visitFuncExpr(self, func_: 'FuncExpr') -> None:
+        self.write('anonymous_fun(')
+        self.write_block(func_.stmts)
+        self.write(')')
+
+    def visitGrouping(self, grouping: 'Grouping') -> None:
+        self.parenthesize('group', grouping.expression)
+
+    def visitLiteral(self, literal: 'Literal') -> None:
+        self.write('nil' if literal.value is None else f'{literal.value}')
+
+    def visitVariable(self, variable: 'Variable') -> None:
+        self.write(variable.name.lexem)
+
+
+# a node reached during a walk: its depth, the field of the parent it sits in
+# (None at the top level), its id and its parent's (-1 at the top level)
+Step = tuple[int, str | None, int, int, 'Expr | Stmt | LazyBody']
+
+
+def walk(statements: Iterable[Stmt]) -> Iterator[Step]:
+    """
+    pre-order walk of any node class through its dataclass fields, with a
+    stack of pending iterators instead of recursion.
+    """
+    ids = 0
+    stack: list[tuple[int, int, Iterator[tuple[str, object]]]] = [(0, -1, ((None, s) for s in statements))]
+    while stack:
+        depth, parent, pending = stack[-1]
+        step = next(pending, None)
+        if step is None:
+            stack.pop()
+            continue
+
+        name, node = step
+        if not isinstance(node, (Expr, Stmt, LazyBody)):
+            continue
+
+        node_id = ids
+        ids += 1
+        yield depth, name, node_id, parent, node
+        if not isinstance(node, LazyBody):
+            stack.append((depth + 1, node_id, _children(node)))
+
+
+def _children(node: Expr | Stmt) -> Iterator[tuple[str, object]]:
+    for field in fields(node):
+        value = getattr(node, field.name)
+        if isinstance(value, LazyBody) and not value.parsed:
+            yield field.name, value
+        elif isinstance(value, (tuple, LazyBody)):
+            for item in value:
+                yield field.name, item
+        else:
+            yield field.name, value
+
+
+def _attributes(node: Expr | Stmt | LazyBody) -> Iterator[tuple[str, object]]:
+    # the non node fields: tokens by their lexeme, literals as they are, resolved accesses and types by name
+    if isinstance(node, LazyBody):
+        return
+    for field in fields(node):
+        value = getattr(node, field.name)
+        if isinstance(value, Token):
+            yield field.name, value.lexem
+        elif isinstance(value, tuple) and value and isinstance(value[0], Token):
+            yield field.name, [token.lexem for token in value]
+        elif field.name == 'access' and value is not None:
+            yield field.name, Access(value).name
+        elif field.name in ('operands', 'operand') and value is not None:
+            yield field.name, Type(value).name
+        elif isinstance(node, Literal):
+            yield field.name, value
+
+
+@final
+class JsonLinesDumper(AstDumper):
+    """one JSON object per node, with its id and its parent's to put the tree back together"""
+
+    def dump(self, statements: Iterable[Stmt]) -> None:
+        write = self.out.write
+        for _, name, node_id, parent, node in walk(statements):
+            record: dict[str, object] = {'id': node_id, 'parent': parent, 'field': name, 'type': type(node).__name__}
+            record.update(_attributes(node))
+            write(json.dumps(record))
+            write('\n')
+
+
+@final
+class IndentDumper(AstDumper):
+    """one line per node, indented by depth"""
+
+    def __init__(self, out: TextIO, indent: str = '  ') -> None:
+        super().__init__(out)
+        self.indent = indent
+
+    def dump(self, statements: Iterable[Stmt]) -> None:
+        write = self.out.write
+        for depth, name, _, _, node in walk(statements):
+            write(self.indent * depth)
+            if name is not None:
+                write(f'{name}: ')
+            write(type(node).__name__)
+            if isinstance(node, LazyBody):
+                write(' ...')
+            for attribute, value in _attributes(node):
+                write(f' {attribute}={value!r}')
+            write('\n')
+
+
+DUMPERS: dict[str, type[AstDumper]] = {
+    'sexpr': SExprDumper,
+    'jsonl': JsonLinesDumper,
+    'indent': IndentDumper,
+}
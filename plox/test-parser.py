@@ -0,0 +1,19 @@
+from src.parser import ParseError, Parser
+from src.regex_scanner import RegexScanner
+
+# programs that end where an expression should start, the prefix rule of
+# their last token must not run again on EOF
+UNFINISHED = ['print -', 'print !', 'print (', 'print', 'print 1 +', 'var a = -']
+
+if __name__ == '__main__':
+    for source in UNFINISHED:
+        for lazy in (False, True):
+            parser = Parser(RegexScanner(source).scan_buffer(), lazy=lazy)
+            try:
+                list(parser.parse_iter())
+            except ParseError as e:
+                assert 'expected expression' in str(e), (source, e)
+            else:
+                raise AssertionError(f'{source!r} parsed')
+
+    print(f'{len(UNFINISHED)} unfinished programs rejected')
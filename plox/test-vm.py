@@ -0,0 +1,33 @@
+import io
+from contextlib import redirect_stdout
+
+from src.bytecode.compiler import Compiler
+from src.bytecode.vm import VM
+from src.interperter_lib.interpreter import Interpreter
+from src.parser import Parser
+from src.regex_scanner import RegexScanner
+from src.resolver import Resolver
+
+# more constants than a short can index, and a jump over more code than it can reach
+MANY_CONSTANTS = ''.join(f'print {i};\n' for i in range(70_000))
+LONG_JUMP = 'var a = 0;\nif (a == 1) {\n' + 'a = a + 1;\n' * 40_000 + '}\nprint a;\nprint "done";\n'
+
+
+def output(source: str, vm: bool) -> str:
+    statements = Parser(RegexScanner(source).scan_buffer()).parse() or []
+    interpreter = Interpreter()
+    Resolver(interpreter).resolve(statements)
+    runner = VM() if vm else interpreter
+    with redirect_stdout(io.StringIO()) as out:
+        runner.interpret(statements)
+    return out.getvalue()
+
+
+if __name__ == '__main__':
+    for name, source in (('constants', MANY_CONSTANTS), ('jump', LONG_JUMP)):
+        statements = Parser(RegexScanner(source).scan_buffer()).parse() or []
+        Resolver(Interpreter()).resolve(statements)
+        assert Compiler().compile(statements).chunk.code.itemsize >= 4, name
+        assert output(source, vm=True) == output(source, vm=False), name
+
+    print('wide chunks run as the interpreter does')